@@ -1,24 +1,215 @@
 # Dans le fichier de votre application / admin.py
-
+"""
+Administration dimensionnée pour des flottes de plusieurs centaines de milliers de fiches :
+- changelists : list_select_related couvre les __str__ (Assurance -> navire, assureur ;
+  Visite, Dossier, Moteur, Méta-donnée -> navire), pas de COUNT(*) de la table entière
+  (show_full_result_count = False), tri et filtres servis par les index existants ;
+- recherche limitée aux colonnes indexées, en préfixe (^) ou à l'égalité (=), servie sous
+  PostgreSQL par les index UPPER(...) text_pattern_ops (migration 0021) ;
+- clés étrangères vers les navires et propriétaires en autocomplétion (jamais de liste
+  déroulante de toute la flotte) ;
+- fiche navire : documents en lignes, chargés avec leurs relations (y compris le navire
+  lu par leur __str__), historiques limités aux lignes les plus récentes, avec un lien
+  vers la liste complète filtrée sur le navire.
+Comme l'API, l'administration est restreinte à l'organisation de la requête.
+"""
 from django.contrib import admin
+from django.forms.models import BaseInlineFormSet
+from django.urls import reverse
+from django.utils.html import format_html_join
 from .models import (
-    Proprietaire, 
-    Activite, 
-    Assureur, 
-    Navire, 
-    Assurance, 
-    Moteur, 
-    Visite, 
-    Dossier, 
-    MetaDonne
+    Organisation,
+    Proprietaire,
+    Activite,
+    Assureur,
+    Navire,
+    Assurance,
+    Moteur,
+    Visite,
+    Dossier,
+    MetaDonne,
+    ArchiveVisite,
+    ArchiveDossier,
+    ArchiveAssurance,
 )
 
-admin.site.register(Proprietaire)
-admin.site.register(Activite)
-admin.site.register(Assureur)
-admin.site.register(Navire)
-admin.site.register(Assurance)
-admin.site.register(Moteur)
-admin.site.register(Visite)
-admin.site.register(Dossier)
-admin.site.register(MetaDonne)
+# Recherche indexée des documents par leur navire
+RECHERCHE_NAVIRE = ('^navire__nom_navire', '=navire__num_immatricule')
+
+
+class AdminVolumineux(admin.ModelAdmin):
+    """Réglages communs des changelists volumineuses."""
+    show_full_result_count = False
+    list_per_page = 50
+
+
+@admin.register(Organisation)
+class OrganisationAdmin(admin.ModelAdmin):
+    list_display = ('nom', 'slug', 'domaine')
+    search_fields = ('nom', 'slug', 'domaine')
+    prepopulated_fields = {'slug': ('nom',)}
+
+
+@admin.register(Proprietaire)
+class ProprietaireAdmin(AdminVolumineux):
+    list_display = ('nom_proprietaire', 'type_proprietaire', 'contact')
+    list_filter = ('type_proprietaire',)
+    search_fields = ('^nom_proprietaire',)
+    ordering = ('nom_proprietaire', 'id')
+
+
+@admin.register(Activite)
+class ActiviteAdmin(admin.ModelAdmin):
+    search_fields = ('nom_activite',)
+    ordering = ('nom_activite',)
+
+
+@admin.register(Assureur)
+class AssureurAdmin(admin.ModelAdmin):
+    search_fields = ('nom_assureur',)
+    ordering = ('nom_assureur',)
+
+
+class HistoriqueRecentFormSet(BaseInlineFormSet):
+    """Formset limité aux `nombre_lignes` premières lignes du queryset (les plus récentes)."""
+    nombre_lignes = None
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            # Le queryset est déjà filtré sur le navire et trié : le LIMIT suit l'index (navire, date, id)
+            self._queryset = super().get_queryset()[:self.nombre_lignes]
+        return self._queryset
+
+
+class HistoriqueInline(admin.TabularInline):
+    """Documents datés d'un navire : seules les `nombre_lignes` plus récentes sont affichées."""
+    extra = 0
+    formset = HistoriqueRecentFormSet
+    nombre_lignes = 20
+    ordre = ()
+    relations = ('navire',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(*self.relations).order_by(*self.ordre)
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.nombre_lignes = self.nombre_lignes
+        return formset
+
+
+class AssuranceInline(HistoriqueInline):
+    model = Assurance
+    ordre = ('-date_debut', '-id')
+    relations = ('navire', 'assureur')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'assureur':
+            # Référentiel court : choix lus une fois pour toutes les lignes (l'autocomplétion
+            # relirait l'assureur sélectionné de chaque ligne)
+            formfield.choices = list(formfield.choices)
+        return formfield
+
+
+class VisiteInline(HistoriqueInline):
+    model = Visite
+    ordre = ('-date_visite', '-id')
+
+
+class DossierInline(HistoriqueInline):
+    model = Dossier
+    ordre = ('-date_emission', '-id')
+
+
+class MoteurInline(admin.TabularInline):
+    model = Moteur
+    extra = 0
+
+
+@admin.register(Navire)
+class NavireAdmin(AdminVolumineux):
+    list_display = ('nom_navire', 'num_immatricule', 'type_navire', 'proprietaire', 'statut_global',
+                    'prochaine_echeance')
+    list_select_related = ('proprietaire',)
+    # Index (organisation, statut_global, prochaine_echeance)
+    list_filter = ('statut_global',)
+    search_fields = ('^nom_navire', '=num_immatricule')
+    # Index (organisation, nom_navire, id)
+    ordering = ('nom_navire', 'id')
+    autocomplete_fields = ('proprietaire', 'activites')
+    readonly_fields = ('statut_global', 'prochaine_echeance', 'nb_expires', 'nb_bientot', 'historique_complet')
+    inlines = (AssuranceInline, VisiteInline, DossierInline, MoteurInline)
+
+    @admin.display(description="Historique complet")
+    def historique_complet(self, obj):
+        """Liens vers les listes filtrées sur le navire (les lignes n'en montrent que les plus récents)."""
+        if obj is None or obj.pk is None:
+            return '-'
+        return format_html_join(' | ', '<a href="{}?navire__id__exact={}">{}</a>', (
+            (reverse(f'admin:api_{modele._meta.model_name}_changelist'), obj.pk, modele._meta.verbose_name_plural)
+            for modele in (Assurance, Visite, Dossier)
+        ))
+
+
+class DocumentNavireAdmin(AdminVolumineux):
+    list_select_related = ('navire',)
+    search_fields = RECHERCHE_NAVIRE
+    autocomplete_fields = ('navire',)
+
+
+@admin.register(Assurance)
+class AssuranceAdmin(DocumentNavireAdmin):
+    list_display = ('__str__', 'date_debut', 'date_fin')
+    list_select_related = ('navire', 'assureur')
+    autocomplete_fields = ('navire', 'assureur')
+    date_hierarchy = 'date_fin'
+
+
+@admin.register(Moteur)
+class MoteurAdmin(DocumentNavireAdmin):
+    list_display = ('nom_moteur', 'puissance', 'navire')
+
+
+@admin.register(Visite)
+class VisiteAdmin(DocumentNavireAdmin):
+    list_display = ('__str__', 'lieu_visite', 'expiration_permis')
+    date_hierarchy = 'expiration_permis'
+
+
+@admin.register(Dossier)
+class DossierAdmin(DocumentNavireAdmin):
+    list_display = ('__str__', 'date_emission', 'date_expiration')
+    date_hierarchy = 'date_expiration'
+
+
+@admin.register(MetaDonne)
+class MetaDonneAdmin(DocumentNavireAdmin):
+    list_display = ('nom_meta_donne', 'type_meta_donne', 'navire')
+    list_filter = ('type_meta_donne',)
+
+
+class ArchiveAdmin(DocumentNavireAdmin):
+    """Documents archivés (api/archives.py) : consultation seule."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchiveVisite)
+class ArchiveVisiteAdmin(ArchiveAdmin):
+    list_display = ('navire', 'date_visite', 'expiration_permis', 'lieu_visite', 'date_archivage')
+
+
+@admin.register(ArchiveDossier)
+class ArchiveDossierAdmin(ArchiveAdmin):
+    list_display = ('navire', 'type_dossier', 'date_emission', 'date_expiration', 'date_archivage')
+
+
+@admin.register(ArchiveAssurance)
+class ArchiveAssuranceAdmin(ArchiveAdmin):
+    list_display = ('navire', 'assureur', 'date_debut', 'date_fin', 'date_archivage')
+    list_select_related = ('navire', 'assureur')
@@ -0,0 +1,89 @@
+"""
+Contrôle d'admission des exports lourds (CSV de flotte, XLSX, Parquet, fiches PDF).
+
+- Limitation de débit par client : ScopedRateThrottle de DRF, portées 'exports' et
+  'exports_pdf' (REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']), déclarées sur les actions
+  avec @action(..., throttle_scope=...).
+- Sémaphore global : au plus settings.EXPORTS_SIMULTANES exports en cours sur l'ensemble
+  des processus. Chaque place est une clé du cache prise avec cache.add (atomique sous
+  Redis) ; il faut donc un cache partagé (CACHE_URL) pour que la limite soit globale.
+  Une requête sans place attend au plus settings.EXPORTS_ATTENTE_MAX secondes, puis
+  reçoit 429 avec Retry-After : les autres workers restent libres pour les requêtes
+  interactives. Les exports PDF combinés (tâche en arrière-plan) restent EN_ATTENTE
+  jusqu'à ce qu'une place se libère : la commande executer_exports attend tant qu'il le
+  faut, un thread du processus web au plus settings.EXPORTS_ATTENTE_TACHE secondes.
+- Une place est un bail de DUREE_BAIL secondes, prolongé par les tâches longues : un
+  processus tué en plein export ne la bloque pas indéfiniment.
+"""
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+
+PREFIXE_PLACES = 'admission:exports'
+DUREE_BAIL = 5 * 60
+INTERVALLE_ATTENTE = 0.25
+
+
+def nombre_places():
+    return getattr(settings, 'EXPORTS_SIMULTANES', 4)
+
+
+def prendre_place(attente_max=0):
+    """
+    Réserve une place d'export : (clé, jeton) à rendre avec rendre_place(), ou None si
+    aucune ne s'est libérée dans le délai (attente_max=None : attente sans limite).
+    """
+    jeton = uuid.uuid4().hex
+    echeance = None if attente_max is None else time.monotonic() + attente_max
+    while True:
+        for index in range(nombre_places()):
+            cle = f"{PREFIXE_PLACES}:{index}"
+            if cache.add(cle, jeton, DUREE_BAIL):
+                return cle, jeton
+        if echeance is not None and time.monotonic() >= echeance:
+            return None
+        time.sleep(INTERVALLE_ATTENTE)
+
+
+def prolonger_place(place):
+    cle, _jeton = place
+    cache.touch(cle, DUREE_BAIL)
+
+
+def rendre_place(place):
+    cle, jeton = place
+    # Le bail a pu expirer et la place être reprise par un autre export
+    if cache.get(cle) == jeton:
+        cache.delete(cle)
+
+
+@contextmanager
+def place_export():
+    """
+    Occupe une place du sémaphore pour la durée du bloc, ou lève Throttled (429,
+    Retry-After: settings.EXPORTS_RETRY_AFTER) si aucune ne se libère à temps.
+    """
+    place = prendre_place(getattr(settings, 'EXPORTS_ATTENTE_MAX', 5))
+    if place is None:
+        raise Throttled(
+            wait=getattr(settings, 'EXPORTS_RETRY_AFTER', 30),
+            detail="Trop d'exports en cours, réessayez dans quelques instants.",
+        )
+    try:
+        yield
+    finally:
+        rendre_place(place)
+
+
+def export_lourd(vue):
+    """Décorateur des actions d'export : la génération s'exécute dans une place_export()."""
+    @wraps(vue)
+    def envelopper(self, request, *args, **kwargs):
+        with place_export():
+            return vue(self, request, *args, **kwargs)
+    return envelopper
@@ -0,0 +1,317 @@
+"""
+Ingestion des positions AIS (phrases NMEA !AIVDM / !AIVDO).
+
+- AssembleurNMEA : vérifie la somme de contrôle, lit l'éventuel bloc de balises
+  (\\c:<horodatage unix>\\) et réassemble les messages en plusieurs fragments.
+- decoder_position : décode les comptes rendus de position (types 1, 2, 3 classe A,
+  18 et 19 classe B) directement sur l'entier formé par la charge utile 6 bits.
+- IngesteurAIS : associe le MMSI au navire via une table en mémoire (aucune requête
+  par message), insère les positions par lots dans PositionAIS (executemany) et tient
+  à jour DernierePosition (une ligne par navire, pour la carte).
+"""
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import DernierePosition, Navire, PositionAIS
+from .positions import cellule_grille
+
+logger = logging.getLogger(__name__)
+
+TYPES_CLASSE_A = (1, 2, 3)
+TYPES_CLASSE_B = (18, 19)
+
+# Valeurs « non disponible » définies par la norme (unités AIS)
+LONGITUDE_NON_DISPONIBLE = 181 * 600000
+LATITUDE_NON_DISPONIBLE = 91 * 600000
+VITESSE_NON_DISPONIBLE = 1023
+ROUTE_NON_DISPONIBLE = 3600
+CAP_NON_DISPONIBLE = 511  # toute valeur >= 360 est invalide
+
+CHAMPS_POSITION = ['navire', 'horodatage', 'latitude_ais', 'longitude_ais', 'vitesse', 'route', 'cap',
+                   'statut_navigation']
+
+# Caractère de la charge utile -> valeur 6 bits
+_VALEURS_6_BITS = {chr(c): (c - 48 if c - 48 < 40 else c - 56) for c in range(48, 120) if not 88 <= c <= 95}
+
+
+def somme_controle_valide(phrase):
+    """phrase : texte entre '!' et '*', suivi de la somme hexadécimale."""
+    corps, _, attendu = phrase.partition('*')
+    calcul = 0
+    for caractere in corps:
+        calcul ^= ord(caractere)
+    try:
+        return calcul == int(attendu[:2], 16)
+    except ValueError:
+        return False
+
+
+def _horodatage_balises(bloc):
+    """Extrait le champ c: (secondes, ou millisecondes, depuis 1970) d'un bloc de balises NMEA 4.0."""
+    for champ in bloc.split('*')[0].split(','):
+        if champ.startswith('c:'):
+            try:
+                valeur = int(champ[2:])
+            except ValueError:
+                return None
+            if valeur > 10 ** 11:
+                valeur //= 1000
+            return datetime.fromtimestamp(valeur, tz=dt_timezone.utc)
+    return None
+
+
+class AssembleurNMEA:
+    """Transforme des lignes NMEA en charges utiles AIS complètes."""
+
+    def __init__(self):
+        self.fragments = {}
+        self.erreurs = 0
+
+    def ajouter(self, ligne):
+        """Retourne (charge_utile, horodatage ou None) quand un message est complet, sinon None."""
+        ligne = ligne.strip()
+        horodatage = None
+        if ligne.startswith('\\'):
+            bloc, _, ligne = ligne[1:].partition('\\')
+            horodatage = _horodatage_balises(bloc)
+
+        debut = ligne.find('!')
+        if debut < 0 or ligne[debut + 3:debut + 6] not in ('VDM', 'VDO'):
+            return None
+        phrase = ligne[debut + 1:]
+        if not somme_controle_valide(phrase):
+            self.erreurs += 1
+            return None
+
+        champs = phrase.split('*')[0].split(',')
+        if len(champs) < 7:
+            self.erreurs += 1
+            return None
+        total, numero, sequence, canal, charge = champs[1], champs[2], champs[3], champs[4], champs[5]
+
+        if total == '1':
+            return charge, horodatage
+
+        cle = (sequence, canal)
+        if numero == '1':
+            # Le bloc de balises n'accompagne souvent que le premier fragment
+            self.fragments[cle] = ([charge], horodatage)
+        elif cle in self.fragments:
+            self.fragments[cle][0].append(charge)
+        else:
+            return None
+        if numero == total:
+            charges, horodatage_premier = self.fragments.pop(cle)
+            return ''.join(charges), horodatage or horodatage_premier
+        return None
+
+
+def _bits(charge):
+    """Charge utile -> (entier, nombre de bits)."""
+    valeur = 0
+    for caractere in charge:
+        valeur = (valeur << 6) | _VALEURS_6_BITS[caractere]
+    return valeur, 6 * len(charge)
+
+
+def _non_signe(valeur, total, debut, longueur):
+    return (valeur >> (total - debut - longueur)) & ((1 << longueur) - 1)
+
+
+def _signe(valeur, total, debut, longueur):
+    resultat = _non_signe(valeur, total, debut, longueur)
+    if resultat & (1 << (longueur - 1)):
+        resultat -= 1 << longueur
+    return resultat
+
+
+def type_message(charge):
+    return _VALEURS_6_BITS.get(charge[:1], -1)
+
+
+def mmsi_message(charge):
+    """MMSI (bits 8 à 37) sans décoder le reste du message."""
+    if len(charge) < 7:
+        return None
+    valeur, total = _bits(charge[:7])
+    return _non_signe(valeur, total, 8, 30)
+
+
+def decoder_position(charge):
+    """
+    Décode un compte rendu de position. Retourne un dict en unités AIS entières
+    (voir PositionAIS) ou None si le type n'est pas géré, le message tronqué ou la
+    position non disponible.
+    """
+    type_msg = type_message(charge)
+    if type_msg in TYPES_CLASSE_A:
+        decalage, statut = 0, True
+    elif type_msg in TYPES_CLASSE_B:
+        decalage, statut = -4, False
+    else:
+        return None
+    try:
+        valeur, total = _bits(charge)
+    except KeyError:
+        return None
+    if total < 137 + decalage + 6:
+        return None
+
+    longitude = _signe(valeur, total, 61 + decalage, 28)
+    latitude = _signe(valeur, total, 89 + decalage, 27)
+    if longitude == LONGITUDE_NON_DISPONIBLE or latitude == LATITUDE_NON_DISPONIBLE:
+        return None
+    if abs(longitude) > 180 * 600000 or abs(latitude) > 90 * 600000:
+        return None
+
+    vitesse = _non_signe(valeur, total, 50 + decalage, 10)
+    route = _non_signe(valeur, total, 116 + decalage, 12)
+    cap = _non_signe(valeur, total, 128 + decalage, 9)
+    return {
+        'mmsi': _non_signe(valeur, total, 8, 30),
+        'latitude_ais': latitude,
+        'longitude_ais': longitude,
+        'vitesse': None if vitesse == VITESSE_NON_DISPONIBLE else vitesse,
+        'route': None if route >= ROUTE_NON_DISPONIBLE else route,
+        'cap': None if cap >= 360 else cap * 10,
+        'statut_navigation': _non_signe(valeur, total, 38, 4) if statut else None,
+    }
+
+
+def table_mmsi():
+    """MMSI (entier) -> id du navire, pour les navires dont le MMSI est renseigné."""
+    table = {}
+    for navire_id, mmsi in Navire.objects.exclude(mmsi='').values_list('id', 'mmsi').iterator():
+        mmsi = mmsi.strip()
+        if not mmsi.isdigit():
+            continue
+        if int(mmsi) in table:
+            logger.warning(f"MMSI {mmsi} partagé par plusieurs navires, navire {navire_id} retenu.")
+        table[int(mmsi)] = navire_id
+    return table
+
+
+class IngesteurAIS:
+    """
+    Reçoit des lignes NMEA, garde les positions des navires connus et les écrit
+    par lots (taille_lot positions ou toutes les `intervalle` secondes).
+    La table MMSI est rechargée toutes les `rafraichissement` secondes.
+    """
+
+    def __init__(self, taille_lot=2000, intervalle=1.0, rafraichissement=300, ecrire=True):
+        self.taille_lot = taille_lot
+        self.intervalle = intervalle
+        self.rafraichissement = rafraichissement
+        self.ecrire = ecrire
+        self.assembleur = AssembleurNMEA()
+        self.tampon = []
+        self.stats = Counter()
+        self.navires = {}
+        self._dernier_chargement = 0
+        self._derniere_ecriture = time.monotonic()
+        self.charger_navires()
+
+    def charger_navires(self):
+        self.navires = table_mmsi()
+        self._dernier_chargement = time.monotonic()
+
+    def traiter_ligne(self, ligne, recu_le=None):
+        self.stats['lignes'] += 1
+        message = self.assembleur.ajouter(ligne)
+        if message is None:
+            return
+        charge, horodatage = message
+        self.stats['messages'] += 1
+
+        navire_id = self.navires.get(mmsi_message(charge))
+        if navire_id is None:
+            self.stats['ignores'] += 1
+            return
+        position = decoder_position(charge)
+        if position is None:
+            self.stats['ignores'] += 1
+            return
+
+        self.tampon.append((
+            navire_id, horodatage or recu_le or timezone.now(), position['latitude_ais'],
+            position['longitude_ais'], position['vitesse'], position['route'], position['cap'],
+            position['statut_navigation'],
+        ))
+        self.stats['positions'] += 1
+        if len(self.tampon) >= self.taille_lot:
+            self.vider()
+
+    def tic(self):
+        """À appeler régulièrement (même sans message) : écriture périodique et rechargement des MMSI."""
+        maintenant = time.monotonic()
+        if self.tampon and maintenant - self._derniere_ecriture >= self.intervalle:
+            self.vider()
+        if maintenant - self._dernier_chargement >= self.rafraichissement:
+            self.charger_navires()
+
+    def vider(self):
+        positions, self.tampon = self.tampon, []
+        self._derniere_ecriture = time.monotonic()
+        if positions and self.ecrire:
+            with transaction.atomic():
+                _inserer(positions)
+                _mettre_a_jour_dernieres(positions)
+            self.stats['ecrites'] += len(positions)
+
+
+def _inserer(positions):
+    """
+    INSERT paramétré en executemany (comme conformite._ecrire) : bulk_create() instancie
+    un modèle par position et compile une requête par lot, ce qui double le coût d'ingestion.
+    """
+    qn = connection.ops.quote_name
+    meta = PositionAIS._meta
+    requete = "INSERT INTO {} ({}) VALUES ({})".format(
+        qn(meta.db_table),
+        ', '.join(qn(meta.get_field(champ).column) for champ in CHAMPS_POSITION),
+        ', '.join(['%s'] * len(CHAMPS_POSITION)),
+    )
+    adapter = connection.ops.adapt_datetimefield_value
+    parametres = [(ligne[0], adapter(ligne[1]), *ligne[2:]) for ligne in positions]
+    with connection.cursor() as cursor:
+        cursor.executemany(requete, parametres)
+
+
+def _mettre_a_jour_dernieres(positions):
+    """
+    Upsert de la position la plus récente de chaque navire du lot. La clause WHERE du
+    ON CONFLICT (PostgreSQL et SQLite >= 3.24) ignore les messages arrivés en retard.
+    """
+    dernieres = {}
+    for ligne in positions:
+        if ligne[0] not in dernieres or ligne[1] > dernieres[ligne[0]][1]:
+            dernieres[ligne[0]] = ligne
+
+    qn = connection.ops.quote_name
+    meta = DernierePosition._meta
+    table = qn(meta.db_table)
+    colonnes = [qn(meta.get_field(champ).column) for champ in CHAMPS_POSITION + ['cellule']]
+    horodatage = qn(meta.get_field('horodatage').column)
+    requete = (
+        "INSERT INTO {table} ({colonnes}) VALUES ({valeurs}) "
+        "ON CONFLICT ({cle}) DO UPDATE SET {maj} WHERE {table}.{horodatage} < excluded.{horodatage}"
+    ).format(
+        table=table,
+        colonnes=', '.join(colonnes),
+        valeurs=', '.join(['%s'] * len(colonnes)),
+        cle=qn(meta.pk.column),
+        maj=', '.join(f"{colonne} = excluded.{colonne}" for colonne in colonnes[1:]),
+        horodatage=horodatage,
+    )
+    adapter = connection.ops.adapt_datetimefield_value
+    parametres = [
+        (ligne[0], adapter(ligne[1]), *ligne[2:], cellule_grille(ligne[2], ligne[3]))
+        for ligne in dernieres.values()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(requete, parametres)
@@ -0,0 +1,102 @@
+"""
+Archivage des documents échus (visites, dossiers, assurances).
+
+Un document échu depuis plus de la durée de rétention et remplacé par un document plus
+récent du même navire (du même type pour les dossiers) est déplacé vers une table
+d'archive de même structure (ArchiveVisite, ArchiveDossier, ArchiveAssurance), avec son
+identifiant. Le dernier document de chaque sorte reste toujours dans la table courante :
+un navire dont le permis n'a jamais été renouvelé reste signalé expiré.
+
+Les tables courantes, parcourues par les alertes, la conformité et la fiche navire, restent
+ainsi petites ; l'historique complet se lit à la demande avec ?archives=1 sur /visites/,
+/dossiers/ et /assurances/.
+
+Le déplacement se fait par lots en SQL (INSERT ... SELECT puis DELETE dans une même
+transaction), sans signaux : la conformité des navires concernés est recalculée, les
+caches invalidés et un événement 'conformite' publié une fois à la fin (commande
+archiver_documents).
+"""
+import logging
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .cache import invalider_cache
+from .conformite import recalculer_conformite
+from .evenements import publier
+from .models import ArchiveAssurance, ArchiveDossier, ArchiveVisite, Assurance, Dossier, Visite
+
+logger = logging.getLogger(__name__)
+
+RETENTION_JOURS = 2 * 365
+TAILLE_LOT_ARCHIVAGE = 2000
+
+# modèle courant, modèle d'archive, champ d'échéance, champs définissant une « sorte » de document
+ARCHIVES = [
+    (Visite, ArchiveVisite, 'expiration_permis', ()),
+    (Dossier, ArchiveDossier, 'date_expiration', ('type_dossier',)),
+    (Assurance, ArchiveAssurance, 'date_fin', ()),
+]
+
+
+def documents_archivables(modele, champ, sorte, limite):
+    """Documents échus avant `limite` pour lesquels le navire a un document plus récent de la même sorte."""
+    plus_recent = modele.objects.toutes_organisations().filter(
+        Q(**{f'{champ}__gt': OuterRef(champ)}) | Q(**{champ: OuterRef(champ), 'pk__gt': OuterRef('pk')}),
+        navire_id=OuterRef('navire_id'),
+        **{cle: OuterRef(cle) for cle in sorte},
+    )
+    return modele.objects.toutes_organisations().filter(**{f'{champ}__lt': limite}).filter(Exists(plus_recent))
+
+
+def _deplacer(modele, archive, ids, horodatage):
+    qn = connection.ops.quote_name
+    colonnes = ', '.join(qn(champ.column) for champ in modele._meta.concrete_fields)
+    table, table_archive = qn(modele._meta.db_table), qn(archive._meta.db_table)
+    cle, date_archivage = qn(modele._meta.pk.column), qn(archive._meta.get_field('date_archivage').column)
+    marques = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table_archive} ({colonnes}, {date_archivage}) "
+            f"SELECT {colonnes}, %s FROM {table} WHERE {cle} IN ({marques})",
+            [horodatage, *ids],
+        )
+        cursor.execute(f"DELETE FROM {table} WHERE {cle} IN ({marques})", ids)
+
+
+def archiver_documents(retention_jours=RETENTION_JOURS, taille_lot=TAILLE_LOT_ARCHIVAGE, ecrire=True, today=None):
+    """
+    Déplace les documents archivables vers les tables d'archive.
+    Retourne {nom du modèle: nombre de documents} (à déplacer si ecrire=False).
+    """
+    limite = (today or date.today()) - timedelta(days=retention_jours)
+    horodatage = timezone.now()
+    resultats = {}
+    navire_ids = set()
+
+    for modele, archive, champ, sorte in ARCHIVES:
+        archivables = documents_archivables(modele, champ, sorte, limite)
+        if not ecrire:
+            resultats[modele.__name__] = archivables.count()
+            continue
+
+        total = 0
+        while True:
+            lot = list(archivables.order_by('pk').values_list('pk', 'navire_id')[:taille_lot])
+            if not lot:
+                break
+            with transaction.atomic():
+                _deplacer(modele, archive, [pk for pk, _ in lot], horodatage)
+            navire_ids.update(navire_id for _, navire_id in lot)
+            total += len(lot)
+        resultats[modele.__name__] = total
+        logger.info(f"{total} {modele._meta.verbose_name_plural.lower()} archivé(e)s (échéance < {limite}).")
+
+    if navire_ids:
+        recalculer_conformite(sorted(navire_ids))
+        invalider_cache('flotte')
+        invalider_cache('lectures')
+        publier('conformite', None, navires_modifies=len(navire_ids))
+    return resultats
@@ -0,0 +1,98 @@
+"""
+Invalidation du cache applicatif par groupe.
+
+Chaque groupe (ex: 'flotte') possède un numéro de version stocké dans le cache, commun
+à toutes les organisations, et un numéro par organisation ; les clés construites avec
+cle_cache() incluent les deux. Incrémenter une version (invalider_cache) rend d'un coup
+obsolètes toutes les entrées du groupe, ou seulement celles d'une organisation : une
+écriture dans une organisation ne vide pas le cache des autres.
+Les clés incluent aussi l'organisation courante : une organisation ne lit jamais
+les entrées calculées pour une autre (voir api/organisations.py).
+
+calculer_une_fois() coalesce les calculs identiques simultanés (« single flight »).
+"""
+import time
+
+from django.core.cache import cache
+
+from .organisations import organisation_courante
+
+DUREE_VERSION = None  # les versions ne doivent pas expirer
+
+
+def _cle_version(groupe, organisation_id=None):
+    if organisation_id is None:
+        return f"version:{groupe}"
+    return f"version:{groupe}:org{organisation_id}"
+
+
+def version_cache(groupe, organisation_id=None):
+    cle = _cle_version(groupe, organisation_id)
+    version = cache.get(cle)
+    if version is None:
+        cache.add(cle, 1, DUREE_VERSION)
+        version = cache.get(cle, 1)
+    return version
+
+
+def cle_cache(groupe, *parties):
+    organisation = organisation_courante()
+    version = str(version_cache(groupe))
+    if organisation is not None:
+        version = f"{version}.{version_cache(groupe, organisation)}"
+    return ":".join([groupe, version, f"org{organisation or '-'}", *[str(p) for p in parties]])
+
+
+def invalider_cache(groupe, organisation_id=None):
+    """Invalide le groupe pour une organisation, ou pour toutes (organisation_id None)."""
+    cle = _cle_version(groupe, organisation_id)
+    try:
+        cache.incr(cle)
+    except ValueError:
+        cache.set(cle, 2, DUREE_VERSION)
+
+
+# ----------------------------------------------------------------------
+# COALESCENCE DES CALCULS IDENTIQUES SIMULTANÉS
+# ----------------------------------------------------------------------
+
+DUREE_RESULTAT = 5
+DUREE_VERROU = 60
+# Un appelant en attente occupe un worker : au-delà, il calcule lui-même
+ATTENTE_MAX = DUREE_RESULTAT
+INTERVALLE_ATTENTE = 0.05
+
+
+def calculer_une_fois(cle, calcul, duree=DUREE_RESULTAT, attente_max=ATTENTE_MAX):
+    """
+    Résultat de calcul() mis en cache `duree` secondes sous `cle` (construite avec cle_cache).
+    Le premier appelant prend le verrou (cache.add, partagé entre processus avec Redis) et
+    calcule ; les appels identiques simultanés attendent son résultat au lieu de recalculer.
+    Si le calcul échoue, renvoie None ou dépasse attente_max, ils calculent eux-mêmes.
+    """
+    resultat = cache.get(cle)
+    if resultat is not None:
+        return resultat
+
+    verrou = f"{cle}:calcul"
+    if not cache.add(verrou, 1, DUREE_VERROU):
+        echeance = time.monotonic() + attente_max
+        while time.monotonic() < echeance:
+            time.sleep(INTERVALLE_ATTENTE)
+            # Verrou lu avant le résultat : le premier appelant dépose le résultat avant de libérer
+            termine = cache.get(verrou) is None
+            resultat = cache.get(cle)
+            if resultat is not None:
+                return resultat
+            if termine:
+                # Calcul terminé sans résultat (erreur) : pas d'attente supplémentaire
+                break
+        return calcul()
+
+    try:
+        resultat = calcul()
+        if resultat is not None:
+            cache.set(cle, resultat, duree)
+        return resultat
+    finally:
+        cache.delete(verrou)
@@ -0,0 +1,131 @@
+"""
+Vérifications de configuration ayant un impact sur les performances (tag 'performance').
+Enregistrées comme vérifications de déploiement : exécutées par la commande
+verifier_configuration (à lancer au démarrage du service) et par check --deploy.
+"""
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+TAG_PERFORMANCE = 'performance'
+
+
+@register(TAG_PERFORMANCE, Tags.database, deploy=True)
+def verifier_base_de_donnees(app_configs, **kwargs):
+    problemes = []
+    for alias, config in settings.DATABASES.items():
+        if not config.get('CONN_MAX_AGE'):
+            problemes.append(Warning(
+                f"DATABASES['{alias}'] n'a pas de CONN_MAX_AGE : une connexion est ouverte à chaque requête.",
+                hint="Définir DB_CONN_MAX_AGE (ex. 60) ; CONN_HEALTH_CHECKS évite de réutiliser une connexion coupée.",
+                id='api.W001',
+            ))
+    for alias in getattr(settings, 'DATABASE_REPLICAS', []):
+        if alias not in settings.DATABASES:
+            problemes.append(Error(
+                f"Le réplica '{alias}' de DATABASE_REPLICAS n'est pas défini dans DATABASES.",
+                id='api.E002',
+            ))
+    return problemes
+
+
+@register(TAG_PERFORMANCE, deploy=True)
+def verifier_mode_production(app_configs, **kwargs):
+    problemes = []
+    if settings.DEBUG:
+        problemes.append(Warning(
+            "DEBUG est actif : chaque requête SQL est conservée en mémoire et les médias "
+            "sont servis par Django.",
+            hint="DJANGO_ENV=prod (ou DJANGO_DEBUG=0) hors développement.",
+            id='api.W003',
+        ))
+        return problemes
+
+    renderers = settings.REST_FRAMEWORK.get('DEFAULT_RENDERER_CLASSES', [])
+    if any(renderer.endswith('BrowsableAPIRenderer') for renderer in renderers):
+        problemes.append(Warning(
+            "BrowsableAPIRenderer est actif hors DEBUG : rendu HTML coûteux des réponses.",
+            id='api.W004',
+        ))
+
+    if not any(renderer.endswith('RenduJSON') for renderer in renderers):
+        problemes.append(Warning(
+            "Le rendu JSON n'utilise pas api.rendus_json.RenduJSON (orjson).",
+            id='api.W010',
+        ))
+    else:
+        from .rendus_json import orjson
+        if orjson is None:
+            problemes.append(Warning(
+                "orjson n'est pas installé : le rendu JSON utilise le module json standard.",
+                hint="pip install orjson",
+                id='api.W011',
+            ))
+
+    cache = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if cache.endswith(('LocMemCache', 'DummyCache')):
+        problemes.append(Warning(
+            "Le cache par défaut n'est pas partagé entre processus : statistiques, limitation de "
+            "débit, places d'export simultanées et invalidations ne valent que pour un seul worker.",
+            hint="Définir CACHE_URL (ex. redis://localhost:6379/0).",
+            id='api.W005',
+        ))
+
+    if not getattr(settings, 'MEDIA_SENDFILE_BACKEND', None):
+        problemes.append(Warning(
+            "Les médias sont envoyés par les workers Django (MEDIA_SENDFILE_BACKEND non défini).",
+            hint="MEDIA_SENDFILE_BACKEND=x-accel-redirect derrière nginx.",
+            id='api.W006',
+        ))
+
+    if getattr(settings, 'EXPORTS_DANS_LE_PROCESSUS', False):
+        problemes.append(Warning(
+            "Les exports PDF combinés sont exécutés par des threads des workers web : un "
+            "redémarrage les interrompt sans reprise.",
+            hint="EXPORTS_DANS_LE_PROCESSUS=0 et un service « manage.py executer_exports ».",
+            id='api.W012',
+        ))
+    return problemes
+
+
+@register(TAG_PERFORMANCE, deploy=True)
+def verifier_templates_et_journal(app_configs, **kwargs):
+    problemes = []
+    for moteur in settings.TEMPLATES:
+        loaders = moteur.get('OPTIONS', {}).get('loaders')
+        # Sans 'loaders' explicite, Django active lui-même le chargeur en cache
+        if loaders and not any(
+            isinstance(loader, (list, tuple)) and loader[0].endswith('cached.Loader') for loader in loaders
+        ):
+            problemes.append(Warning(
+                "Le chargeur de templates en cache n'est pas utilisé : les fiches PDF sont "
+                "recompilées à chaque rendu.",
+                id='api.W007',
+            ))
+
+    niveau = (getattr(settings, 'LOGGING', {}).get('loggers', {})
+              .get('django.db.backends', {}).get('level'))
+    if niveau == 'DEBUG':
+        problemes.append(Warning(
+            "Le logger django.db.backends est au niveau DEBUG : chaque requête SQL est journalisée.",
+            id='api.W008',
+        ))
+
+    wkhtmltopdf = getattr(settings, 'PDFKIT_CONFIG', {}).get('wkhtmltopdf')
+    if not wkhtmltopdf or not os.path.exists(wkhtmltopdf):
+        problemes.append(Warning(
+            f"wkhtmltopdf introuvable ({wkhtmltopdf}) : les exports PDF échoueront.",
+            hint="Définir WKHTMLTOPDF_PATH.",
+            id='api.W009',
+        ))
+
+    qpdf = getattr(settings, 'QPDF_PATH', None)
+    if not qpdf or not os.path.exists(qpdf):
+        problemes.append(Warning(
+            f"qpdf introuvable ({qpdf}) : les PDF combinés sont réunis en mémoire par pypdf et "
+            f"limités à {settings.EXPORTS_PDF_MAX_NAVIRES_SANS_QPDF} fiches.",
+            hint="Installer qpdf ou définir QPDF_PATH.",
+            id='api.W013',
+        ))
+    return problemes
@@ -0,0 +1,125 @@
+"""
+Conformité des navires, précalculée dans les colonnes de Navire.
+
+Pour chaque navire, à partir des échéances de ses assurances (date_fin), visites
+(expiration_permis) et dossiers (date_expiration) :
+- prochaine_echeance : la plus proche échéance, y compris une échéance déjà dépassée
+  (tri « le plus urgent d'abord ») ;
+- nb_expires / nb_bientot : documents expirés / expirant dans les 30 jours ;
+- statut_global : 'expire', 'bientot', 'valide' ou 'inconnu' (aucune date d'échéance).
+
+Les colonnes sont tenues à jour par les signaux (api/signals.py) à chaque
+modification d'un document. Comme elles dépendent aussi de la date du jour, la
+commande recalculer_conformite doit être lancée quotidiennement (cron).
+"""
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, Min, Q
+
+DELAI_BIENTOT = 30
+
+# relation inverse depuis Navire, champ de date d'échéance
+DOCUMENTS_ECHEANCE = [
+    ('assurances', 'date_fin'),
+    ('visites', 'expiration_permis'),
+    ('dossiers', 'date_expiration'),
+]
+
+CHAMPS_CONFORMITE = ['prochaine_echeance', 'nb_expires', 'nb_bientot', 'statut_global']
+
+TAILLE_LOT_CONFORMITE = 2000
+
+
+def statut_global(nb_expires, nb_bientot, prochaine_echeance):
+    if nb_expires:
+        return 'expire'
+    if nb_bientot:
+        return 'bientot'
+    if prochaine_echeance:
+        return 'valide'
+    return 'inconnu'
+
+
+def _agreger(modele_navire, navire_ids, today, soon):
+    """Agrège les échéances des documents : une requête GROUP BY par table."""
+    agregats = {}
+    for relation, champ in DOCUMENTS_ECHEANCE:
+        modele = modele_navire._meta.get_field(relation).related_model
+        lignes = (
+            modele.objects.filter(navire_id__in=navire_ids, **{f'{champ}__isnull': False})
+            .values('navire_id')
+            .annotate(
+                prochaine=Min(champ),
+                expires=Count('pk', filter=Q(**{f'{champ}__lt': today})),
+                bientot=Count('pk', filter=Q(**{f'{champ}__gte': today, f'{champ}__lte': soon})),
+            )
+            .order_by()
+        )
+        for ligne in lignes:
+            prochaine, expires, bientot = agregats.get(ligne['navire_id'], (None, 0, 0))
+            if prochaine is None or ligne['prochaine'] < prochaine:
+                prochaine = ligne['prochaine']
+            agregats[ligne['navire_id']] = (prochaine, expires + ligne['expires'], bientot + ligne['bientot'])
+    return agregats
+
+
+def recalculer_conformite(navire_ids=None, today=None, modele_navire=None, taille_lot=TAILLE_LOT_CONFORMITE):
+    """
+    Recalcule les colonnes de conformité (tous les navires si navire_ids est None)
+    et n'écrit que les lignes modifiées. Retourne le nombre de navires mis à jour.
+    `modele_navire` permet l'appel depuis une migration (modèle historique).
+    """
+    if modele_navire is None:
+        from .models import Navire as modele_navire
+
+    today = today or date.today()
+    soon = today + timedelta(days=DELAI_BIENTOT)
+
+    navires = modele_navire.objects.order_by('pk')
+    if navire_ids is not None:
+        navires = navires.filter(pk__in=list(navire_ids))
+    ids = list(navires.values_list('pk', flat=True))
+
+    modifies = 0
+    for debut in range(0, len(ids), taille_lot):
+        lot_ids = ids[debut:debut + taille_lot]
+        agregats = _agreger(modele_navire, lot_ids, today, soon)
+        a_mettre_a_jour = []
+        for navire in modele_navire.objects.filter(pk__in=lot_ids).only('pk', *CHAMPS_CONFORMITE):
+            prochaine, expires, bientot = agregats.get(navire.pk, (None, 0, 0))
+            valeurs = {
+                'prochaine_echeance': prochaine,
+                'nb_expires': expires,
+                'nb_bientot': bientot,
+                'statut_global': statut_global(expires, bientot, prochaine),
+            }
+            if any(getattr(navire, champ) != valeur for champ, valeur in valeurs.items()):
+                for champ, valeur in valeurs.items():
+                    setattr(navire, champ, valeur)
+                a_mettre_a_jour.append(navire)
+        if a_mettre_a_jour:
+            _ecrire(modele_navire, a_mettre_a_jour)
+            modifies += len(a_mettre_a_jour)
+    return modifies
+
+
+def _ecrire(modele_navire, navires):
+    """
+    UPDATE paramétré exécuté en executemany : bulk_update() construit un CASE WHEN
+    par champ et par ligne, dont la compilation domine le temps de recalcul complet.
+    """
+    qn = connection.ops.quote_name
+    meta = modele_navire._meta
+    colonnes = [meta.get_field(champ).column for champ in CHAMPS_CONFORMITE]
+    requete = "UPDATE {} SET {} WHERE {} = %s".format(
+        qn(meta.db_table),
+        ', '.join(f"{qn(colonne)} = %s" for colonne in colonnes),
+        qn(meta.pk.column),
+    )
+    parametres = [
+        [getattr(navire, champ) for champ in CHAMPS_CONFORMITE] + [navire.pk]
+        for navire in navires
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(requete, parametres)
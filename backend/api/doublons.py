@@ -0,0 +1,366 @@
+"""
+Détection et fusion des doublons de navires et de propriétaires.
+
+Seul num_immatricule est unique : la saisie produit des variantes de noms, le même IMO
+sous deux immatriculations, des noms de propriétaires avec ou sans accents. Plutôt que
+de comparer toutes les paires (O(n²)), chaque fiche reçoit des clés de blocage et seules
+les fiches partageant une clé sont comparées :
+- nom normalisé (sans accents ni ponctuation) découpé en trigrammes ; seuls les
+  trigrammes les plus rares de chaque nom servent de clés (filtrage par préfixe : deux
+  noms de similarité de Jaccard >= SEUIL_NOM partagent forcément l'un d'eux) ;
+- IMO valide (chiffre de contrôle), MMSI, propriétaire pour les navires ;
+- contact (chiffres du téléphone) pour les propriétaires.
+Les blocs de plus de TAILLE_MAX_BLOC fiches (clés trop peu discriminantes) sont ignorés.
+
+Les paires sont ensuite notées entre 0 et 1 (raisons détaillées) et celles au-dessus du
+seuil proposées. La fusion rattache en masse les enfants du doublon à la fiche conservée,
+complète les champs vides de celle-ci puis supprime le doublon.
+
+La détection parcourt toute la flotte : elle n'est pas exécutée par les requêtes HTTP.
+La commande detecter_doublons (à planifier) enregistre le résultat de chaque organisation
+dans le stockage (exports/doublons/), que /doublons/ se contente de lire.
+"""
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import time
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalider_cache
+from .conformite import recalculer_conformite
+from .models import DernierePosition, Navire, Proprietaire
+from .organisations import organisation_courante
+
+logger = logging.getLogger(__name__)
+
+SEUIL_DOUBLON = 0.75
+SEUIL_NOM = 0.5
+TAILLE_MAX_BLOC = 200
+
+# Champs de la fiche conservée complétés depuis le doublon lorsqu'ils sont vides
+CHAMPS_COMPLETES = {
+    Navire: ['imo', 'mmsi', 'lieu_de_construction', 'annee_de_construction', 'nature_coque',
+             'proprietaire', 'photo_navire'],
+    Proprietaire: ['adresse', 'contact'],
+}
+
+
+# ----------------------------------------------------------------------
+# NORMALISATION ET CLÉS DE BLOCAGE
+# ----------------------------------------------------------------------
+
+def normaliser(texte):
+    """'Société  Générale-Marine' -> 'societe generale marine'."""
+    texte = unicodedata.normalize('NFKD', texte or '')
+    texte = ''.join(caractere for caractere in texte if not unicodedata.combining(caractere))
+    return ' '.join(re.findall(r'[a-z0-9]+', texte.lower()))
+
+
+def trigrammes(texte):
+    compact = normaliser(texte).replace(' ', '')
+    if len(compact) < 3:
+        return frozenset([compact]) if compact else frozenset()
+    borne = f'#{compact}#'
+    return frozenset(borne[i:i + 3] for i in range(len(borne) - 2))
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    commun = len(a & b)
+    return commun / (len(a) + len(b) - commun)
+
+
+def chiffres(texte):
+    return re.sub(r'\D', '', texte or '')
+
+
+def imo_valide(imo):
+    """Numéro IMO à 7 chiffres dont le dernier est le chiffre de contrôle, sinon ''."""
+    imo = chiffres(imo)
+    if len(imo) != 7 or imo == '0000000':
+        return ''
+    controle = sum(int(chiffre) * (7 - rang) for rang, chiffre in enumerate(imo[:6])) % 10
+    return imo if controle == int(imo[6]) else ''
+
+
+def mmsi_valide(mmsi):
+    mmsi = chiffres(mmsi)
+    return mmsi if len(mmsi) == 9 and len(set(mmsi)) > 1 else ''
+
+
+def _cles_nom(grammes, frequences):
+    """Trigrammes les plus rares du nom, en nombre suffisant pour le seuil SEUIL_NOM."""
+    if not grammes:
+        return []
+    nombre = len(grammes) - math.ceil(SEUIL_NOM * len(grammes)) + 1
+    return sorted(grammes, key=lambda gramme: (frequences[gramme], gramme))[:nombre]
+
+
+def _paires_candidates(fiches, cles_fiche):
+    blocs = defaultdict(list)
+    for fiche in fiches:
+        for cle in cles_fiche(fiche):
+            blocs[cle].append(fiche['id'])
+
+    paires = set()
+    ignores = 0
+    for ids in blocs.values():
+        if len(ids) < 2:
+            continue
+        if len(ids) > TAILLE_MAX_BLOC:
+            ignores += 1
+            continue
+        for rang, id_a in enumerate(ids):
+            for id_b in ids[rang + 1:]:
+                paires.add((id_a, id_b) if id_a < id_b else (id_b, id_a))
+    return paires, {'blocs': len(blocs), 'blocs_ignores': ignores, 'comparaisons': len(paires)}
+
+
+def _detecter(fiches, cles_fiche, noter, seuil):
+    debut = time.monotonic()
+    paires, stats = _paires_candidates(fiches, cles_fiche)
+    par_id = {fiche['id']: fiche for fiche in fiches}
+
+    candidats = []
+    for id_a, id_b in paires:
+        a, b = par_id[id_a], par_id[id_b]
+        score, raisons = noter(a, b)
+        if score >= seuil:
+            candidats.append({
+                'id_a': id_a, 'id_b': id_b, 'nom_a': a['nom'], 'nom_b': b['nom'],
+                'score': round(score, 3), 'raisons': raisons,
+            })
+    candidats.sort(key=lambda candidat: (-candidat['score'], candidat['id_a'], candidat['id_b']))
+
+    stats.update(fiches=len(fiches), candidats=len(candidats), duree=round(time.monotonic() - debut, 2))
+    logger.info(f"Détection des doublons : {stats}")
+    return candidats, stats
+
+
+# ----------------------------------------------------------------------
+# NAVIRES
+# ----------------------------------------------------------------------
+
+def _fiches_navires(queryset):
+    fiches = []
+    for pk, nom, imo, mmsi, proprietaire_id, annee, type_navire, lieu in queryset.values_list(
+        'id', 'nom_navire', 'imo', 'mmsi', 'proprietaire_id', 'annee_de_construction', 'type_navire',
+        'lieu_de_construction',
+    ).order_by('id').iterator(chunk_size=5000):
+        fiches.append({
+            'id': pk, 'nom': nom, 'grammes': trigrammes(nom), 'imo': imo_valide(imo),
+            'mmsi': mmsi_valide(mmsi), 'proprietaire': proprietaire_id, 'annee': annee,
+            'type': normaliser(type_navire), 'lieu': normaliser(lieu),
+        })
+    return fiches
+
+
+def noter_navires(a, b):
+    """
+    Score d'une paire de navires : 60 % similarité du nom, complétée par le propriétaire,
+    l'année, le type et le lieu de construction. Un IMO (ou MMSI) identique suffit ;
+    deux IMO valides différents désignent deux navires distincts.
+    """
+    similarite = jaccard(a['grammes'], b['grammes'])
+    score = 0.6 * similarite
+    raisons = [f"nom {similarite:.0%}"]
+    for champ, poids in (('proprietaire', 0.15), ('annee', 0.1), ('type', 0.1), ('lieu', 0.05)):
+        if a[champ] and a[champ] == b[champ]:
+            score += poids
+            raisons.append(champ)
+    if a['imo'] and a['imo'] == b['imo']:
+        score = max(score, 0.9 + 0.1 * similarite)
+        raisons.append('imo')
+    elif a['imo'] and b['imo']:
+        score = min(score, 0.5)
+        raisons.append('imo_different')
+    if a['mmsi'] and a['mmsi'] == b['mmsi']:
+        score = max(score, 0.85)
+        raisons.append('mmsi')
+    return min(score, 1.0), raisons
+
+
+def detecter_doublons_navires(seuil=SEUIL_DOUBLON, queryset=None):
+    """Retourne (candidats triés par score décroissant, statistiques)."""
+    fiches = _fiches_navires(queryset if queryset is not None else Navire.objects.all())
+    frequences = Counter(gramme for fiche in fiches for gramme in fiche['grammes'])
+
+    def cles(fiche):
+        yield from (('nom', gramme) for gramme in _cles_nom(fiche['grammes'], frequences))
+        if fiche['imo']:
+            yield 'imo', fiche['imo']
+        if fiche['mmsi']:
+            yield 'mmsi', fiche['mmsi']
+        if fiche['proprietaire']:
+            yield 'proprietaire', fiche['proprietaire']
+
+    return _detecter(fiches, cles, noter_navires, seuil)
+
+
+# ----------------------------------------------------------------------
+# PROPRIÉTAIRES
+# ----------------------------------------------------------------------
+
+def _fiches_proprietaires(queryset):
+    fiches = []
+    for pk, nom, contact, adresse in queryset.values_list(
+        'id', 'nom_proprietaire', 'contact', 'adresse'
+    ).order_by('id').iterator(chunk_size=5000):
+        telephone = chiffres(contact)
+        fiches.append({
+            'id': pk, 'nom': nom, 'grammes': trigrammes(nom),
+            'contact': telephone[-9:] if len(telephone) >= 6 else normaliser(contact),
+            'adresse': normaliser(adresse),
+        })
+    return fiches
+
+
+def noter_proprietaires(a, b):
+    """Score d'une paire de propriétaires : similarité du nom, + contact et adresse identiques."""
+    similarite = jaccard(a['grammes'], b['grammes'])
+    score = similarite
+    raisons = [f"nom {similarite:.0%}"]
+    for champ, bonus in (('contact', 0.3), ('adresse', 0.15)):
+        if a[champ] and a[champ] == b[champ]:
+            score += bonus
+            raisons.append(champ)
+    return min(score, 1.0), raisons
+
+
+def detecter_doublons_proprietaires(seuil=SEUIL_DOUBLON, queryset=None):
+    """Retourne (candidats triés par score décroissant, statistiques)."""
+    fiches = _fiches_proprietaires(queryset if queryset is not None else Proprietaire.objects.all())
+    frequences = Counter(gramme for fiche in fiches for gramme in fiche['grammes'])
+
+    def cles(fiche):
+        yield from (('nom', gramme) for gramme in _cles_nom(fiche['grammes'], frequences))
+        if fiche['contact']:
+            yield 'contact', fiche['contact']
+
+    return _detecter(fiches, cles, noter_proprietaires, seuil)
+
+
+# ----------------------------------------------------------------------
+# RÉSULTATS PRÉCALCULÉS (commande detecter_doublons, action /doublons/)
+# ----------------------------------------------------------------------
+
+def _nom_resultat(modele):
+    """Résultat de l'organisation courante pour `modele` ('navires' ou 'proprietaires')."""
+    return f"exports/doublons/{modele}-org{organisation_courante() or '-'}.json"
+
+
+def enregistrer_resultat(modele, seuil, candidats, stats):
+    """Remplace le résultat enregistré (écriture atomique : les lecteurs voient l'ancien ou le nouveau)."""
+    chemin = default_storage.path(_nom_resultat(modele))
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    resultat = {
+        'seuil': seuil, 'date_calcul': timezone.now().isoformat(), 'stats': stats, 'candidats': candidats,
+    }
+    with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(chemin), suffix='.tmp', delete=False) as fichier:
+        json.dump(resultat, fichier, ensure_ascii=False)
+    os.replace(fichier.name, chemin)
+
+
+def lire_resultat(modele):
+    """Dernier résultat enregistré pour l'organisation courante, ou None."""
+    try:
+        with open(default_storage.path(_nom_resultat(modele)), encoding='utf-8') as fichier:
+            return json.load(fichier)
+    except FileNotFoundError:
+        return None
+
+
+def retirer_des_resultats(modele, fiche_id):
+    """Retire du résultat enregistré les paires d'une fiche supprimée par une fusion."""
+    resultat = lire_resultat(modele)
+    if resultat is None:
+        return
+    candidats = [c for c in resultat['candidats'] if fiche_id not in (c['id_a'], c['id_b'])]
+    if len(candidats) != len(resultat['candidats']):
+        enregistrer_resultat(modele, resultat['seuil'], candidats, resultat['stats'])
+
+
+# ----------------------------------------------------------------------
+# FUSION
+# ----------------------------------------------------------------------
+
+def _rattacher_enfants(conserve, doublon):
+    """
+    Repointe en masse (un UPDATE par relation) les lignes qui référencent le doublon.
+    Les lignes qui violeraient un unique_together (ex. méta-donnée de même nom) restent
+    sur le doublon et sont supprimées avec lui.
+    """
+    for relation in type(conserve)._meta.related_objects:
+        if relation.many_to_many or relation.one_to_one:
+            continue
+        modele, champ = relation.related_model, relation.field.name
+        enfants = modele.objects.filter(**{champ: doublon})
+        for contrainte in modele._meta.unique_together:
+            if champ not in contrainte:
+                continue
+            autres = [nom for nom in contrainte if nom != champ]
+            existants = set(modele.objects.filter(**{champ: conserve}).values_list(*autres))
+            conflits = [pk for pk, *valeurs in enfants.values_list('pk', *autres) if tuple(valeurs) in existants]
+            enfants = enfants.exclude(pk__in=conflits)
+        deplaces = enfants.update(**{champ: conserve})
+        if deplaces:
+            logger.info(f"Fusion {doublon.pk} -> {conserve.pk} : {deplaces} {modele._meta.verbose_name_plural}")
+
+
+def _completer(conserve, doublon):
+    for champ in CHAMPS_COMPLETES[type(conserve)]:
+        if not getattr(conserve, champ) and getattr(doublon, champ):
+            setattr(conserve, champ, getattr(doublon, champ))
+
+
+@transaction.atomic
+def fusionner_navires(conserve, doublon):
+    """Fusionne `doublon` dans `conserve` (documents, moteurs, positions, activités...)."""
+    if conserve.pk == doublon.pk:
+        raise ValueError("Un navire ne peut pas être fusionné avec lui-même.")
+
+    _rattacher_enfants(conserve, doublon)
+    conserve.activites.add(*doublon.activites.all())
+
+    # Dernière position : la plus récente des deux
+    positions = {p.navire_id: p for p in DernierePosition.objects.filter(navire__in=[conserve, doublon])}
+    if doublon.pk in positions and (
+        conserve.pk not in positions or positions[doublon.pk].horodatage > positions[conserve.pk].horodatage
+    ):
+        DernierePosition.objects.filter(navire=conserve).delete()
+        DernierePosition.objects.filter(navire=doublon).update(navire=conserve)
+
+    _completer(conserve, doublon)
+    # Enregistré avant la suppression : la photo éventuellement reprise garde sa référence
+    conserve.save()
+    logger.info(f"Navire {doublon.pk} ({doublon.num_immatricule}) fusionné dans {conserve.pk}.")
+    doublon.delete()
+    recalculer_conformite([conserve.pk])
+    invalider_cache('flotte', conserve.organisation_id)
+    invalider_cache('lectures', conserve.organisation_id)
+    return conserve
+
+
+@transaction.atomic
+def fusionner_proprietaires(conserve, doublon):
+    """Fusionne `doublon` dans `conserve` : ses navires passent au propriétaire conservé."""
+    if conserve.pk == doublon.pk:
+        raise ValueError("Un propriétaire ne peut pas être fusionné avec lui-même.")
+
+    _rattacher_enfants(conserve, doublon)
+    _completer(conserve, doublon)
+    conserve.save()
+    logger.info(f"Propriétaire {doublon.pk} ({doublon.nom_proprietaire}) fusionné dans {conserve.pk}.")
+    doublon.delete()
+    invalider_cache('flotte', conserve.organisation_id)
+    invalider_cache('lectures', conserve.organisation_id)
+    return conserve
@@ -0,0 +1,140 @@
+"""
+Diffusion des changements aux clients par Server-Sent Events (/api/evenements/).
+
+- publier() ajoute un événement au journal tenu dans le cache : numéro de séquence
+  (cache.incr) et une clé par événement, conservée DUREE_EVENEMENT secondes ; le journal
+  est partagé entre processus avec Redis. Les signaux publient après la validation de la
+  transaction (publier_apres_commit).
+- Dans chaque processus ASGI, un seul Diffuseur lit le journal (une lecture du cache
+  toutes les INTERVALLE_LECTURE secondes, quel que soit le nombre de clients) et répartit
+  les nouveaux événements entre les connexions ouvertes : la charge suit le nombre de
+  changements, pas le nombre d'écrans ouverts.
+- Chaque connexion ne reçoit que les événements de son organisation. Une connexion
+  reprise (en-tête Last-Event-ID, envoyé par EventSource) reçoit d'abord les événements
+  manqués encore au journal, sinon un événement 'resynchronisation' (tout recharger).
+
+Événements : navire (cree / modifie / supprime), document (assurance, visite, dossier,
+avec la conformité du navire), conformite (recalcul quotidien), export (progression
+d'une tâche). Le flux n'est servi qu'en ASGI (uvicorn backend.asgi:application) : sous
+WSGI, chaque client occuperait un worker.
+"""
+import asyncio
+import json
+
+from django.core.cache import cache
+from django.db import transaction
+
+CLE_SEQUENCE = 'evenements:sequence'
+DUREE_EVENEMENT = 5 * 60
+INTERVALLE_LECTURE = 0.5
+INTERVALLE_PING = 15
+# Au-delà, un client en retard est invité à tout recharger plutôt qu'à rejouer le journal
+MAX_RATTRAPAGE = 500
+TAILLE_FILE = 1000
+
+
+def _cle(numero):
+    return f"evenements:{numero}"
+
+
+def publier(type_evenement, organisation_id, **donnees):
+    """Ajoute un événement au journal ; organisation_id None : destiné à toutes les organisations."""
+    try:
+        numero = cache.incr(CLE_SEQUENCE)
+    except ValueError:
+        cache.add(CLE_SEQUENCE, 0, None)
+        numero = cache.incr(CLE_SEQUENCE)
+    cache.set(_cle(numero), {'type': type_evenement, 'organisation': organisation_id, 'donnees': donnees},
+              DUREE_EVENEMENT)
+    return numero
+
+
+def publier_apres_commit(type_evenement, organisation_id, **donnees):
+    transaction.on_commit(lambda: publier(type_evenement, organisation_id, **donnees))
+
+
+async def _lire_journal(debut, fin):
+    """[(numéro, événement ou None si expiré)] pour les numéros debut+1 .. fin."""
+    numeros = range(debut + 1, fin + 1)
+    valeurs = await cache.aget_many([_cle(numero) for numero in numeros])
+    return [(numero, valeurs.get(_cle(numero))) for numero in numeros]
+
+
+class Diffuseur:
+    """Lecteur unique du journal pour le processus, qui alimente une file par connexion."""
+
+    def __init__(self):
+        self.files = set()
+        self.tache = None
+
+    def abonner(self):
+        file = asyncio.Queue(TAILLE_FILE)
+        self.files.add(file)
+        boucle = asyncio.get_running_loop()
+        if self.tache is None or self.tache.done() or self.tache.get_loop() is not boucle:
+            self.tache = boucle.create_task(self._lire())
+        return file
+
+    def desabonner(self, file):
+        self.files.discard(file)
+
+    async def _lire(self):
+        dernier = await cache.aget(CLE_SEQUENCE, 0)
+        while self.files:
+            await asyncio.sleep(INTERVALLE_LECTURE)
+            numero = await cache.aget(CLE_SEQUENCE, 0)
+            if numero == dernier:
+                continue
+            if numero < dernier or numero - dernier > MAX_RATTRAPAGE:
+                # Journal réinitialisé (cache vidé) ou rafale : chaque client recharge tout
+                evenements = [(numero, None)]
+            else:
+                evenements = await _lire_journal(dernier, numero)
+            dernier = numero
+            for file in list(self.files):
+                for evenement in evenements:
+                    try:
+                        file.put_nowait(evenement)
+                    except asyncio.QueueFull:
+                        break
+
+
+diffuseur = Diffuseur()
+
+
+def _message(numero, evenement):
+    if evenement is None:
+        return f"id: {numero}\nevent: resynchronisation\ndata: {{}}\n\n"
+    donnees = json.dumps(evenement['donnees'], default=str, ensure_ascii=False)
+    return f"id: {numero}\nevent: {evenement['type']}\ndata: {donnees}\n\n"
+
+
+async def flux_evenements(organisation_id, dernier_id=None):
+    """Générateur du flux SSE d'une connexion (voir FluxEvenementsView)."""
+    file = diffuseur.abonner()
+    try:
+        # Lu avant le premier envoi : les événements publiés ensuite arrivent par la file
+        vu = await cache.aget(CLE_SEQUENCE, 0)
+        yield f"retry: {INTERVALLE_PING * 1000}\n\n"
+        if dernier_id is not None and dernier_id != vu:
+            if dernier_id > vu or vu - dernier_id > MAX_RATTRAPAGE:
+                yield _message(vu, None)
+            else:
+                for numero, evenement in await _lire_journal(dernier_id, vu):
+                    if evenement is None or evenement['organisation'] in (None, organisation_id):
+                        yield _message(numero, evenement)
+
+        while True:
+            try:
+                numero, evenement = await asyncio.wait_for(file.get(), INTERVALLE_PING)
+            except asyncio.TimeoutError:
+                # Commentaire SSE : garde la connexion ouverte à travers les proxys
+                yield ": ping\n\n"
+                continue
+            if numero <= vu and evenement is not None:
+                continue
+            vu = numero
+            if evenement is None or evenement['organisation'] in (None, organisation_id):
+                yield _message(numero, evenement)
+    finally:
+        diffuseur.desabonner(file)
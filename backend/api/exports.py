@@ -0,0 +1,250 @@
+"""
+Exports tabulaires normalisés (une table par entité), partagés par les formats
+XLSX et analytiques. Les lignes sont lues par lots via values_list().iterator() :
+aucune instance de modèle n'est construite et la mémoire reste constante.
+"""
+import os
+
+from .models import Assurance, Dossier, MetaDonne, Moteur, Navire, Visite
+
+TAILLE_LOT_EXPORT = 2000
+
+# nom, libellé de la feuille, modèle, champ menant au navire, colonnes (champ, libellé)
+TABLES_EXPORT = [
+    {
+        'nom': 'navires',
+        'feuille': 'Navires',
+        'modele': Navire,
+        'lien_navire': 'id',
+        'colonnes': [
+            ('id', "ID"),
+            ('nom_navire', "Nom Navire"),
+            ('num_immatricule', "Immatriculation"),
+            ('imo', "IMO"),
+            ('mmsi', "MMSI"),
+            ('type_navire', "Type"),
+            ('annee_de_construction', "Année Construction"),
+            ('lieu_de_construction', "Lieu Construction"),
+            ('nature_coque', "Nature Coque"),
+            ('nbr_passager', "Passagers"),
+            ('nbr_equipage', "Équipage"),
+            ('proprietaire_id', "ID Propriétaire"),
+            ('proprietaire__nom_proprietaire', "Propriétaire"),
+            ('proprietaire__type_proprietaire', "Type Propriétaire"),
+            ('proprietaire__contact', "Contact Propriétaire"),
+        ],
+    },
+    {
+        'nom': 'activites',
+        'feuille': 'Activités',
+        'modele': Navire.activites.through,
+        'lien_navire': 'navire_id',
+        'colonnes': [
+            ('navire_id', "ID Navire"),
+            ('activite_id', "ID Activité"),
+            ('activite__nom_activite', "Activité"),
+        ],
+    },
+    {
+        'nom': 'moteurs',
+        'feuille': 'Moteurs',
+        'modele': Moteur,
+        'lien_navire': 'navire_id',
+        'colonnes': [
+            ('id', "ID"),
+            ('navire_id', "ID Navire"),
+            ('navire__nom_navire', "Navire"),
+            ('nom_moteur', "Moteur"),
+            ('puissance', "Puissance"),
+        ],
+    },
+    {
+        'nom': 'visites',
+        'feuille': 'Visites',
+        'modele': Visite,
+        'lien_navire': 'navire_id',
+        'colonnes': [
+            ('id', "ID"),
+            ('navire_id', "ID Navire"),
+            ('navire__nom_navire', "Navire"),
+            ('lieu_visite', "Lieu"),
+            ('date_visite', "Date Visite"),
+            ('expiration_permis', "Expiration Permis"),
+        ],
+    },
+    {
+        'nom': 'dossiers',
+        'feuille': 'Dossiers',
+        'modele': Dossier,
+        'lien_navire': 'navire_id',
+        'colonnes': [
+            ('id', "ID"),
+            ('navire_id', "ID Navire"),
+            ('navire__nom_navire', "Navire"),
+            ('type_dossier', "Type Dossier"),
+            ('date_emission', "Date Émission"),
+            ('date_expiration', "Date Expiration"),
+        ],
+    },
+    {
+        'nom': 'assurances',
+        'feuille': 'Assurances',
+        'modele': Assurance,
+        'lien_navire': 'navire_id',
+        'colonnes': [
+            ('id', "ID"),
+            ('navire_id', "ID Navire"),
+            ('navire__nom_navire', "Navire"),
+            ('assureur_id', "ID Assureur"),
+            ('assureur__nom_assureur', "Assureur"),
+            ('date_debut', "Date Début"),
+            ('date_fin', "Date Fin"),
+        ],
+    },
+    {
+        'nom': 'meta_donnees',
+        'feuille': 'Méta-données',
+        'modele': MetaDonne,
+        'lien_navire': 'navire_id',
+        'colonnes': [
+            ('id', "ID"),
+            ('navire_id', "ID Navire"),
+            ('navire__nom_navire', "Navire"),
+            ('nom_meta_donne', "Nom"),
+            ('type_meta_donne', "Type"),
+            ('valeur_texte', "Valeur Texte"),
+            ('valeur_nombre', "Valeur Nombre"),
+            ('valeur_date', "Valeur Date"),
+            ('valeur_bool', "Valeur Booléen"),
+            ('valeur_heure', "Valeur Heure"),
+            ('fichier_meta_donne', "Fichier"),
+        ],
+    },
+]
+
+
+def queryset_table(table, navires=None):
+    """Queryset de la table restreint aux navires sélectionnés (None = tous)."""
+    queryset = table['modele'].objects.all()
+    if navires is not None:
+        ids = navires.order_by().values('id')
+        queryset = queryset.filter(**{f"{table['lien_navire']}__in": ids})
+    return queryset.order_by(table['lien_navire'], 'pk')
+
+
+def lots_table(table, navires=None, taille_lot=TAILLE_LOT_EXPORT):
+    """Itère les lignes de la table par lots de tuples (values_list)."""
+    champs = [champ for champ, _ in table['colonnes']]
+    lot = []
+    for ligne in queryset_table(table, navires).values_list(*champs).iterator(chunk_size=taille_lot):
+        lot.append(ligne)
+        if len(lot) >= taille_lot:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def ecrire_xlsx(fichier, navires=None):
+    """
+    Écrit un classeur XLSX (une feuille par entité) dans `fichier`.
+    Mode constant_memory : chaque ligne est vidée sur disque dès qu'elle est écrite.
+    Les cellules sont typées (nombres, dates) : plus besoin de l'apostrophe
+    ajoutée aux contacts dans l'export CSV.
+    """
+    import xlsxwriter
+
+    classeur = xlsxwriter.Workbook(fichier, {
+        'constant_memory': True,
+        'default_date_format': 'dd/mm/yyyy',
+        'remove_timezone': True,
+    })
+    format_entete = classeur.add_format({'bold': True, 'bg_color': '#1e3a8a', 'font_color': '#ffffff'})
+    format_heure = classeur.add_format({'num_format': 'hh:mm'})
+
+    for table in TABLES_EXPORT:
+        feuille = classeur.add_worksheet(table['feuille'])
+        colonnes = table['colonnes']
+        feuille.write_row(0, 0, [libelle for _, libelle in colonnes], format_entete)
+        feuille.freeze_panes(1, 0)
+        for index, (champ, libelle) in enumerate(colonnes):
+            feuille.set_column(index, index, max(12, len(libelle) + 2))
+        colonnes_heure = {i for i, (champ, _) in enumerate(colonnes) if champ == 'valeur_heure'}
+
+        numero_ligne = 1
+        for lot in lots_table(table, navires):
+            for ligne in lot:
+                for colonne, valeur in enumerate(ligne):
+                    if valeur is None or valeur == '':
+                        continue
+                    if isinstance(valeur, str):
+                        # Texte brut : pas de conversion automatique (contacts, immatriculations)
+                        feuille.write_string(numero_ligne, colonne, valeur)
+                    elif colonne in colonnes_heure:
+                        feuille.write_datetime(numero_ligne, colonne, valeur, format_heure)
+                    else:
+                        feuille.write(numero_ligne, colonne, valeur)
+                numero_ligne += 1
+
+    classeur.close()
+
+
+# ----------------------------------------------------------------------
+# EXPORT ANALYTIQUE (PARQUET)
+# ----------------------------------------------------------------------
+
+def _champ_modele(modele, chemin):
+    """Résout un chemin values_list ('navire__nom_navire', 'navire_id') vers le champ final."""
+    parties = chemin.split('__')
+    for partie in parties[:-1]:
+        modele = modele._meta.get_field(partie).related_model
+    champ = modele._meta.get_field(parties[-1])
+    if champ.is_relation:
+        champ = champ.target_field
+    return champ
+
+
+def schema_arrow(table):
+    """Schéma Arrow typé, déduit des champs du modèle."""
+    import pyarrow as pa
+
+    types = {
+        'AutoField': pa.int64(), 'BigAutoField': pa.int64(), 'IntegerField': pa.int64(),
+        'BigIntegerField': pa.int64(), 'PositiveIntegerField': pa.int64(),
+        'PositiveBigIntegerField': pa.int64(), 'BooleanField': pa.bool_(),
+        'DateField': pa.date32(), 'TimeField': pa.time64('us'), 'DateTimeField': pa.timestamp('us', tz='UTC'),
+    }
+    colonnes = []
+    for chemin, _ in table['colonnes']:
+        champ = _champ_modele(table['modele'], chemin)
+        type_interne = champ.get_internal_type()
+        if type_interne == 'DecimalField':
+            type_arrow = pa.decimal128(champ.max_digits, champ.decimal_places)
+        else:
+            type_arrow = types.get(type_interne, pa.string())
+        colonnes.append(pa.field(chemin, type_arrow))
+    return pa.schema(colonnes)
+
+
+def ecrire_parquet(dossier, navires=None, compression='zstd'):
+    """
+    Écrit un fichier Parquet par table dans `dossier` (noms de colonnes = champs du modèle,
+    valeurs nulles conservées). Chaque lot values_list devient un RecordBatch :
+    la mémoire ne dépend que de la taille du lot. Retourne les chemins écrits.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    chemins = []
+    for table in TABLES_EXPORT:
+        schema = schema_arrow(table)
+        chemin = os.path.join(dossier, f"{table['nom']}.parquet")
+        with pq.ParquetWriter(chemin, schema, compression=compression) as writer:
+            for lot in lots_table(table, navires):
+                colonnes = list(zip(*lot))
+                writer.write_batch(pa.RecordBatch.from_arrays(
+                    [pa.array(valeurs, type=champ.type) for valeurs, champ in zip(colonnes, schema)],
+                    schema=schema
+                ))
+        chemins.append(chemin)
+    return chemins
@@ -0,0 +1,189 @@
+"""
+Service des fichiers média (méta-données, photos) en streaming.
+
+- Lecture par blocs via FileResponse : mémoire constante quelle que soit la taille.
+- Support des en-têtes Range / If-Range (reprise de téléchargement) et If-None-Match (ETag).
+- Délégation optionnelle au serveur web frontal (X-Accel-Redirect pour nginx,
+  X-Sendfile pour Apache/lighttpd) via settings.MEDIA_SENDFILE_BACKEND.
+- servir_media ne sert un fichier que s'il est référencé par un navire ou une
+  méta-donnée de l'organisation de la requête (voir api/organisations.py).
+"""
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import content_disposition_header, http_date, quote_etag
+
+from .organisations import organisation_courante
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FichierPartiel(File):
+    """
+    Fichier déjà présent sur le disque local (fragment finalisé, fichier temporaire).
+    Exposer temporary_file_path() permet à FileSystemStorage de le déplacer
+    au lieu de le recopier.
+    """
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class PlageFichier:
+    """Vue en lecture seule sur une plage d'octets d'un fichier ouvert."""
+
+    def __init__(self, fichier, debut, longueur):
+        self.fichier = fichier
+        self.restant = longueur
+        self.fichier.seek(debut)
+
+    def read(self, taille=-1):
+        if self.restant <= 0:
+            return b''
+        if taille is None or taille < 0 or taille > self.restant:
+            taille = self.restant
+        bloc = self.fichier.read(taille)
+        self.restant -= len(bloc)
+        return bloc
+
+    def close(self):
+        self.fichier.close()
+
+
+def _etag(taille, mtime):
+    return quote_etag(f"{taille:x}-{int(mtime):x}")
+
+
+def _etag_correspond(entete, etag):
+    """Compare un en-tête If-None-Match / If-Range à l'ETag courant (comparaison faible)."""
+    if not entete:
+        return False
+    if entete.strip() == '*':
+        return True
+    candidats = [e.strip().removeprefix('W/') for e in entete.split(',')]
+    return etag in candidats
+
+
+def _parse_range(entete, taille):
+    """
+    Retourne (debut, fin) inclusifs pour une plage unique, None si l'en-tête est absent,
+    invalide ou multi-plages (on sert alors le fichier complet), ou False si non satisfiable.
+    """
+    match = RANGE_RE.match(entete.strip()) if entete else None
+    if not match:
+        return None
+    debut, fin = match.groups()
+    if not debut and not fin:
+        return None
+    if not debut:
+        suffixe = int(fin)
+        if suffixe == 0:
+            return False
+        return max(taille - suffixe, 0), taille - 1
+    debut = int(debut)
+    fin = int(fin) if fin else taille - 1
+    if debut >= taille or fin < debut:
+        return False
+    return debut, min(fin, taille - 1)
+
+
+def servir_fichier(request, nom, storage=None, nom_telechargement=None, as_attachment=True):
+    """Construit la réponse HTTP pour le fichier `nom` du stockage."""
+    from .stockage import est_nom_cas
+
+    storage = storage or default_storage
+    if not nom or not storage.exists(nom):
+        raise Http404("Fichier introuvable.")
+
+    taille = storage.size(nom)
+    try:
+        mtime = storage.get_modified_time(nom).timestamp()
+    except (NotImplementedError, AttributeError):
+        mtime = 0
+    etag = _etag(taille, mtime)
+    nom_telechargement = nom_telechargement or os.path.basename(nom)
+    content_type = mimetypes.guess_type(nom_telechargement)[0] or 'application/octet-stream'
+
+    if _etag_correspond(request.headers.get('If-None-Match'), etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    backend = getattr(settings, 'MEDIA_SENDFILE_BACKEND', None)
+    if backend:
+        # Le serveur frontal gère lui-même Range et l'envoi du fichier (sendfile)
+        response = HttpResponse(content_type=content_type)
+        if backend == 'x-accel-redirect':
+            prefixe = getattr(settings, 'MEDIA_X_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = posixpath.join(prefixe, nom)
+        else:
+            response['X-Sendfile'] = storage.path(nom)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, nom_telechargement)
+        response['ETag'] = etag
+        return response
+
+    plage = None
+    if_range = request.headers.get('If-Range')
+    if not if_range or _etag_correspond(if_range, etag):
+        plage = _parse_range(request.headers.get('Range'), taille)
+
+    if plage is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{taille}'
+        return response
+
+    fichier = storage.open(nom, 'rb')
+    if plage:
+        debut, fin = plage
+        longueur = fin - debut + 1
+        response = FileResponse(
+            PlageFichier(fichier, debut, longueur), status=206, content_type=content_type,
+            as_attachment=as_attachment, filename=nom_telechargement
+        )
+        response['Content-Length'] = str(longueur)
+        response['Content-Range'] = f'bytes {debut}-{fin}/{taille}'
+    else:
+        response = FileResponse(
+            fichier, content_type=content_type,
+            as_attachment=as_attachment, filename=nom_telechargement
+        )
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    if mtime:
+        response['Last-Modified'] = http_date(mtime)
+    if est_nom_cas(nom):
+        # Un blob adressé par son empreinte ne change jamais de contenu
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def _reference_par_organisation(nom):
+    """
+    Vrai si un champ fichier de l'organisation courante pointe vers `nom`. Les managers
+    restreignent déjà les requêtes à l'organisation ; un blob partagé entre organisations
+    (stockage dédupliqué) reste accessible à chacune de celles qui le référencent.
+    """
+    from .stockage import CHAMPS_FICHIERS
+
+    if organisation_courante() is None:
+        return True
+    return any(modele.objects.filter(**{champ: nom}).exists() for modele, champ in CHAMPS_FICHIERS)
+
+
+def servir_media(request, path):
+    """
+    Sert MEDIA_ROOT hors mode DEBUG (remplace django.conf.urls.static). Un fichier qui
+    n'appartient pas à l'organisation de la requête répond 404, comme un fichier absent.
+    """
+    nom = posixpath.normpath(path).lstrip('/')
+    if nom.startswith(('..', 'televersements/', 'cas/tmp/', 'exports/')):
+        raise Http404("Fichier introuvable.")
+    if not _reference_par_organisation(nom):
+        raise Http404("Fichier introuvable.")
+    return servir_fichier(request, nom, as_attachment=False)
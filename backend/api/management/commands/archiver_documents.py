@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.archives import RETENTION_JOURS, TAILLE_LOT_ARCHIVAGE, archiver_documents
+
+
+class Command(BaseCommand):
+    help = (
+        "Déplace vers les tables d'archive les visites, dossiers et assurances échus depuis plus "
+        "de la durée de rétention et remplacés par un document plus récent du même navire. "
+        "À lancer périodiquement (cron) ; l'historique reste consultable avec ?archives=1."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-jours', type=int, default=RETENTION_JOURS,
+            help=f"Ancienneté minimale de l'échéance, en jours (défaut : {RETENTION_JOURS})."
+        )
+        parser.add_argument(
+            '--taille-lot', type=int, default=TAILLE_LOT_ARCHIVAGE,
+            help="Nombre de documents déplacés par transaction."
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Compte les documents archivables sans les déplacer."
+        )
+
+    def handle(self, *args, **options):
+        if options['retention_jours'] < 0 or options['taille_lot'] < 1:
+            raise CommandError("--retention-jours doit être positif et --taille-lot au moins 1.")
+
+        debut = time.monotonic()
+        resultats = archiver_documents(
+            options['retention_jours'], options['taille_lot'], ecrire=not options['dry_run']
+        )
+        detail = ', '.join(f"{nom} : {nombre}" for nom, nombre in resultats.items())
+        verbe = "archivable(s)" if options['dry_run'] else "archivé(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(resultats.values())} document(s) {verbe} ({detail}) en {time.monotonic() - debut:.1f} s."
+        ))
@@ -0,0 +1,91 @@
+import hashlib
+from collections import defaultdict
+
+from django.core.files import File
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+
+from api.models import ContenuFichier
+from api.stockage import (
+    CHAMPS_FICHIERS, PREFIXE_CAS, StockageDeduplique, purger_blob, recompter_references
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Migre les pièces jointes existantes (méta-données, photos de navires) vers le "
+        "stockage dédupliqué : chaque contenu identique n'est plus conservé qu'une fois."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Calcule seulement les doublons et l'espace récupérable, sans rien modifier."
+        )
+
+    def handle(self, *args, **options):
+        stockage = storages['default']
+        if not isinstance(stockage, StockageDeduplique):
+            raise CommandError("STORAGES['default'] doit utiliser api.stockage.StockageDeduplique.")
+
+        # Noms hérités distincts, par champ (une requête par champ, pas par ligne)
+        anciens_noms = defaultdict(set)
+        for modele, champ in CHAMPS_FICHIERS:
+            noms = (
+                modele.objects.exclude(**{f'{champ}__isnull': True})
+                .exclude(**{champ: ''})
+                .exclude(**{f'{champ}__startswith': PREFIXE_CAS})
+                .values_list(champ, flat=True).distinct()
+            )
+            for nom in noms.iterator():
+                anciens_noms[nom].add((modele, champ))
+
+        if options['dry_run']:
+            self._simuler(stockage, anciens_noms)
+            return
+
+        convertis = 0
+        octets_avant = 0
+        for ancien, champs in anciens_noms.items():
+            if not stockage.interne.exists(ancien):
+                self.stderr.write(f"Fichier absent, ignoré : {ancien}")
+                continue
+            octets_avant += stockage.interne.size(ancien)
+            with stockage.interne.open(ancien, 'rb') as f:
+                nouveau = stockage.save(ancien, File(f, name=ancien))
+            # Mise à jour en masse : les signaux ne sont pas déclenchés, les
+            # références sont recalculées en une passe à la fin.
+            for modele, champ in champs:
+                modele.objects.filter(**{champ: ancien}).update(**{champ: nouveau})
+            stockage.interne.delete(ancien)
+            convertis += 1
+
+        orphelins = recompter_references()
+        for nom in orphelins:
+            purger_blob(nom)
+
+        octets_apres = ContenuFichier.objects.aggregate(total=Sum('taille'))['total'] or 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{convertis} fichier(s) migré(s), {len(orphelins)} blob(s) orphelin(s) supprimé(s). "
+            f"Espace occupé par les pièces jointes : {octets_avant / 1024 / 1024:.1f} Mo hérités, "
+            f"{octets_apres / 1024 / 1024:.1f} Mo dédupliqués au total."
+        ))
+
+    def _simuler(self, stockage, anciens_noms):
+        par_empreinte = defaultdict(list)
+        for ancien in anciens_noms:
+            if not stockage.interne.exists(ancien):
+                continue
+            sha = hashlib.sha256()
+            with stockage.interne.open(ancien, 'rb') as f:
+                for bloc in f.chunks():
+                    sha.update(bloc)
+            par_empreinte[sha.hexdigest()].append((ancien, stockage.interne.size(ancien)))
+
+        doublons = sum(len(noms) - 1 for noms in par_empreinte.values())
+        recuperable = sum(taille for noms in par_empreinte.values() for _, taille in noms[1:])
+        self.stdout.write(
+            f"{len(anciens_noms)} fichier(s) hérité(s), {len(par_empreinte)} contenu(s) distinct(s), "
+            f"{doublons} doublon(s), {recuperable / 1024 / 1024:.1f} Mo récupérables."
+        )
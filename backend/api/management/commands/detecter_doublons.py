@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.doublons import (
+    SEUIL_DOUBLON, detecter_doublons_navires, detecter_doublons_proprietaires, enregistrer_resultat,
+    fusionner_navires, fusionner_proprietaires,
+)
+from api.models import Navire, Organisation, Proprietaire
+from api.organisations import organisation_active
+
+MODELES = {
+    'navires': (Navire, detecter_doublons_navires, fusionner_navires),
+    'proprietaires': (Proprietaire, detecter_doublons_proprietaires, fusionner_proprietaires),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Détecte les doublons probables de navires ou de propriétaires (comparaison par blocs : "
+        "trigrammes du nom, IMO, MMSI, propriétaire, contact), organisation par organisation, "
+        "affiche les paires notées et les enregistre pour l'action /doublons/ de l'API. À "
+        "planifier, par exemple chaque nuit. Avec --fusionner-au-dessus, fusionne "
+        "automatiquement les paires au score suffisant dans la fiche la plus ancienne."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('modele', choices=sorted(MODELES), help="Fiches à dédoublonner")
+        parser.add_argument(
+            '--seuil', type=float, default=SEUIL_DOUBLON,
+            help=f"Score minimal d'une paire candidate (défaut : {SEUIL_DOUBLON})."
+        )
+        parser.add_argument('--limite', type=int, default=50, help="Nombre de paires affichées.")
+        parser.add_argument(
+            '--fusionner-au-dessus', type=float, dest='seuil_fusion',
+            help="Fusionne les paires dont le score atteint cette valeur (ex. 0.95)."
+        )
+
+    def handle(self, *args, **options):
+        if not 0 < options['seuil'] <= 1:
+            raise CommandError("--seuil doit être compris entre 0 et 1.")
+
+        for organisation in Organisation.objects.order_by('pk'):
+            with organisation_active(organisation.pk):
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{organisation.nom} :"))
+                self._detecter(options)
+
+    def _detecter(self, options):
+        modele, detecter, fusionner = MODELES[options['modele']]
+        candidats, stats = detecter(options['seuil'])
+        self.stdout.write(
+            f"{stats['fiches']} fiche(s), {stats['blocs']} bloc(s) ({stats['blocs_ignores']} ignoré(s)), "
+            f"{stats['comparaisons']} comparaison(s), {stats['candidats']} paire(s) candidate(s) "
+            f"en {stats['duree']} s."
+        )
+        for candidat in candidats[:options['limite']]:
+            self.stdout.write(
+                f"{candidat['score']:.3f}  {candidat['id_a']} « {candidat['nom_a']} »  ~  "
+                f"{candidat['id_b']} « {candidat['nom_b']} »  ({', '.join(candidat['raisons'])})"
+            )
+
+        fusionnes = set()
+        if options['seuil_fusion'] is not None:
+            for candidat in candidats:
+                if candidat['score'] < options['seuil_fusion']:
+                    break
+                if candidat['id_a'] in fusionnes or candidat['id_b'] in fusionnes:
+                    continue
+                conserve = modele.objects.get(pk=candidat['id_a'])
+                fusionner(conserve, modele.objects.get(pk=candidat['id_b']))
+                fusionnes.add(candidat['id_b'])
+            self.stdout.write(self.style.SUCCESS(f"{len(fusionnes)} fiche(s) fusionnée(s)."))
+
+        # Paires restantes : celles dont une fiche a disparu dans une fusion sont écartées
+        candidats = [c for c in candidats if c['id_a'] not in fusionnes and c['id_b'] not in fusionnes]
+        enregistrer_resultat(options['modele'], options['seuil'], candidats, stats)
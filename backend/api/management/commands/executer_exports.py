@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.admission import prendre_place
+from api.models import TacheExport
+from api.views import ExportPDFCombine
+
+
+class Command(BaseCommand):
+    help = (
+        "Exécute les exports PDF combinés en attente (TacheExport), dans la limite des places "
+        "d'export (EXPORTS_SIMULTANES). À lancer comme service, éventuellement en plusieurs "
+        "exemplaires, quand EXPORTS_DANS_LE_PROCESSUS est désactivé (production) : une tâche "
+        "interrompue par un arrêt est reprise à partir de son dernier lot."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--une-fois', action='store_true',
+            help="S'arrête dès qu'aucune tâche n'est en attente (cron, tests)."
+        )
+        parser.add_argument(
+            '--intervalle', type=float, default=2.0,
+            help="Délai entre deux consultations de la file d'attente, en secondes."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            reprises, echouees = ExportPDFCombine.reprendre_taches_abandonnees()
+            if reprises or echouees:
+                self.stdout.write(f"{reprises} tâche(s) abandonnée(s) reprise(s), {echouees} en erreur.")
+
+            tache = TacheExport.objects.toutes_organisations().filter(
+                statut='EN_ATTENTE'
+            ).order_by('date_creation').first()
+            if tache is None:
+                if options['une_fois']:
+                    return
+                time.sleep(options['intervalle'])
+                continue
+
+            place = prendre_place(attente_max=options['intervalle'])
+            if place is None:
+                continue
+            debut = time.monotonic()
+            # Rend la place à la fin, même si la tâche a été prise entre-temps par un autre exécutant
+            ExportPDFCombine(tache).executer(place)
+            tache.refresh_from_db(fields=['statut', 'traites', 'total'])
+            self.stdout.write(
+                f"Export {tache.pk} : {tache.statut} ({tache.traites}/{tache.total}) "
+                f"en {time.monotonic() - debut:.1f} s."
+            )
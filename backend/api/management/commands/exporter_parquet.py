@@ -0,0 +1,26 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from api.exports import ecrire_parquet
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporte les tables de la flotte (navires, activités, moteurs, visites, dossiers, "
+        "assurances, méta-données) en fichiers Parquet typés, pour les traitements analytiques."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dossier', help="Dossier de destination des fichiers .parquet")
+        parser.add_argument(
+            '--compression', default='zstd', choices=['zstd', 'snappy', 'gzip', 'none'],
+            help="Codec de compression Parquet (défaut : zstd)."
+        )
+
+    def handle(self, *args, **options):
+        os.makedirs(options['dossier'], exist_ok=True)
+        compression = None if options['compression'] == 'none' else options['compression']
+        for chemin in ecrire_parquet(options['dossier'], compression=compression):
+            self.stdout.write(f"{chemin} ({os.path.getsize(chemin) / 1024:.0f} Ko)")
+        self.stdout.write(self.style.SUCCESS("Export Parquet terminé."))
@@ -0,0 +1,90 @@
+import socket
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.ais import IngesteurAIS
+
+
+class Command(BaseCommand):
+    help = (
+        "Ingère des phrases AIS NMEA (!AIVDM / !AIVDO) et enregistre les positions des navires "
+        "de la flotte (association par MMSI). Source : fichier, '-' pour l'entrée standard, "
+        "ou udp://hôte:port pour écouter un récepteur AIS. "
+        "Exemple hors ligne : ingerer_ais api/donnees/ais_exemple.nmea"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Fichier NMEA, '-' (stdin) ou udp://hôte:port")
+        parser.add_argument(
+            '--taille-lot', type=int, default=2000,
+            help="Nombre de positions écrites par insertion groupée."
+        )
+        parser.add_argument(
+            '--intervalle', type=float, default=1.0,
+            help="Délai maximal (secondes) avant écriture des positions en attente."
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Décode sans rien écrire en base (mesure du débit)."
+        )
+
+    def handle(self, *args, **options):
+        ingesteur = IngesteurAIS(
+            taille_lot=options['taille_lot'], intervalle=options['intervalle'], ecrire=not options['dry_run']
+        )
+        self.stdout.write(f"{len(ingesteur.navires)} navire(s) avec MMSI connu(s).")
+
+        debut = time.monotonic()
+        try:
+            if options['source'].startswith('udp://'):
+                self._ecouter_udp(ingesteur, options['source'][len('udp://'):])
+            elif options['source'] == '-':
+                self._lire(ingesteur, sys.stdin)
+            else:
+                try:
+                    with open(options['source'], encoding='ascii', errors='replace') as fichier:
+                        self._lire(ingesteur, fichier)
+                except OSError as exc:
+                    raise CommandError(f"Lecture impossible : {exc}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            ingesteur.vider()
+
+        duree = time.monotonic() - debut
+        stats = ingesteur.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['lignes']} ligne(s), {stats['messages']} message(s), {stats['positions']} position(s) "
+            f"retenue(s), {stats['ignores']} ignoré(s), {ingesteur.assembleur.erreurs} erreur(s) NMEA, "
+            f"{stats['ecrites']} écrite(s) en {duree:.2f} s "
+            f"({stats['lignes'] / duree if duree else 0:.0f} lignes/s)."
+        ))
+
+    def _lire(self, ingesteur, flux):
+        for numero, ligne in enumerate(flux):
+            ingesteur.traiter_ligne(ligne)
+            if numero % 1000 == 0:
+                ingesteur.tic()
+
+    def _ecouter_udp(self, ingesteur, adresse):
+        hote, _, port = adresse.rpartition(':')
+        try:
+            port = int(port)
+        except ValueError:
+            raise CommandError(f"Adresse UDP invalide : {adresse}")
+
+        prise = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        prise.bind((hote or '0.0.0.0', port))
+        prise.settimeout(ingesteur.intervalle)
+        self.stdout.write(f"Écoute UDP sur {hote or '0.0.0.0'}:{port} (Ctrl+C pour arrêter).")
+        with prise:
+            while True:
+                try:
+                    datagramme = prise.recv(65535)
+                except socket.timeout:
+                    datagramme = b''
+                for ligne in datagramme.decode('ascii', errors='replace').splitlines():
+                    ingesteur.traiter_ligne(ligne)
+                ingesteur.tic()
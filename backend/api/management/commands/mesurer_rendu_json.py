@@ -0,0 +1,112 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.rendus_json import RenduJSON, orjson
+
+
+def navire_synthetique(numero):
+    """
+    Élément de la liste /navires/ (forme de NavireSerializer : propriétaire, activités,
+    moteurs, méta-données et historiques imbriqués), déterminé par son seul numéro.
+    """
+    debut = date(2015, 1, 1) + timedelta(days=numero % 3000)
+
+    def jour(decalage):
+        return (debut + timedelta(days=decalage)).isoformat()
+
+    statut = ('Valide', 'Bientôt expiré', 'Expiré')[numero % 3]
+    return {
+        'id': numero,
+        'proprietaire': {
+            'id': numero // 4, 'type_proprietaire_display': "Société", 'nom_proprietaire': f"Armement {numero // 4}",
+            'adresse': f"{numero % 200} quai des Pêcheurs, Port {numero % 50}", 'contact': f"+33 6 {numero:08d}",
+            'type_proprietaire': 'societe',
+        },
+        'activites': [{'id': 1 + numero % 7, 'nom_activite': "Pêche côtière"}, {'id': 9, 'nom_activite': "Transport"}],
+        'moteurs': [
+            {'id': 2 * numero + rang, 'nom_moteur': f"Moteur {rang + 1}", 'puissance': "350 CV", 'navire': numero}
+            for rang in range(2)
+        ],
+        'meta_donnees': [
+            {
+                'id': 3 * numero + rang, 'type_meta_donne': type_meta, 'nom_meta_donne': nom, 'fichier_meta_donne': None,
+                'valeur_texte': texte, 'navire': numero, 'valeur_display': texte, 'valeur_meta_donne': texte,
+                'valeur_nombre': nombre, 'valeur_date': date_meta, 'valeur_bool': None, 'valeur_heure': None,
+            }
+            for rang, (type_meta, nom, texte, nombre, date_meta) in enumerate([
+                ('NOMBRE', "Jauge brute", f"{numero % 900},5", f"{numero % 900}.50000000", None),
+                ('DATE', "Dernier carénage", jour(30), None, jour(30)),
+                ('TEXTE', "Observations", "Coque inspectée, RAS. " * 3, None, None),
+            ])
+        ],
+        'nom_navire': f"Navire {numero:06d}",
+        'num_immatricule': f"IMM-{numero:06d}",
+        'imo': f"{9000000 + numero}",
+        'mmsi': f"{227000000 + numero}",
+        'type_navire': "Chalutier",
+        'lieu_de_construction': "Concarneau",
+        'annee_de_construction': 1980 + numero % 45,
+        'nature_coque': "Acier",
+        'nbr_passager': numero % 12,
+        'nbr_equipage': 3 + numero % 9,
+        'photo_navire': f"http://localhost/media/cas/{numero % 256:02x}/{numero:064x}/photo.jpg",
+        'prochaine_echeance': jour(400),
+        'nb_expires': numero % 3,
+        'nb_bientot': numero % 2,
+        'statut_global': ('valide', 'bientot', 'expire')[numero % 3],
+        'assureurs': [1 + numero % 5],
+        'visites': [
+            {'id': 3 * numero + rang, 'statut': statut, 'date_visite': jour(365 * rang),
+             'expiration_permis': jour(365 * (rang + 1)), 'lieu_visite': "Lorient", 'navire': numero}
+            for rang in range(3)
+        ],
+        'visites_suivant': None,
+        'dossiers': [
+            {'id': 2 * numero + rang, 'statut': statut, 'type_dossier': type_dossier, 'date_emission': jour(100 * rang),
+             'date_expiration': jour(100 * rang + 730), 'navire': numero}
+            for rang, type_dossier in enumerate(["Permis de navigation", "Licence de pêche"])
+        ],
+        'dossiers_suivant': None,
+        'assurances': [
+            {'id': numero, 'assureur': {'id': 1 + numero % 5, 'nom_assureur': "Mutuelle Maritime"},
+             'date_debut': jour(0), 'date_fin': jour(365), 'statut': statut},
+        ],
+        'assurances_suivant': None,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le temps de rendu d'une liste /navires/ entre le JSONRenderer de DRF "
+        "(module json standard) et api.rendus_json.RenduJSON (orjson). La liste est "
+        "synthétique (forme de NavireSerializer, contenu reproductible) : la mesure ne dépend "
+        "pas de la base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nombre', type=int, default=10000, help="Nombre de navires de la liste.")
+        parser.add_argument('--repetitions', type=int, default=5, help="Nombre de rendus mesurés par renderer.")
+
+    def handle(self, *args, **options):
+        if options['nombre'] < 1:
+            raise CommandError("--nombre doit être positif.")
+        data = [navire_synthetique(numero) for numero in range(1, options['nombre'] + 1)]
+        self.stdout.write(f"Liste synthétique de {len(data)} navires.")
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson n'est pas installé : RenduJSON utilise json standard."))
+
+        resultats = {}
+        for nom, renderer in (('JSONRenderer (json)', JSONRenderer()), ('RenduJSON (orjson)', RenduJSON())):
+            durees = []
+            for _ in range(options['repetitions']):
+                debut = time.perf_counter()
+                contenu = renderer.render(data, 'application/json')
+                durees.append(time.perf_counter() - debut)
+            resultats[nom] = min(durees)
+            self.stdout.write(f"{nom:<22} {min(durees) * 1000:8.1f} ms (meilleur de {len(durees)}), {len(contenu) / 1024 / 1024:.1f} Mo")
+
+        reference, rapide = resultats.values()
+        self.stdout.write(self.style.SUCCESS(f"Accélération du rendu : x{reference / rapide:.1f}"))
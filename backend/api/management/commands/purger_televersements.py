@@ -0,0 +1,71 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import Televersement
+
+DOSSIER_TELEVERSEMENTS = 'televersements'
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les sessions de téléversement expirées (aucun fragment reçu depuis "
+        "TELEVERSEMENTS_DUREE secondes) et leurs fichiers partiels, ainsi que les fichiers "
+        "de televersements/ qui ne correspondent plus à aucune session (navire supprimé, "
+        "fragment interrompu). À planifier, par exemple une fois par heure."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Affiche ce qui serait supprimé, sans rien supprimer."
+        )
+
+    def handle(self, *args, **options):
+        simulation = options['dry_run']
+        expirees = Televersement.objects.toutes_organisations().filter(date_expiration__lte=timezone.now())
+
+        sessions = 0
+        for televersement in expirees.iterator():
+            sessions += 1
+            if not simulation:
+                chemin = default_storage.path(televersement.chemin_partiel)
+                if os.path.exists(chemin):
+                    os.remove(chemin)
+        if not simulation:
+            expirees.delete()
+
+        fichiers = self._fichiers_orphelins(simulation)
+        verbe = "à supprimer" if simulation else "supprimé(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{sessions} session(s) expirée(s) et {fichiers} fichier(s) orphelin(s) {verbe}."
+        ))
+
+    def _fichiers_orphelins(self, simulation):
+        """
+        Fichiers plus anciens que TELEVERSEMENTS_DUREE : <id>.part sans session, et
+        fragments <id>.*.tmp laissés par un processus arrêté en cours de réception.
+        """
+        dossier = default_storage.path(DOSSIER_TELEVERSEMENTS)
+        if not os.path.isdir(dossier):
+            return 0
+        en_cours = {
+            str(pk) for pk in Televersement.objects.toutes_organisations().values_list('pk', flat=True)
+        }
+        limite = time.time() - settings.TELEVERSEMENTS_DUREE
+
+        supprimes = 0
+        for entree in os.scandir(dossier):
+            session, _, extension = entree.name.partition('.')
+            if not entree.is_file() or entree.stat().st_mtime > limite:
+                continue
+            if extension == 'part' and session in en_cours:
+                continue
+            supprimes += 1
+            if not simulation:
+                os.remove(entree.path)
+        return supprimes
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.cache import invalider_cache
+from api.conformite import TAILLE_LOT_CONFORMITE, recalculer_conformite
+from api.evenements import publier
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les colonnes de conformité des navires (prochaine échéance, documents "
+        "expirés / bientôt expirés, statut global). À lancer chaque jour : les statuts "
+        "dépendent de la date du jour."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--navire', type=int, action='append', dest='navires',
+            help="Limite le recalcul à ce navire (option répétable)."
+        )
+        parser.add_argument(
+            '--taille-lot', type=int, default=TAILLE_LOT_CONFORMITE,
+            help="Nombre de navires traités par lot."
+        )
+
+    def handle(self, *args, **options):
+        debut = time.monotonic()
+        modifies = recalculer_conformite(options['navires'], taille_lot=options['taille_lot'])
+        if modifies:
+            invalider_cache('flotte')
+            publier('conformite', None, navires_modifies=modifies)
+        self.stdout.write(self.style.SUCCESS(
+            f"{modifies} navire(s) mis à jour en {time.monotonic() - debut:.1f} s."
+        ))
@@ -0,0 +1,28 @@
+from django.core import checks
+from django.core.management.base import BaseCommand, CommandError
+
+from api.checks import TAG_PERFORMANCE
+
+
+class Command(BaseCommand):
+    help = (
+        "Signale les réglages qui dégradent les performances (DEBUG, connexions non "
+        "persistantes, cache local, API navigable, envoi des médias, templates, journal SQL)."
+    )
+
+    requires_system_checks = []
+
+    def handle(self, *args, **options):
+        problemes = checks.run_checks(tags=[TAG_PERFORMANCE], include_deployment_checks=True)
+        if not problemes:
+            self.stdout.write(self.style.SUCCESS("Aucun problème de configuration détecté."))
+            return
+
+        for probleme in problemes:
+            style = self.style.ERROR if probleme.is_serious() else self.style.WARNING
+            self.stdout.write(style(f"{probleme.id}: {probleme.msg}"))
+            if probleme.hint:
+                self.stdout.write(f"    → {probleme.hint}")
+
+        if any(probleme.is_serious() for probleme in problemes):
+            raise CommandError("Configuration invalide.")
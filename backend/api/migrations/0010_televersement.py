@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:06
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_remove_metadonne_valeur_meta_donne_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Televersement',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('cible', models.CharField(choices=[('META_DONNE', 'Méta-donnée (FICHIER / IMAGE)'), ('PHOTO_NAVIRE', 'Photo du navire')], max_length=20)),
+                ('nom_fichier', models.CharField(max_length=255)),
+                ('taille_totale', models.PositiveBigIntegerField()),
+                ('taille_recue', models.PositiveBigIntegerField(default=0)),
+                ('type_meta_donne', models.CharField(blank=True, max_length=20)),
+                ('nom_meta_donne', models.CharField(blank=True, max_length=100)),
+                ('statut', models.CharField(choices=[('EN_COURS', 'En cours'), ('TERMINE', 'Terminé')], default='EN_COURS', max_length=20)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_maj', models.DateTimeField(auto_now=True)),
+                ('navire', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='televersements', to='api.navire')),
+            ],
+            options={
+                'verbose_name': 'Téléversement',
+                'verbose_name_plural': 'Téléversements',
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_televersement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContenuFichier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('empreinte', models.CharField(max_length=64, unique=True)),
+                ('nom', models.CharField(max_length=255, unique=True)),
+                ('taille', models.PositiveBigIntegerField(default=0)),
+                ('nb_references', models.IntegerField(default=0)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Contenu de fichier',
+                'verbose_name_plural': 'Contenus de fichiers',
+            },
+        ),
+        migrations.AlterField(
+            model_name='metadonne',
+            name='fichier_meta_donne',
+            field=models.FileField(blank=True, help_text='Utilisé pour les types FICHIER et IMAGE', max_length=255, null=True, upload_to='meta_donnees/fichiers/', verbose_name='Fichier/Image'),
+        ),
+        migrations.AlterField(
+            model_name='navire',
+            name='photo_navire',
+            field=models.ImageField(blank=True, max_length=255, null=True, upload_to='photos_navires/'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_contenufichier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='metadonne',
+            name='valeur_bool',
+            field=models.BooleanField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='metadonne',
+            name='valeur_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='metadonne',
+            name='valeur_heure',
+            field=models.TimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='metadonne',
+            name='valeur_nombre',
+            field=models.DecimalField(blank=True, decimal_places=8, editable=False, max_digits=24, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='metadonne',
+            index=models.Index(fields=['nom_meta_donne', 'valeur_nombre'], name='meta_nom_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='metadonne',
+            index=models.Index(fields=['nom_meta_donne', 'valeur_date'], name='meta_nom_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='metadonne',
+            index=models.Index(fields=['nom_meta_donne', 'valeur_heure'], name='meta_nom_heure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='metadonne',
+            index=models.Index(fields=['nom_meta_donne', 'valeur_bool'], name='meta_nom_bool_idx'),
+        ),
+    ]
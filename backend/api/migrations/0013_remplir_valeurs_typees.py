@@ -0,0 +1,62 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations
+from django.utils.dateparse import parse_date, parse_time
+
+TYPES_SCALAIRES = ['NOMBRE', 'DATE', 'HEURE', 'BOOLEEN']
+
+
+# Copie figée de api.models.valeurs_typees à la date de la migration
+def valeurs_typees(type_meta_donne, valeur_texte):
+    valeurs = {'valeur_nombre': None, 'valeur_date': None, 'valeur_bool': None, 'valeur_heure': None}
+    texte = (valeur_texte or '').strip()
+    if not texte:
+        return valeurs
+
+    try:
+        if type_meta_donne == 'NOMBRE':
+            nombre = Decimal(texte.replace(',', '.').replace(' ', ''))
+            if nombre.is_finite() and abs(nombre) < Decimal(10) ** 16:
+                valeurs['valeur_nombre'] = nombre
+        elif type_meta_donne == 'DATE':
+            valeurs['valeur_date'] = parse_date(texte)
+        elif type_meta_donne == 'HEURE':
+            valeurs['valeur_heure'] = parse_time(texte)
+        elif type_meta_donne == 'BOOLEEN':
+            if texte.lower() in ['true', '1', 'yes', 'oui', 'vrai']:
+                valeurs['valeur_bool'] = True
+            elif texte.lower() in ['false', '0', 'no', 'non', 'faux']:
+                valeurs['valeur_bool'] = False
+    except (InvalidOperation, ValueError):
+        pass
+    return valeurs
+
+
+def remplir_valeurs_typees(apps, schema_editor):
+    MetaDonne = apps.get_model('api', 'MetaDonne')
+    champs = ['valeur_nombre', 'valeur_date', 'valeur_bool', 'valeur_heure']
+
+    lot = []
+    queryset = MetaDonne.objects.filter(type_meta_donne__in=TYPES_SCALAIRES).only(
+        'id', 'type_meta_donne', 'valeur_texte', *champs
+    )
+    for meta in queryset.iterator(chunk_size=2000):
+        for champ, valeur in valeurs_typees(meta.type_meta_donne, meta.valeur_texte).items():
+            setattr(meta, champ, valeur)
+        lot.append(meta)
+        if len(lot) >= 2000:
+            MetaDonne.objects.bulk_update(lot, champs)
+            lot = []
+    if lot:
+        MetaDonne.objects.bulk_update(lot, champs)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_metadonne_valeurs_typees'),
+    ]
+
+    operations = [
+        migrations.RunPython(remplir_valeurs_typees, migrations.RunPython.noop),
+    ]
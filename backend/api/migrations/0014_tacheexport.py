@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:16
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_remplir_valeurs_typees'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TacheExport',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('type_export', models.CharField(choices=[('PDF_FILTRE', 'PDF combiné des navires filtrés')], max_length=20)),
+                ('statut', models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('EN_COURS', 'En cours'), ('TERMINE', 'Terminé'), ('ERREUR', 'Erreur')], default='EN_ATTENTE', max_length=20)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('traites', models.PositiveIntegerField(default=0)),
+                ('fichier', models.CharField(blank=True, max_length=255)),
+                ('erreur', models.TextField(blank=True)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_debut', models.DateTimeField(blank=True, null=True)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': "Tâche d'export",
+                'verbose_name_plural': "Tâches d'export",
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_tacheexport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='navire',
+            name='nb_bientot',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='navire',
+            name='nb_expires',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='navire',
+            name='prochaine_echeance',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='navire',
+            name='statut_global',
+            field=models.CharField(choices=[('expire', 'Expiré'), ('bientot', 'Expire Bientôt (30j)'), ('valide', 'Valide'), ('inconnu', 'Date inconnue')], default='inconnu', editable=False, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='navire',
+            index=models.Index(fields=['prochaine_echeance'], name='navire_echeance_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='navire',
+            index=models.Index(fields=['statut_global', 'prochaine_echeance'], name='navire_statut_echeance_idx'),
+        ),
+    ]
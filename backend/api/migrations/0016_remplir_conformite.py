@@ -0,0 +1,74 @@
+from datetime import date, timedelta
+
+from django.db import migrations
+from django.db.models import Count, Min, Q
+
+DELAI_BIENTOT = 30
+TAILLE_LOT = 2000
+
+# Copie figée de api.conformite à la date de la migration : modèle, champ d'échéance
+DOCUMENTS_ECHEANCE = [
+    ('Assurance', 'date_fin'),
+    ('Visite', 'expiration_permis'),
+    ('Dossier', 'date_expiration'),
+]
+CHAMPS_CONFORMITE = ['prochaine_echeance', 'nb_expires', 'nb_bientot', 'statut_global']
+
+
+def statut_global(nb_expires, nb_bientot, prochaine_echeance):
+    if nb_expires:
+        return 'expire'
+    if nb_bientot:
+        return 'bientot'
+    if prochaine_echeance:
+        return 'valide'
+    return 'inconnu'
+
+
+def remplir_conformite(apps, schema_editor):
+    Navire = apps.get_model('api', 'Navire')
+    today = date.today()
+    soon = today + timedelta(days=DELAI_BIENTOT)
+
+    agregats = {}
+    for nom_modele, champ in DOCUMENTS_ECHEANCE:
+        lignes = (
+            apps.get_model('api', nom_modele).objects.filter(**{f'{champ}__isnull': False})
+            .values('navire_id')
+            .annotate(
+                prochaine=Min(champ),
+                expires=Count('pk', filter=Q(**{f'{champ}__lt': today})),
+                bientot=Count('pk', filter=Q(**{f'{champ}__gte': today, f'{champ}__lte': soon})),
+            )
+            .order_by()
+        )
+        for ligne in lignes.iterator():
+            prochaine, expires, bientot = agregats.get(ligne['navire_id'], (None, 0, 0))
+            if prochaine is None or ligne['prochaine'] < prochaine:
+                prochaine = ligne['prochaine']
+            agregats[ligne['navire_id']] = (prochaine, expires + ligne['expires'], bientot + ligne['bientot'])
+
+    lot = []
+    for navire in Navire.objects.only('pk', *CHAMPS_CONFORMITE).iterator(chunk_size=TAILLE_LOT):
+        prochaine, expires, bientot = agregats.get(navire.pk, (None, 0, 0))
+        navire.prochaine_echeance = prochaine
+        navire.nb_expires = expires
+        navire.nb_bientot = bientot
+        navire.statut_global = statut_global(expires, bientot, prochaine)
+        lot.append(navire)
+        if len(lot) >= TAILLE_LOT:
+            Navire.objects.bulk_update(lot, CHAMPS_CONFORMITE)
+            lot = []
+    if lot:
+        Navire.objects.bulk_update(lot, CHAMPS_CONFORMITE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_navire_conformite'),
+    ]
+
+    operations = [
+        migrations.RunPython(remplir_conformite, migrations.RunPython.noop),
+    ]
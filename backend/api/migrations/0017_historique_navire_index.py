@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_remplir_conformite'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assurance',
+            index=models.Index(fields=['navire', 'date_debut', 'id'], name='assurance_navire_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dossier',
+            index=models.Index(fields=['navire', 'date_emission', 'id'], name='dossier_navire_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visite',
+            index=models.Index(fields=['navire', 'date_visite', 'id'], name='visite_navire_date_idx'),
+        ),
+    ]
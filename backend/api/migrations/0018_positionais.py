@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_historique_navire_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PositionAIS',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('horodatage', models.DateTimeField()),
+                ('latitude_ais', models.IntegerField()),
+                ('longitude_ais', models.IntegerField()),
+                ('vitesse', models.SmallIntegerField(blank=True, null=True)),
+                ('route', models.SmallIntegerField(blank=True, null=True)),
+                ('cap', models.SmallIntegerField(blank=True, null=True)),
+                ('statut_navigation', models.SmallIntegerField(blank=True, null=True)),
+                ('navire', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='positions_ais', to='api.navire')),
+            ],
+            options={
+                'verbose_name': 'Position AIS',
+                'verbose_name_plural': 'Positions AIS',
+                'indexes': [models.Index(fields=['navire', 'horodatage'], name='position_navire_date_idx')],
+            },
+        ),
+    ]
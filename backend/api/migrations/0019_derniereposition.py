@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+INDEX_GIST = 'derniere_pos_point_gist'
+
+# Copie figée de api.positions.cellule_grille à la date de la migration
+UNITES_PAR_DEGRE = 600000
+COLONNES_GRILLE = 360
+LIGNES_GRILLE = 180
+
+
+def cellule_grille(latitude_ais, longitude_ais):
+    ligne = min(max((latitude_ais + 90 * UNITES_PAR_DEGRE) // UNITES_PAR_DEGRE, 0), LIGNES_GRILLE - 1)
+    colonne = min(max((longitude_ais + 180 * UNITES_PAR_DEGRE) // UNITES_PAR_DEGRE, 0), COLONNES_GRILLE - 1)
+    return ligne * COLONNES_GRILLE + colonne
+
+
+def creer_index_spatial(apps, schema_editor):
+    # Type géométrique natif de PostgreSQL : pas d'extension PostGIS requise
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX {INDEX_GIST} ON api_derniereposition "
+            "USING gist (point(longitude_ais, latitude_ais))"
+        )
+
+
+def supprimer_index_spatial(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX_GIST}")
+
+
+def remplir_dernieres_positions(apps, schema_editor):
+    PositionAIS = apps.get_model('api', 'PositionAIS')
+    DernierePosition = apps.get_model('api', 'DernierePosition')
+    champs = ['horodatage', 'latitude_ais', 'longitude_ais', 'vitesse', 'route', 'cap', 'statut_navigation']
+    dernieres = PositionAIS.objects.annotate(
+        rang=Window(RowNumber(), partition_by=F('navire_id'), order_by=F('horodatage').desc())
+    ).filter(rang=1).values('navire_id', *champs)
+    DernierePosition.objects.bulk_create(
+        (DernierePosition(cellule=cellule_grille(ligne['latitude_ais'], ligne['longitude_ais']), **ligne)
+         for ligne in dernieres.iterator()),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_positionais'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DernierePosition',
+            fields=[
+                ('navire', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='derniere_position', serialize=False, to='api.navire')),
+                ('horodatage', models.DateTimeField()),
+                ('latitude_ais', models.IntegerField()),
+                ('longitude_ais', models.IntegerField()),
+                ('vitesse', models.SmallIntegerField(blank=True, null=True)),
+                ('route', models.SmallIntegerField(blank=True, null=True)),
+                ('cap', models.SmallIntegerField(blank=True, null=True)),
+                ('statut_navigation', models.SmallIntegerField(blank=True, null=True)),
+                ('cellule', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Dernière position AIS',
+                'verbose_name_plural': 'Dernières positions AIS',
+                'indexes': [models.Index(fields=['cellule', 'latitude_ais'], name='derniere_pos_cellule_idx')],
+            },
+        ),
+        migrations.RunPython(creer_index_spatial, supprimer_index_spatial),
+        migrations.RunPython(remplir_dernieres_positions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SLUG_PAR_DEFAUT = 'defaut'
+
+
+def rattacher_organisation_par_defaut(apps, schema_editor):
+    """
+    Les données existantes appartiennent à l'organisation par défaut. Les colonnes ne
+    deviennent obligatoires que dans 0020b : sous PostgreSQL, les contraintes de clé
+    étrangère sont DEFERRABLE INITIALLY DEFERRED, et un ALTER TABLE dans la transaction
+    de cet UPDATE échouerait (« pending trigger events »).
+    """
+    Organisation = apps.get_model('api', 'Organisation')
+    organisation, _ = Organisation.objects.get_or_create(
+        slug=SLUG_PAR_DEFAUT, defaults={'nom': "Organisation par défaut"}
+    )
+    for nom_modele in ('Navire', 'Proprietaire', 'TacheExport'):
+        apps.get_model('api', nom_modele).objects.update(organisation=organisation)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_derniereposition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Organisation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=200)),
+                ('slug', models.SlugField(help_text="Valeur de l'en-tête X-Organisation", unique=True)),
+                ('domaine', models.CharField(blank=True, help_text="Nom d'hôte servant cette organisation (ex. port-exemple.navbases.fr)", max_length=255)),
+            ],
+            options={
+                'verbose_name': 'Organisation',
+                'verbose_name_plural': 'Organisations',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='navire',
+            name='navire_echeance_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='navire',
+            name='navire_statut_echeance_idx',
+        ),
+        migrations.AlterField(
+            model_name='navire',
+            name='num_immatricule',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddField(
+            model_name='navire',
+            name='organisation',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.organisation'),
+        ),
+        migrations.AddField(
+            model_name='proprietaire',
+            name='organisation',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.organisation'),
+        ),
+        migrations.AddField(
+            model_name='tacheexport',
+            name='organisation',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.organisation'),
+        ),
+        migrations.RunPython(rattacher_organisation_par_defaut, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Organisation obligatoire et index par organisation, dans une transaction distincte
+# de la mise à jour des lignes existantes (voir 0020_organisation)
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_organisation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='navire',
+            name='organisation',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.organisation'),
+        ),
+        migrations.AlterField(
+            model_name='proprietaire',
+            name='organisation',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.organisation'),
+        ),
+        migrations.AlterField(
+            model_name='tacheexport',
+            name='organisation',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.organisation'),
+        ),
+        migrations.AddIndex(
+            model_name='navire',
+            index=models.Index(fields=['organisation', 'prochaine_echeance'], name='navire_org_echeance_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='navire',
+            index=models.Index(fields=['organisation', 'statut_global', 'prochaine_echeance'], name='navire_org_statut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='navire',
+            index=models.Index(fields=['organisation', 'nom_navire', 'id'], name='navire_org_nom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proprietaire',
+            index=models.Index(fields=['organisation', 'nom_proprietaire', 'id'], name='proprietaire_org_nom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tacheexport',
+            index=models.Index(fields=['organisation', 'date_creation'], name='tache_org_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='navire',
+            constraint=models.UniqueConstraint(fields=('organisation', 'num_immatricule'), name='navire_org_immatricule_uniq'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:57
+
+from django.db import migrations, models
+
+# Recherche de l'administration ('^nom' -> UPPER(col::text) LIKE 'X%', '=col' -> UPPER(col::text) = 'X') :
+# index d'expression en text_pattern_ops, menés par l'organisation (PostgreSQL uniquement)
+INDEX_RECHERCHE = {
+    'navire_org_nom_upper_idx': ('api_navire', 'nom_navire'),
+    'navire_org_immat_upper_idx': ('api_navire', 'num_immatricule'),
+    'proprietaire_org_nom_upper_idx': ('api_proprietaire', 'nom_proprietaire'),
+}
+
+
+def creer_index_recherche(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for nom, (table, colonne) in INDEX_RECHERCHE.items():
+            schema_editor.execute(
+                f"CREATE INDEX {nom} ON {table} (organisation_id, (UPPER({colonne}::text)) text_pattern_ops)"
+            )
+
+
+def supprimer_index_recherche(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for nom in INDEX_RECHERCHE:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {nom}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020b_organisation_obligatoire'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assurance',
+            index=models.Index(fields=['date_fin'], name='assurance_fin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dossier',
+            index=models.Index(fields=['date_expiration'], name='dossier_expiration_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visite',
+            index=models.Index(fields=['expiration_permis'], name='visite_expiration_idx'),
+        ),
+        migrations.RunPython(creer_index_recherche, supprimer_index_recherche),
+    ]
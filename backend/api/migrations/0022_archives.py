@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_index_administration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveAssurance',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date_debut', models.DateField()),
+                ('date_fin', models.DateField()),
+                ('date_archivage', models.DateTimeField()),
+                ('assureur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assurances_archivees', to='api.assureur')),
+                ('navire', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assurances_archivees', to='api.navire')),
+            ],
+            options={
+                'verbose_name': 'Assurance archivée',
+                'verbose_name_plural': 'Assurances archivées',
+                'indexes': [models.Index(fields=['navire', 'date_debut', 'id'], name='archive_assurance_navire_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchiveDossier',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('type_dossier', models.CharField(max_length=100)),
+                ('date_emission', models.DateField()),
+                ('date_expiration', models.DateField(blank=True, null=True)),
+                ('date_archivage', models.DateTimeField()),
+                ('navire', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dossiers_archives', to='api.navire')),
+            ],
+            options={
+                'verbose_name': 'Dossier archivé',
+                'verbose_name_plural': 'Dossiers archivés',
+                'indexes': [models.Index(fields=['navire', 'date_emission', 'id'], name='archive_dossier_navire_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchiveVisite',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date_visite', models.DateField()),
+                ('expiration_permis', models.DateField()),
+                ('lieu_visite', models.CharField(max_length=200)),
+                ('date_archivage', models.DateTimeField()),
+                ('navire', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visites_archivees', to='api.navire')),
+            ],
+            options={
+                'verbose_name': 'Visite archivée',
+                'verbose_name_plural': 'Visites archivées',
+                'indexes': [models.Index(fields=['navire', 'date_visite', 'id'], name='archive_visite_navire_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_archives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tacheexport',
+            name='date_activite',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tacheexport',
+            name='parametres',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='tacheexport',
+            name='tentatives',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='tacheexport',
+            index=models.Index(fields=['statut', 'date_creation'], name='tache_statut_date_idx'),
+        ),
+    ]
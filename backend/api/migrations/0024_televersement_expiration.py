@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:35
+
+import api.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_tacheexport_reprise'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='televersement',
+            name='date_expiration',
+            field=models.DateTimeField(default=api.models.expiration_televersement),
+        ),
+        migrations.AddIndex(
+            model_name='televersement',
+            index=models.Index(fields=['date_expiration'], name='televersement_expiration_idx'),
+        ),
+    ]
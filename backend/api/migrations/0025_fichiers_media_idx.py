@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_televersement_expiration'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='metadonne',
+            index=models.Index(fields=['fichier_meta_donne'], name='meta_fichier_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='navire',
+            index=models.Index(fields=['organisation', 'photo_navire'], name='navire_org_photo_idx'),
+        ),
+    ]
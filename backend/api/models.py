@@ -1,7 +1,56 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+from decimal import Decimal, InvalidOperation
 import os
+import uuid
+
+from .organisations import ManagerOrganisation, organisation_courante, organisation_par_defaut_id
+
+
+class Organisation(models.Model):
+    """Autorité portuaire hébergée sur le déploiement (voir api/organisations.py)."""
+    nom = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=50, unique=True, help_text="Valeur de l'en-tête X-Organisation")
+    domaine = models.CharField(
+        max_length=255, blank=True,
+        help_text="Nom d'hôte servant cette organisation (ex. port-exemple.navbases.fr)"
+    )
+
+    class Meta:
+        verbose_name = "Organisation"
+        verbose_name_plural = "Organisations"
+
+    def __str__(self):
+        return self.nom
+
+
+class DonneesOrganisation(models.Model):
+    """
+    Entité racine appartenant à une organisation. L'organisation est fixée à la création
+    (organisation de la requête, sinon organisation par défaut) et n'est pas exposée par l'API.
+    Pas d'index simple sur la clé : chaque modèle déclare des index composites qui la mènent.
+    """
+    organisation = models.ForeignKey(
+        Organisation, on_delete=models.PROTECT, related_name='+', editable=False, db_index=False
+    )
 
-class Proprietaire(models.Model):
+    objects = ManagerOrganisation()
+    chemin_organisation = 'organisation'
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.organisation_id is None:
+            self.organisation_id = organisation_courante() or organisation_par_defaut_id()
+        super().save(*args, **kwargs)
+
+
+class Proprietaire(DonneesOrganisation):
     TYPE_PROPRIETAIRE_CHOICES = [
         ('particulier', 'Particulier'),
         ('entreprise', 'Entreprise'),
@@ -18,6 +67,11 @@ class Proprietaire(models.Model):
         default='particulier'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['organisation', 'nom_proprietaire', 'id'], name='proprietaire_org_nom_idx'),
+        ]
+
     def __str__(self):
         return self.nom_proprietaire
 
@@ -37,7 +91,7 @@ class Assureur(models.Model):
         verbose_name = "Assureur"
         verbose_name_plural = "Assureurs"
 
-class Navire(models.Model):
+class Navire(DonneesOrganisation):
     NATURE_COQUE_CHOICES = [
         ('Bois', 'Bois'), ('Contreplaqué', 'Contreplaqué'), ('Fer', 'Fer'), ('Acier', 'Acier'),
         ('Aluminium', 'Aluminium'), ('Plastique', 'Plastique'), ('Fibre de verre', 'Fibre de verre'),
@@ -45,7 +99,7 @@ class Navire(models.Model):
         ('Titane', 'Titane'),
     ]
     nom_navire = models.CharField(max_length=200)
-    num_immatricule = models.CharField(max_length=100, unique=True)
+    num_immatricule = models.CharField(max_length=100)
     imo = models.CharField("IMO", max_length=50, blank=True)
     mmsi = models.CharField("MMSI", max_length=50, blank=True)
     type_navire = models.CharField(max_length=100)
@@ -54,7 +108,7 @@ class Navire(models.Model):
     nature_coque = models.CharField(max_length=100, choices=NATURE_COQUE_CHOICES, blank=True, null=True)
     nbr_passager = models.PositiveIntegerField(default=0)
     nbr_equipage = models.PositiveIntegerField(default=0)
-    photo_navire = models.ImageField(upload_to='photos_navires/', blank=True, null=True)
+    photo_navire = models.ImageField(upload_to='photos_navires/', max_length=255, blank=True, null=True)
     proprietaire = models.ForeignKey(
         Proprietaire, 
         on_delete=models.SET_NULL, 
@@ -62,10 +116,35 @@ class Navire(models.Model):
     ) 
     activites = models.ManyToManyField(Activite, blank=True, related_name='navires_pratiquant') 
     assureurs = models.ManyToManyField(Assureur, through='Assurance', related_name='navires_assures') 
+
+    # Conformité précalculée (voir api/conformite.py), non modifiable via l'API
+    STATUT_GLOBAL_CHOICES = [
+        ('expire', 'Expiré'),
+        ('bientot', 'Expire Bientôt (30j)'),
+        ('valide', 'Valide'),
+        ('inconnu', 'Date inconnue'),
+    ]
+    prochaine_echeance = models.DateField(blank=True, null=True, editable=False)
+    nb_expires = models.PositiveIntegerField(default=0, editable=False)
+    nb_bientot = models.PositiveIntegerField(default=0, editable=False)
+    statut_global = models.CharField(max_length=10, choices=STATUT_GLOBAL_CHOICES, default='inconnu', editable=False)
     
     class Meta:
         verbose_name = "Navire"
         verbose_name_plural = "Navires"
+        # Immatriculation unique au sein d'une organisation ; index menés par l'organisation
+        constraints = [
+            models.UniqueConstraint(fields=['organisation', 'num_immatricule'], name='navire_org_immatricule_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['organisation', 'prochaine_echeance'], name='navire_org_echeance_idx'),
+            models.Index(
+                fields=['organisation', 'statut_global', 'prochaine_echeance'], name='navire_org_statut_idx'
+            ),
+            models.Index(fields=['organisation', 'nom_navire', 'id'], name='navire_org_nom_idx'),
+            # Contrôle d'accès aux fichiers média (api/fichiers.servir_media)
+            models.Index(fields=['organisation', 'photo_navire'], name='navire_org_photo_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nom_navire} ({self.num_immatricule})"
@@ -76,9 +155,18 @@ class Assurance(models.Model):
     date_debut = models.DateField()
     date_fin = models.DateField()
     
+    objects = ManagerOrganisation()
+    chemin_organisation = 'navire__organisation'
+
     class Meta: 
         verbose_name = "Assurance Navire"
         verbose_name_plural = "Assurances Navires"
+        # Historique d'un navire paginé par curseur (date décroissante)
+        indexes = [
+            models.Index(fields=['navire', 'date_debut', 'id'], name='assurance_navire_date_idx'),
+            # Alertes d'expiration et hiérarchie de dates de l'administration
+            models.Index(fields=['date_fin'], name='assurance_fin_idx'),
+        ]
         
     def __str__(self):
         return f"Assurance de {self.navire.nom_navire} par {self.assureur.nom_assureur}"
@@ -93,6 +181,9 @@ class Moteur(models.Model):
         related_name='moteurs'
     ) 
     
+    objects = ManagerOrganisation()
+    chemin_organisation = 'navire__organisation'
+
     class Meta:
         verbose_name = "Moteur"
         verbose_name_plural = "Moteurs"
@@ -111,9 +202,18 @@ class Visite(models.Model):
         related_name='visites'
     ) 
     
+    objects = ManagerOrganisation()
+    chemin_organisation = 'navire__organisation'
+
     class Meta:
         verbose_name = "Visite"
         verbose_name_plural = "Visites"
+        # Historique d'un navire paginé par curseur (date décroissante)
+        indexes = [
+            models.Index(fields=['navire', 'date_visite', 'id'], name='visite_navire_date_idx'),
+            # Alertes d'expiration et hiérarchie de dates de l'administration
+            models.Index(fields=['expiration_permis'], name='visite_expiration_idx'),
+        ]
 
     def __str__(self):
         return f"Visite du {self.date_visite} pour {self.navire.nom_navire}"
@@ -129,13 +229,56 @@ class Dossier(models.Model):
         related_name='dossiers'
     ) 
     
+    objects = ManagerOrganisation()
+    chemin_organisation = 'navire__organisation'
+
     class Meta:
         verbose_name = "Dossier"
         verbose_name_plural = "Dossiers"
+        # Historique d'un navire paginé par curseur (date décroissante)
+        indexes = [
+            models.Index(fields=['navire', 'date_emission', 'id'], name='dossier_navire_date_idx'),
+            # Alertes d'expiration et hiérarchie de dates de l'administration
+            models.Index(fields=['date_expiration'], name='dossier_expiration_idx'),
+        ]
 
     def __str__(self):
         return f"{self.type_dossier} pour {self.navire.nom_navire}"
 
+VALEURS_BOOLEEN_VRAI = ['true', '1', 'yes', 'oui', 'vrai']
+VALEURS_BOOLEEN_FAUX = ['false', '0', 'no', 'non', 'faux']
+
+
+def valeurs_typees(type_meta_donne, valeur_texte):
+    """
+    Convertit valeur_texte selon le type de méta-donnée.
+    Retourne les quatre colonnes typées ; seule celle du type concerné est renseignée
+    (None si la valeur n'est pas interprétable).
+    """
+    valeurs = {'valeur_nombre': None, 'valeur_date': None, 'valeur_bool': None, 'valeur_heure': None}
+    texte = (valeur_texte or '').strip()
+    if not texte:
+        return valeurs
+
+    try:
+        if type_meta_donne == 'NOMBRE':
+            nombre = Decimal(texte.replace(',', '.').replace(' ', ''))
+            if nombre.is_finite() and abs(nombre) < Decimal(10) ** 16:
+                valeurs['valeur_nombre'] = nombre
+        elif type_meta_donne == 'DATE':
+            valeurs['valeur_date'] = parse_date(texte)
+        elif type_meta_donne == 'HEURE':
+            valeurs['valeur_heure'] = parse_time(texte)
+        elif type_meta_donne == 'BOOLEEN':
+            if texte.lower() in VALEURS_BOOLEEN_VRAI:
+                valeurs['valeur_bool'] = True
+            elif texte.lower() in VALEURS_BOOLEEN_FAUX:
+                valeurs['valeur_bool'] = False
+    except (InvalidOperation, ValueError):
+        pass
+    return valeurs
+
+
 class MetaDonne(models.Model):
     TYPE_CHOICES = (
         ('TEXTE', 'Texte (Court ou Long)'), 
@@ -162,6 +305,7 @@ class MetaDonne(models.Model):
     
     fichier_meta_donne = models.FileField(
         upload_to='meta_donnees/fichiers/',
+        max_length=255,
         blank=True,
         null=True,
         verbose_name="Fichier/Image",
@@ -175,6 +319,13 @@ class MetaDonne(models.Model):
         help_text="Utilisé pour les types TEXTE, NOMBRE, DATE, HEURE, BOOLEEN, URL"
     )
     
+    # Colonnes typées remplies à l'enregistrement depuis valeur_texte,
+    # pour filtrer/trier en SQL sans re-parser le texte
+    valeur_nombre = models.DecimalField(max_digits=24, decimal_places=8, blank=True, null=True, editable=False)
+    valeur_date = models.DateField(blank=True, null=True, editable=False)
+    valeur_bool = models.BooleanField(blank=True, null=True, editable=False)
+    valeur_heure = models.TimeField(blank=True, null=True, editable=False)
+    
     # Relation avec le Navire
     navire = models.ForeignKey(
         'Navire',
@@ -182,10 +333,20 @@ class MetaDonne(models.Model):
         related_name='meta_donnees'
     ) 
     
+    objects = ManagerOrganisation()
+    chemin_organisation = 'navire__organisation'
+
     class Meta:
         verbose_name = "Méta-Donnée"
         verbose_name_plural = "Méta-Données"
         unique_together = ('navire', 'nom_meta_donne')
+        indexes = [
+            models.Index(fields=['nom_meta_donne', 'valeur_nombre'], name='meta_nom_nombre_idx'),
+            models.Index(fields=['nom_meta_donne', 'valeur_date'], name='meta_nom_date_idx'),
+            models.Index(fields=['nom_meta_donne', 'valeur_heure'], name='meta_nom_heure_idx'),
+            models.Index(fields=['nom_meta_donne', 'valeur_bool'], name='meta_nom_bool_idx'),
+            models.Index(fields=['fichier_meta_donne'], name='meta_fichier_idx'),
+        ]
 
     def __str__(self):
         if self.type_meta_donne in ['FICHIER', 'IMAGE']:
@@ -238,6 +399,10 @@ class MetaDonne(models.Model):
                 except MetaDonne.DoesNotExist:
                     pass
         
+        # Colonnes typées
+        for champ, valeur in valeurs_typees(self.type_meta_donne, self.valeur_texte).items():
+            setattr(self, champ, valeur)
+        
         super().save(*args, **kwargs)
     
     def delete(self, *args, **kwargs):
@@ -246,4 +411,282 @@ class MetaDonne(models.Model):
         """
         if self.fichier_meta_donne:
             self.fichier_meta_donne.delete(save=False)
-        super().delete(*args, **kwargs)
\ No newline at end of file
+        super().delete(*args, **kwargs)
+
+def expiration_televersement():
+    """Échéance d'une session de téléversement, repoussée à chaque fragment reçu."""
+    return timezone.now() + timedelta(seconds=settings.TELEVERSEMENTS_DUREE)
+
+
+class Televersement(models.Model):
+    """
+    Session de téléversement fragmenté (reprenable) pour les fichiers volumineux.
+    Les fragments sont écrits directement dans un fichier partiel sur le stockage,
+    puis le fichier complet est rattaché à une méta-donnée ou à la photo du navire.
+    Une session sans fragment reçu avant date_expiration est abandonnée : elle et son
+    fichier partiel sont supprimés par la commande purger_televersements.
+    """
+    CIBLE_CHOICES = [
+        ('META_DONNE', 'Méta-donnée (FICHIER / IMAGE)'),
+        ('PHOTO_NAVIRE', 'Photo du navire'),
+    ]
+    STATUT_CHOICES = [
+        ('EN_COURS', 'En cours'),
+        ('TERMINE', 'Terminé'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    cible = models.CharField(max_length=20, choices=CIBLE_CHOICES)
+    navire = models.ForeignKey(Navire, on_delete=models.CASCADE, related_name='televersements')
+    nom_fichier = models.CharField(max_length=255)
+    taille_totale = models.PositiveBigIntegerField()
+    taille_recue = models.PositiveBigIntegerField(default=0)
+    type_meta_donne = models.CharField(max_length=20, blank=True)
+    nom_meta_donne = models.CharField(max_length=100, blank=True)
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='EN_COURS')
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_maj = models.DateTimeField(auto_now=True)
+    date_expiration = models.DateTimeField(default=expiration_televersement)
+
+    objects = ManagerOrganisation()
+    chemin_organisation = 'navire__organisation'
+
+    class Meta:
+        verbose_name = "Téléversement"
+        verbose_name_plural = "Téléversements"
+        indexes = [
+            # Purge des sessions expirées (purger_televersements)
+            models.Index(fields=['date_expiration'], name='televersement_expiration_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nom_fichier} ({self.taille_recue}/{self.taille_totale})"
+
+    @property
+    def chemin_partiel(self):
+        """Chemin (relatif au stockage) du fichier partiel en cours de réception."""
+        return f"televersements/{self.id}.part"
+
+    @property
+    def est_expire(self):
+        return self.date_expiration <= timezone.now()
+
+    @property
+    def est_complet(self):
+        return self.taille_recue >= self.taille_totale
+
+
+class ContenuFichier(models.Model):
+    """
+    Blob stocké une seule fois, adressé par son empreinte SHA-256.
+    nb_references compte les champs (MetaDonne.fichier_meta_donne, Navire.photo_navire)
+    qui pointent vers ce blob ; le fichier est supprimé quand il n'est plus référencé.
+    """
+    empreinte = models.CharField(max_length=64, unique=True)
+    nom = models.CharField(max_length=255, unique=True)
+    taille = models.PositiveBigIntegerField(default=0)
+    nb_references = models.IntegerField(default=0)
+    date_creation = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Contenu de fichier"
+        verbose_name_plural = "Contenus de fichiers"
+
+    def __str__(self):
+        return f"{self.nom} ({self.nb_references} réf.)"
+
+
+class TacheExport(DonneesOrganisation):
+    """
+    Export long exécuté en arrière-plan (ex: PDF combiné de plusieurs navires).
+    Le client suit la progression via son identifiant puis télécharge le résultat.
+    La tâche porte ses paramètres : elle peut être exécutée ou reprise par un autre
+    processus (commande executer_exports) ; date_activite est mise à jour à chaque lot.
+    """
+    TYPE_CHOICES = [
+        ('PDF_FILTRE', 'PDF combiné des navires filtrés'),
+    ]
+    STATUT_CHOICES = [
+        ('EN_ATTENTE', 'En attente'),
+        ('EN_COURS', 'En cours'),
+        ('TERMINE', 'Terminé'),
+        ('ERREUR', 'Erreur'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    type_export = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='EN_ATTENTE')
+    total = models.PositiveIntegerField(default=0)
+    traites = models.PositiveIntegerField(default=0)
+    fichier = models.CharField(max_length=255, blank=True)
+    erreur = models.TextField(blank=True)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_debut = models.DateTimeField(blank=True, null=True)
+    date_fin = models.DateTimeField(blank=True, null=True)
+    parametres = models.JSONField(default=dict, blank=True)
+    date_activite = models.DateTimeField(blank=True, null=True)
+    tentatives = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Tâche d'export"
+        verbose_name_plural = "Tâches d'export"
+        indexes = [
+            models.Index(fields=['organisation', 'date_creation'], name='tache_org_date_idx'),
+            # File d'attente des exécutants (executer_exports)
+            models.Index(fields=['statut', 'date_creation'], name='tache_statut_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_type_export_display()} ({self.traites}/{self.total}, {self.statut})"
+
+    @property
+    def progression(self):
+        return round(self.traites / self.total, 4) if self.total else 1.0
+
+    @property
+    def debit(self):
+        """Fiches traitées par seconde."""
+        if not self.date_debut or not self.traites:
+            return None
+        fin = self.date_fin or timezone.now()
+        duree = (fin - self.date_debut).total_seconds()
+        return round(self.traites / duree, 2) if duree > 0 else None
+
+
+class PositionAIS(models.Model):
+    """
+    Série temporelle des positions AIS reçues pour les navires de la flotte (voir api/ais.py).
+    Stockage compact en unités AIS entières : latitude / longitude en 1/600 000 de degré,
+    vitesse en dixièmes de nœud, route et cap en dixièmes de degré.
+    """
+    navire = models.ForeignKey(Navire, on_delete=models.CASCADE, related_name='positions_ais')
+    horodatage = models.DateTimeField()
+    latitude_ais = models.IntegerField()
+    longitude_ais = models.IntegerField()
+    vitesse = models.SmallIntegerField(blank=True, null=True)
+    route = models.SmallIntegerField(blank=True, null=True)
+    cap = models.SmallIntegerField(blank=True, null=True)
+    statut_navigation = models.SmallIntegerField(blank=True, null=True)
+
+    objects = ManagerOrganisation()
+    chemin_organisation = 'navire__organisation'
+
+    class Meta:
+        verbose_name = "Position AIS"
+        verbose_name_plural = "Positions AIS"
+        indexes = [models.Index(fields=['navire', 'horodatage'], name='position_navire_date_idx')]
+
+    def __str__(self):
+        return f"{self.navire_id} @ {self.horodatage:%Y-%m-%d %H:%M:%S} ({self.latitude:.5f}, {self.longitude:.5f})"
+
+    @property
+    def latitude(self):
+        return self.latitude_ais / 600000
+
+    @property
+    def longitude(self):
+        return self.longitude_ais / 600000
+
+
+class DernierePosition(models.Model):
+    """
+    Dernière position AIS de chaque navire, tenue à jour par l'ingestion (api/ais.py) pour
+    la carte de la flotte sans parcourir l'historique. `cellule` : case de 1° de la grille
+    utilisée comme index spatial hors PostgreSQL (voir api/positions.py).
+    """
+    navire = models.OneToOneField(
+        Navire, on_delete=models.CASCADE, primary_key=True, related_name='derniere_position'
+    )
+    horodatage = models.DateTimeField()
+    latitude_ais = models.IntegerField()
+    longitude_ais = models.IntegerField()
+    vitesse = models.SmallIntegerField(blank=True, null=True)
+    route = models.SmallIntegerField(blank=True, null=True)
+    cap = models.SmallIntegerField(blank=True, null=True)
+    statut_navigation = models.SmallIntegerField(blank=True, null=True)
+    cellule = models.IntegerField()
+
+    objects = ManagerOrganisation()
+    chemin_organisation = 'navire__organisation'
+
+    class Meta:
+        verbose_name = "Dernière position AIS"
+        verbose_name_plural = "Dernières positions AIS"
+        indexes = [models.Index(fields=['cellule', 'latitude_ais'], name='derniere_pos_cellule_idx')]
+
+    def __str__(self):
+        return f"{self.navire_id} @ {self.horodatage:%Y-%m-%d %H:%M:%S} ({self.latitude:.5f}, {self.longitude:.5f})"
+
+    @property
+    def latitude(self):
+        return self.latitude_ais / 600000
+
+    @property
+    def longitude(self):
+        return self.longitude_ais / 600000
+
+
+class ArchiveVisite(models.Model):
+    """
+    Visite échue déplacée hors de la table courante (voir api/archives.py) : mêmes colonnes
+    et même identifiant que dans Visite.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    date_visite = models.DateField()
+    expiration_permis = models.DateField()
+    lieu_visite = models.CharField(max_length=200)
+    navire = models.ForeignKey(Navire, on_delete=models.CASCADE, related_name='visites_archivees')
+    date_archivage = models.DateTimeField()
+
+    objects = ManagerOrganisation()
+    chemin_organisation = 'navire__organisation'
+
+    class Meta:
+        verbose_name = "Visite archivée"
+        verbose_name_plural = "Visites archivées"
+        indexes = [models.Index(fields=['navire', 'date_visite', 'id'], name='archive_visite_navire_idx')]
+
+    def __str__(self):
+        return f"Visite du {self.date_visite} (archivée)"
+
+
+class ArchiveDossier(models.Model):
+    """Dossier échu archivé (voir ArchiveVisite)."""
+    id = models.BigIntegerField(primary_key=True)
+    type_dossier = models.CharField(max_length=100)
+    date_emission = models.DateField()
+    date_expiration = models.DateField(blank=True, null=True)
+    navire = models.ForeignKey(Navire, on_delete=models.CASCADE, related_name='dossiers_archives')
+    date_archivage = models.DateTimeField()
+
+    objects = ManagerOrganisation()
+    chemin_organisation = 'navire__organisation'
+
+    class Meta:
+        verbose_name = "Dossier archivé"
+        verbose_name_plural = "Dossiers archivés"
+        indexes = [models.Index(fields=['navire', 'date_emission', 'id'], name='archive_dossier_navire_idx')]
+
+    def __str__(self):
+        return f"{self.type_dossier} (archivé)"
+
+
+class ArchiveAssurance(models.Model):
+    """Assurance échue archivée (voir ArchiveVisite)."""
+    id = models.BigIntegerField(primary_key=True)
+    navire = models.ForeignKey(Navire, on_delete=models.CASCADE, related_name='assurances_archivees')
+    assureur = models.ForeignKey(Assureur, on_delete=models.CASCADE, related_name='assurances_archivees')
+    date_debut = models.DateField()
+    date_fin = models.DateField()
+    date_archivage = models.DateTimeField()
+
+    objects = ManagerOrganisation()
+    chemin_organisation = 'navire__organisation'
+
+    class Meta:
+        verbose_name = "Assurance archivée"
+        verbose_name_plural = "Assurances archivées"
+        indexes = [models.Index(fields=['navire', 'date_debut', 'id'], name='archive_assurance_navire_idx')]
+
+    def __str__(self):
+        return f"Assurance du {self.date_debut} au {self.date_fin} (archivée)"
@@ -0,0 +1,150 @@
+"""
+Hébergement de plusieurs organisations (autorités portuaires) sur un même déploiement.
+
+- Les entités racines (Navire, Proprietaire, TacheExport) portent une clé étrangère vers
+  Organisation, en tête de leurs index composites ; les documents, moteurs, méta-données
+  et positions en héritent via leur navire (chemin_organisation = 'navire__organisation').
+  Activités et assureurs restent des référentiels communs.
+- OrganisationMiddleware détermine l'organisation de la requête : nom d'hôte
+  (Organisation.domaine), sinon l'organisation settings.ORGANISATION_PAR_DEFAUT
+  (déploiement mono-organisation). Sur un déploiement partagé, chaque organisation a
+  donc son domaine.
+- L'en-tête X-Organisation (slug) n'est pris en compte qu'avec
+  settings.ORGANISATION_ENTETE_DE_CONFIANCE : le client peut le choisir librement, il
+  ne doit donc venir que d'un proxy frontal qui le fixe lui-même (après authentification)
+  et par lequel passent toutes les requêtes.
+- ManagerOrganisation restreint alors automatiquement chaque requête ORM à cette
+  organisation, y compris les querysets construits à l'import (attribut `queryset` des
+  viewsets, champs de serializers) : la condition est résolue à l'exécution.
+- Hors requête (commandes, migrations, threads), rien n'est restreint, sauf dans un bloc
+  `with organisation_active(id):`.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+from django.http import JsonResponse
+
+ENTETE_ORGANISATION = 'HTTP_X_ORGANISATION'
+
+_organisation_courante = ContextVar('organisation_courante', default=None)
+
+
+def organisation_courante():
+    """Identifiant de l'organisation de la requête en cours, ou None."""
+    return _organisation_courante.get()
+
+
+@contextmanager
+def organisation_active(organisation_id):
+    jeton = _organisation_courante.set(organisation_id)
+    try:
+        yield
+    finally:
+        _organisation_courante.reset(jeton)
+
+
+class PorteeOrganisation(models.Expression):
+    """
+    Condition « appartient à l'organisation courante », évaluée à la compilation SQL et
+    non à la construction du queryset : un queryset construit une fois (à l'import, dans
+    une première requête) est restreint à l'organisation de chaque requête qui l'exécute.
+    Sans organisation courante, la condition est toujours vraie.
+    """
+    conditional = True
+
+    def __init__(self, champ):
+        super().__init__(output_field=models.BooleanField())
+        self.champ = champ
+
+    def get_source_expressions(self):
+        return [self.champ]
+
+    def set_source_expressions(self, expressions):
+        self.champ, = expressions
+
+    def as_sql(self, compiler, connection):
+        organisation_id = organisation_courante()
+        if organisation_id is None:
+            return '1 = 1', []
+        sql, params = compiler.compile(self.champ)
+        return f'{sql} = %s', [*params, organisation_id]
+
+
+class ManagerOrganisation(models.Manager):
+    """Manager restreignant chaque queryset à l'organisation courante (voir PorteeOrganisation)."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, 'core_filters', None):
+            # Manager de relation inverse (navire.visites...) : déjà limité par le parent
+            return queryset
+        return queryset.filter(PorteeOrganisation(models.F(f'{self.model.chemin_organisation}_id')))
+
+    def toutes_organisations(self):
+        """Queryset non restreint (administration, traitements transverses)."""
+        return super().get_queryset()
+
+
+# ----------------------------------------------------------------------
+# RÉSOLUTION DE L'ORGANISATION DE LA REQUÊTE
+# ----------------------------------------------------------------------
+
+DUREE_TABLE_ORGANISATIONS = 10 * 60
+
+
+def table_organisations():
+    """{'domaines': {hôte: id}, 'slugs': {slug: id}}, en cache et invalidée par les signaux."""
+    from .cache import version_cache
+    from .models import Organisation
+
+    # Clé commune à toutes les organisations (cle_cache() inclut l'organisation courante)
+    cle = f"organisations:{version_cache('organisations')}:table"
+    table = cache.get(cle)
+    if table is None:
+        table = {'domaines': {}, 'slugs': {}}
+        for pk, slug, domaine in Organisation.objects.values_list('pk', 'slug', 'domaine'):
+            table['slugs'][slug] = pk
+            if domaine:
+                table['domaines'][domaine.lower()] = pk
+        cache.set(cle, table, DUREE_TABLE_ORGANISATIONS)
+    return table
+
+
+def organisation_par_defaut_id():
+    from .models import Organisation
+
+    slug = getattr(settings, 'ORGANISATION_PAR_DEFAUT', 'defaut')
+    organisation_id = table_organisations()['slugs'].get(slug)
+    if organisation_id is None:
+        organisation_id = Organisation.objects.get_or_create(slug=slug, defaults={'nom': slug})[0].pk
+    return organisation_id
+
+
+def resoudre_organisation(request):
+    """Identifiant de l'organisation de la requête ; None si l'en-tête désigne une organisation inconnue."""
+    table = table_organisations()
+    hote = request.get_host().split(':')[0].lower()
+    if hote in table['domaines']:
+        return table['domaines'][hote]
+    slug = request.META.get(ENTETE_ORGANISATION)
+    if slug and getattr(settings, 'ORGANISATION_ENTETE_DE_CONFIANCE', False):
+        return table['slugs'].get(slug)
+    return organisation_par_defaut_id()
+
+
+class OrganisationMiddleware:
+    """Active l'organisation de la requête pour toute sa durée (request.organisation_id)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        organisation_id = resoudre_organisation(request)
+        if organisation_id is None:
+            return JsonResponse({'detail': "Organisation inconnue."}, status=404)
+        request.organisation_id = organisation_id
+        with organisation_active(organisation_id):
+            return self.get_response(request)
@@ -0,0 +1,56 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class PaginationOptionnelle(PageNumberPagination):
+    """
+    Pagination activée uniquement si le client la demande (?page= ou ?page_size=).
+    Sans ces paramètres, la réponse reste une liste simple, comme attendu par le frontend.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_query_param not in request.query_params and \
+                self.page_size_query_param not in request.query_params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class PaginationCurseur(CursorPagination):
+    """
+    Pagination par curseur (keyset) sur l'ordre `ordre_historique` de la vue :
+    chaque page est une recherche d'intervalle sur l'index (navire, date), sans OFFSET.
+    Comme PaginationOptionnelle, activée uniquement si ?cursor= ou ?page_size= est fourni.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'ordre_historique', None) or ('-id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params and \
+                self.page_size_query_param not in request.query_params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    @classmethod
+    def lien_suivant(cls, url, instances, ordering, page_size):
+        """
+        Lien vers la deuxième page d'une collection dont `instances` contient les
+        page_size premiers éléments suivis d'un élément supplémentaire (sinon None).
+        """
+        if len(instances) <= page_size:
+            return None
+        paginator = cls()
+        paginator.base_url = url
+        paginator.ordering = ordering
+        paginator.page_size = page_size
+        paginator.page = list(instances[:page_size])
+        paginator.cursor = None
+        paginator.has_next = True
+        paginator.has_previous = False
+        paginator.next_position = paginator._get_position_from_instance(instances[page_size], ordering)
+        return paginator.get_next_link()
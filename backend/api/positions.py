@@ -0,0 +1,91 @@
+"""
+Recherche des dernières positions AIS dans une emprise (carte de la flotte).
+
+- PostgreSQL : index GiST sur point(longitude_ais, latitude_ais) (type géométrique natif,
+  aucune extension requise, voir la migration 0019), interrogé avec l'opérateur <@ box.
+- Autres bases (SQLite en développement) : grille de cases de 1°. L'emprise est convertie
+  en liste de cases (colonne `cellule` indexée), puis filtrée exactement en latitude /
+  longitude. Au-delà de MAX_CELLULES cases, l'emprise couvre une bonne partie de la flotte
+  et le filtre par intervalle seul est plus rapide.
+
+Les coordonnées sont en unités AIS (1/600 000 de degré), comme dans PositionAIS.
+"""
+from django.db import connections
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+
+UNITES_PAR_DEGRE = 600000
+COLONNES_GRILLE = 360
+LIGNES_GRILLE = 180
+MAX_CELLULES = 400
+
+# point(...) identique à l'expression de l'index GiST (migration 0019)
+SQL_DANS_BOITE = "point({table}.longitude_ais, {table}.latitude_ais) <@ box(point(%s, %s), point(%s, %s))"
+
+
+def cellule_grille(latitude_ais, longitude_ais):
+    """Numéro de la case de 1° contenant le point."""
+    ligne = min(max((latitude_ais + 90 * UNITES_PAR_DEGRE) // UNITES_PAR_DEGRE, 0), LIGNES_GRILLE - 1)
+    colonne = min(max((longitude_ais + 180 * UNITES_PAR_DEGRE) // UNITES_PAR_DEGRE, 0), COLONNES_GRILLE - 1)
+    return ligne * COLONNES_GRILLE + colonne
+
+
+def lire_emprise(texte):
+    """
+    'lon_min,lat_min,lon_max,lat_max' en degrés décimaux -> même tuple en unités AIS.
+    lon_min > lon_max désigne une emprise qui traverse l'antiméridien. Lève ValueError.
+    """
+    valeurs = [float(valeur) for valeur in texte.split(',')]
+    if len(valeurs) != 4:
+        raise ValueError("4 valeurs attendues : lon_min,lat_min,lon_max,lat_max.")
+    lon_min, lat_min, lon_max, lat_max = valeurs
+    if not (-180 <= lon_min <= 180 and -180 <= lon_max <= 180):
+        raise ValueError("Longitudes attendues entre -180 et 180.")
+    if not -90 <= lat_min <= lat_max <= 90:
+        raise ValueError("Latitudes attendues entre -90 et 90, lat_min <= lat_max.")
+    return tuple(round(valeur * UNITES_PAR_DEGRE) for valeur in valeurs)
+
+
+def _intervalles_longitude(lon_min, lon_max):
+    if lon_min <= lon_max:
+        return [(lon_min, lon_max)]
+    return [(lon_min, 180 * UNITES_PAR_DEGRE), (-180 * UNITES_PAR_DEGRE, lon_max)]
+
+
+def _cellules(lat_min, lat_max, intervalles):
+    ligne_min = cellule_grille(lat_min, 0) // COLONNES_GRILLE
+    ligne_max = cellule_grille(lat_max, 0) // COLONNES_GRILLE
+    cellules = []
+    for lon_min, lon_max in intervalles:
+        colonne_min = cellule_grille(0, lon_min) % COLONNES_GRILLE
+        colonne_max = cellule_grille(0, lon_max) % COLONNES_GRILLE
+        if (ligne_max - ligne_min + 1) * (colonne_max - colonne_min + 1) + len(cellules) > MAX_CELLULES:
+            return None
+        cellules.extend(
+            ligne * COLONNES_GRILLE + colonne
+            for ligne in range(ligne_min, ligne_max + 1)
+            for colonne in range(colonne_min, colonne_max + 1)
+        )
+    return cellules
+
+
+def filtrer_emprise(queryset, emprise):
+    """Restreint un queryset de DernierePosition à l'emprise (unités AIS, voir lire_emprise)."""
+    lon_min, lat_min, lon_max, lat_max = emprise
+    intervalles = _intervalles_longitude(lon_min, lon_max)
+
+    if connections[queryset.db].vendor == 'postgresql':
+        sql = SQL_DANS_BOITE.format(table=queryset.model._meta.db_table)
+        condition = Q()
+        for debut, fin in intervalles:
+            condition |= Q(RawSQL(sql, (debut, lat_min, fin, lat_max), output_field=BooleanField()))
+        return queryset.filter(condition)
+
+    condition = Q()
+    for debut, fin in intervalles:
+        condition |= Q(longitude_ais__gte=debut, longitude_ais__lte=fin)
+    queryset = queryset.filter(condition, latitude_ais__gte=lat_min, latitude_ais__lte=lat_max)
+    cellules = _cellules(lat_min, lat_max, intervalles)
+    if cellules is not None:
+        queryset = queryset.filter(cellule__in=cellules)
+    return queryset
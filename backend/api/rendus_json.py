@@ -0,0 +1,65 @@
+"""
+Rendu et lecture JSON accélérés par orjson lorsqu'il est installé.
+
+RenduJSON et AnalyseurJSON remplacent les classes JSON de DRF (voir REST_FRAMEWORK
+dans les settings). Sans orjson, ils se comportent exactement comme celles-ci
+(module json de la bibliothèque standard).
+
+Les types que orjson ne sait pas sérialiser nativement (Decimal, chaînes traduites
+paresseuses, QuerySet, itérables...) passent par l'encodeur de DRF, ce qui garde
+une sortie identique : seules les dates-heures gardent leurs microsecondes.
+"""
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+_encodeur_drf = JSONEncoder()
+
+if orjson is not None:
+    OPTIONS_ORJSON = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _defaut(obj):
+    """Types non gérés par orjson : même conversion que l'encodeur de DRF."""
+    return _encodeur_drf.default(obj)
+
+
+class RenduJSON(renderers.JSONRenderer):
+    """JSONRenderer utilisant orjson (indentation limitée à 2 espaces si demandée)."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        options = OPTIONS_ORJSON
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            options |= orjson.OPT_INDENT_2
+
+        ret = orjson.dumps(data, default=_defaut, option=options)
+        # Comme DRF : U+2028 et U+2029 échappés (JSON sous-ensemble strict de JavaScript)
+        if b'\xe2\x80\xa8' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+        if b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class AnalyseurJSON(parsers.JSONParser):
+    """JSONParser utilisant orjson (UTF-8 uniquement, NaN / Infinity refusés)."""
+    renderer_class = RenduJSON
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
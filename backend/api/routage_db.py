@@ -0,0 +1,75 @@
+"""
+Routage des lectures vers les réplicas PostgreSQL.
+
+- Les requêtes HTTP en lecture (GET, HEAD, OPTIONS : listes, fiches, exports, alertes)
+  lisent sur un réplica tiré au hasard parmi settings.DATABASE_REPLICAS.
+- Toute écriture épingle la suite de la requête sur la base principale (lecture de ses
+  propres écritures malgré le retard de réplication), de même qu'un bloc atomic ouvert.
+- Hors requête HTTP (commandes, threads d'export), tout reste sur la base principale.
+- Les migrations ne s'appliquent jamais à un réplica (migrate --database=replica_1 ne
+  fait rien) : son schéma vient de la réplication.
+
+Essai en local avec deux bases SQLite (la copie tient lieu de réplica) :
+    DATABASES['replica_1'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'replica.sqlite3'}
+    DATABASE_REPLICAS = ['replica_1']
+puis copier db.sqlite3 vers replica.sqlite3 après les migrations. Les tests (api/tests.py)
+déclarent un réplica replica_1 de la base de test.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+METHODES_LECTURE = ('GET', 'HEAD', 'OPTIONS')
+
+# État de la requête en cours : None hors requête, sinon {'lecture': bool, 'epingle': bool}
+_etat_requete = ContextVar('etat_routage_db', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class RoutageLectureMiddleware:
+    """Ouvre le contexte de routage pour la durée de la requête."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        jeton = _etat_requete.set({'lecture': request.method in METHODES_LECTURE, 'epingle': False})
+        try:
+            return self.get_response(request)
+        finally:
+            _etat_requete.reset(jeton)
+
+
+class RouteurReplicas:
+    """Routeur de base de données (settings.DATABASE_ROUTERS)."""
+
+    def db_for_read(self, model, **hints):
+        etat = _etat_requete.get()
+        if not etat or not etat['lecture'] or etat['epingle'] or not replicas():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas())
+
+    def db_for_write(self, model, **hints):
+        etat = _etat_requete.get()
+        if etat is not None:
+            etat['epingle'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Principale et réplicas contiennent les mêmes données
+        bases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False
+        return None
@@ -1,5 +1,9 @@
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
 from .models import *
+from .pagination import PaginationCurseur
+import os
 from datetime import date, timedelta
 
 class ProprietaireSerializer(serializers.ModelSerializer):
@@ -9,7 +13,17 @@ class ProprietaireSerializer(serializers.ModelSerializer):
     )
     class Meta:
         model = Proprietaire
-        fields = '__all__'
+        # L'organisation est déterminée par la requête (api/organisations.py)
+        exclude = ['organisation']
+
+class ProprietaireFlotteSerializer(ProprietaireSerializer):
+    """Propriétaire annoté des agrégats de sa flotte (voir ProprietaireViewSet)."""
+    nb_navires = serializers.IntegerField(read_only=True)
+    capacite_passagers = serializers.IntegerField(read_only=True)
+    capacite_equipage = serializers.IntegerField(read_only=True)
+    nb_navires_expires = serializers.IntegerField(read_only=True)
+    nb_documents_expires = serializers.IntegerField(read_only=True)
+    nb_documents_bientot = serializers.IntegerField(read_only=True)
 
 class ActiviteSerializer(serializers.ModelSerializer):
     class Meta:
@@ -92,7 +106,11 @@ class MetaDonneSerializer(serializers.ModelSerializer):
             'valeur_texte',        
             'navire', 
             'valeur_display',
-            'valeur_meta_donne'    
+            'valeur_meta_donne',
+            'valeur_nombre',
+            'valeur_date',
+            'valeur_bool',
+            'valeur_heure',
         ]
         read_only_fields = ['valeur_display', 'valeur_meta_donne']
     
@@ -185,6 +203,16 @@ class MetaDonneSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+# Historique embarqué dans la fiche navire : les LIMITE_HISTORIQUE_INLINE éléments les
+# plus récents, la suite étant paginée par curseur sur /<relation>/?navire=<id>.
+# Les ordres sont entièrement décroissants (date, puis id).
+LIMITE_HISTORIQUE_INLINE = 10
+HISTORIQUE_NAVIRE = {
+    'visites': (VisiteSerializer, 'visite-list', ('-date_visite', '-id')),
+    'dossiers': (DossierSerializer, 'dossier-list', ('-date_emission', '-id')),
+    'assurances': (AssuranceSerializer, 'assurance-list', ('-date_debut', '-id')),
+}
+
 class NavireSerializer(serializers.ModelSerializer):
     proprietaire = ProprietaireSerializer(read_only=True)
     proprietaire_id = serializers.PrimaryKeyRelatedField(
@@ -201,11 +229,88 @@ class NavireSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False)
     moteurs = MoteurSerializer(many=True, read_only=True)
-    visites = VisiteSerializer(many=True, read_only=True)
-    dossiers = DossierSerializer(many=True, read_only=True)
     meta_donnees = MetaDonneSerializer(many=True, read_only=True)
-    assurances = AssuranceSerializer(many=True, read_only=True)
 
     class Meta:
         model = Navire
-        fields = '__all__'
+        # L'organisation est déterminée par la requête (api/organisations.py)
+        exclude = ['organisation']
+
+    def validate_num_immatricule(self, value):
+        """Unicité au sein de l'organisation (contrainte navire_org_immatricule_uniq)."""
+        navires = Navire.objects.filter(num_immatricule=value)
+        if self.instance is not None:
+            navires = navires.exclude(pk=self.instance.pk)
+        if navires.exists():
+            raise serializers.ValidationError("Un navire avec cette immatriculation existe déjà.")
+        return value
+
+    def to_representation(self, instance):
+        """Ajoute visites, dossiers et assurances (limités) et le lien `<relation>_suivant`."""
+        data = super().to_representation(instance)
+        request = self.context.get('request')
+        for relation, (serializer_class, nom_url, ordre) in HISTORIQUE_NAVIRE.items():
+            elements = self._historique(instance, relation, ordre)
+            data[relation] = serializer_class(
+                elements[:LIMITE_HISTORIQUE_INLINE], many=True, context=self.context
+            ).data
+            url = reverse(nom_url, request=request)
+            url = replace_query_param(url, 'navire', instance.pk)
+            url = replace_query_param(url, 'page_size', LIMITE_HISTORIQUE_INLINE)
+            data[f'{relation}_suivant'] = PaginationCurseur.lien_suivant(
+                url, elements, ordre, LIMITE_HISTORIQUE_INLINE
+            )
+        return data
+
+    def _historique(self, instance, relation, ordre):
+        """
+        Les LIMITE_HISTORIQUE_INLINE + 1 éléments les plus récents (l'élément en plus
+        indique qu'une page suivante existe). Utilise le prefetch s'il est présent.
+        """
+        prefetch = getattr(instance, '_prefetched_objects_cache', {})
+        if relation in prefetch:
+            champs = [champ.lstrip('-') for champ in ordre]
+            elements = sorted(
+                prefetch[relation], key=lambda obj: [getattr(obj, champ) for champ in champs], reverse=True
+            )
+        else:
+            elements = getattr(instance, relation).order_by(*ordre)
+        return list(elements[:LIMITE_HISTORIQUE_INLINE + 1])
+
+
+class TeleversementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Televersement
+        fields = [
+            'id', 'cible', 'navire', 'nom_fichier', 'taille_totale', 'taille_recue',
+            'type_meta_donne', 'nom_meta_donne', 'statut', 'date_creation', 'date_maj', 'date_expiration'
+        ]
+        read_only_fields = ['taille_recue', 'statut', 'date_creation', 'date_maj', 'date_expiration']
+
+    def validate(self, attrs):
+        if attrs.get('cible') == 'META_DONNE':
+            if attrs.get('type_meta_donne') not in ['FICHIER', 'IMAGE']:
+                raise serializers.ValidationError(
+                    {"type_meta_donne": "Le type doit être FICHIER ou IMAGE pour une méta-donnée."}
+                )
+            if not attrs.get('nom_meta_donne'):
+                raise serializers.ValidationError(
+                    {"nom_meta_donne": "Le nom de la méta-donnée est obligatoire."}
+                )
+        else:
+            attrs['type_meta_donne'] = ''
+            attrs['nom_meta_donne'] = ''
+        attrs['nom_fichier'] = os.path.basename(attrs['nom_fichier'])
+        return attrs
+
+
+class TacheExportSerializer(serializers.ModelSerializer):
+    progression = serializers.FloatField(read_only=True)
+    debit = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = TacheExport
+        fields = [
+            'id', 'type_export', 'statut', 'total', 'traites', 'progression', 'debit',
+            'erreur', 'date_creation', 'date_debut', 'date_fin'
+        ]
@@ -0,0 +1,179 @@
+"""
+Signaux de l'application :
+- comptage des références vers les blobs du stockage dédupliqué (le nom de fichier
+  initial est mémorisé au chargement de l'instance, puis comparé à l'enregistrement
+  et à la suppression) ;
+- invalidation des caches dérivés des données de flotte, des lectures coalescées et
+  des référentiels des formulaires ;
+- mise à jour des colonnes de conformité du navire quand un document change ;
+- publication des changements de navires et de documents (flux SSE, api/evenements.py) ;
+- invalidation de la table de résolution des organisations.
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+
+from .cache import invalider_cache
+from .conformite import recalculer_conformite
+from .evenements import publier, publier_apres_commit
+from .models import (
+    Activite, Assurance, Assureur, Dossier, MetaDonne, Moteur, Navire, Organisation, Proprietaire, Visite,
+)
+from .organisations import organisation_courante
+from .stockage import CHAMPS_FICHIERS, acquerir_reference, liberer_reference
+
+
+def _nom_fichier(instance, champ):
+    valeur = instance.__dict__.get(champ)
+    return getattr(valeur, 'name', valeur) or None
+
+
+def _connecter(modele, champ):
+    def memoriser(sender, instance, **kwargs):
+        if champ in instance.__dict__:
+            instance._noms_fichiers_initiaux = {champ: _nom_fichier(instance, champ)}
+
+    def enregistrer(sender, instance, update_fields=None, **kwargs):
+        if update_fields is not None and champ not in update_fields:
+            return
+        initiaux = getattr(instance, '_noms_fichiers_initiaux', {})
+        if champ not in initiaux and not kwargs.get('created'):
+            return
+        ancien, nouveau = initiaux.get(champ), _nom_fichier(instance, champ)
+        if ancien != nouveau:
+            acquerir_reference(nouveau)
+            liberer_reference(ancien)
+        instance._noms_fichiers_initiaux = {champ: nouveau}
+
+    def supprimer(sender, instance, **kwargs):
+        liberer_reference(getattr(instance, '_noms_fichiers_initiaux', {}).get(champ))
+
+    post_init.connect(memoriser, sender=modele, weak=False)
+    post_save.connect(enregistrer, sender=modele, weak=False)
+    post_delete.connect(supprimer, sender=modele, weak=False)
+
+
+for _modele, _champ in CHAMPS_FICHIERS:
+    _connecter(_modele, _champ)
+
+
+# ----------------------------------------------------------------------
+# INVALIDATION DU CACHE DES STATISTIQUES DE FLOTTE
+# ----------------------------------------------------------------------
+
+def _organisation(instance):
+    """
+    Organisation dont les entrées de cache sont touchées, None pour toutes (référentiels
+    communs, écritures hors requête). Les documents appartiennent à l'organisation de la
+    requête : le manager restreint leur lecture et leur création à celle-ci.
+    """
+    if isinstance(instance, (Activite, Assureur)):
+        return None
+    return getattr(instance, 'organisation_id', None) or organisation_courante()
+
+
+def _invalider_flotte(sender, instance, **kwargs):
+    invalider_cache('flotte', _organisation(instance))
+
+
+for _modele in (Navire, Proprietaire, Assurance, Visite, Dossier):
+    post_save.connect(_invalider_flotte, sender=_modele, dispatch_uid=f'flotte_save_{_modele.__name__}')
+    post_delete.connect(_invalider_flotte, sender=_modele, dispatch_uid=f'flotte_delete_{_modele.__name__}')
+
+
+# ----------------------------------------------------------------------
+# INVALIDATION DES LECTURES COALESCÉES (listes, fiches PDF)
+# ----------------------------------------------------------------------
+
+def _invalider_lectures(sender, instance, **kwargs):
+    invalider_cache('lectures', _organisation(instance))
+
+
+for _modele in (Navire, Proprietaire, Activite, Assureur, Assurance, Moteur, Visite, Dossier, MetaDonne):
+    post_save.connect(_invalider_lectures, sender=_modele, dispatch_uid=f'lectures_save_{_modele.__name__}')
+    post_delete.connect(_invalider_lectures, sender=_modele, dispatch_uid=f'lectures_delete_{_modele.__name__}')
+m2m_changed.connect(_invalider_lectures, sender=Navire.activites.through, dispatch_uid='lectures_activites')
+
+
+# ----------------------------------------------------------------------
+# INVALIDATION DES RÉFÉRENTIELS DES FORMULAIRES (/bootstrap/)
+# ----------------------------------------------------------------------
+
+def _invalider_referentiels(sender, instance, **kwargs):
+    invalider_cache('referentiels', _organisation(instance))
+
+
+for _modele in (Proprietaire, Activite, Assureur):
+    post_save.connect(_invalider_referentiels, sender=_modele, dispatch_uid=f'referentiels_save_{_modele.__name__}')
+    post_delete.connect(_invalider_referentiels, sender=_modele, dispatch_uid=f'referentiels_delete_{_modele.__name__}')
+
+
+# ----------------------------------------------------------------------
+# CONFORMITÉ PRÉCALCULÉE DES NAVIRES
+# ----------------------------------------------------------------------
+
+def _memoriser_navire(sender, instance, **kwargs):
+    if 'navire_id' in instance.__dict__:
+        instance._navire_id_initial = instance.navire_id
+
+
+def _recalculer_conformite(sender, instance, **kwargs):
+    # Un document déplacé vers un autre navire modifie les deux navires
+    navire_ids = {instance.navire_id, getattr(instance, '_navire_id_initial', None)} - {None}
+    recalculer_conformite(navire_ids)
+    instance._navire_id_initial = instance.navire_id
+
+
+for _modele in (Assurance, Visite, Dossier):
+    post_init.connect(_memoriser_navire, sender=_modele, dispatch_uid=f'conformite_init_{_modele.__name__}')
+    post_save.connect(_recalculer_conformite, sender=_modele, dispatch_uid=f'conformite_save_{_modele.__name__}')
+    post_delete.connect(_recalculer_conformite, sender=_modele, dispatch_uid=f'conformite_delete_{_modele.__name__}')
+
+
+# ----------------------------------------------------------------------
+# ÉVÉNEMENTS DU FLUX SSE (api/evenements.py)
+# ----------------------------------------------------------------------
+
+def _action(kwargs):
+    if 'created' not in kwargs:
+        return 'supprime'
+    return 'cree' if kwargs['created'] else 'modifie'
+
+
+def _publier_navire(sender, instance, **kwargs):
+    publier_apres_commit('navire', instance.organisation_id, action=_action(kwargs), id=instance.pk)
+
+
+def _publier_document(sender, instance, **kwargs):
+    modele, action, pk, navire_id = sender._meta.model_name, _action(kwargs), instance.pk, instance.navire_id
+
+    def publier_document():
+        # Conformité lue après validation : déjà recalculée par _recalculer_conformite
+        navire = Navire.objects.toutes_organisations().filter(pk=navire_id).values(
+            'organisation_id', 'statut_global', 'nb_expires', 'nb_bientot'
+        ).first()
+        if navire is None:
+            # Suppression en cascade du navire : l'événement 'navire' suffit
+            return
+        publier('document', navire.pop('organisation_id'), modele=modele, action=action, id=pk,
+                navire_id=navire_id, **navire)
+
+    transaction.on_commit(publier_document)
+
+
+post_save.connect(_publier_navire, sender=Navire, dispatch_uid='evenements_save_Navire')
+post_delete.connect(_publier_navire, sender=Navire, dispatch_uid='evenements_delete_Navire')
+for _modele in (Assurance, Visite, Dossier):
+    post_save.connect(_publier_document, sender=_modele, dispatch_uid=f'evenements_save_{_modele.__name__}')
+    post_delete.connect(_publier_document, sender=_modele, dispatch_uid=f'evenements_delete_{_modele.__name__}')
+
+
+# ----------------------------------------------------------------------
+# ORGANISATIONS (domaines et slugs, voir api/organisations.py)
+# ----------------------------------------------------------------------
+
+def _invalider_organisations(sender, **kwargs):
+    invalider_cache('organisations')
+
+
+post_save.connect(_invalider_organisations, sender=Organisation, dispatch_uid='organisations_save')
+post_delete.connect(_invalider_organisations, sender=Organisation, dispatch_uid='organisations_delete')
@@ -0,0 +1,193 @@
+"""
+Stockage dédupliqué (adressé par contenu) pour les pièces jointes.
+
+Chaque fichier téléversé est haché (SHA-256) pendant sa lecture par blocs, puis stocké
+une seule fois sous cas/<2 premiers caractères>/<empreinte>/<nom d'origine>.
+Un second téléversement du même contenu réutilise le blob existant au lieu d'en créer
+une copie renommée. Les références sont comptées dans ContenuFichier par les signaux
+de api/signals.py ; le blob n'est supprimé que lorsqu'il n'est plus référencé.
+"""
+import hashlib
+import os
+import tempfile
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.storage import Storage
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils.deconstruct import deconstructible
+from django.utils.module_loading import import_string
+
+from .fichiers import FichierPartiel
+from .models import ContenuFichier, MetaDonne, Navire
+
+PREFIXE_CAS = 'cas/'
+
+# Champs fichier dont les valeurs comptent comme références vers un blob
+CHAMPS_FICHIERS = [
+    (MetaDonne, 'fichier_meta_donne'),
+    (Navire, 'photo_navire'),
+]
+
+
+def est_nom_cas(nom):
+    return bool(nom) and nom.startswith(PREFIXE_CAS)
+
+
+@deconstructible
+class StockageDeduplique(Storage):
+    """
+    Enveloppe un stockage « réel » (FileSystemStorage par défaut) et y ajoute
+    la déduplication par empreinte SHA-256.
+    """
+
+    def __init__(self, backend='django.core.files.storage.FileSystemStorage', options=None):
+        self.interne = import_string(backend)(**(options or {}))
+
+    # -- Écriture ------------------------------------------------------
+
+    def get_available_name(self, name, max_length=None):
+        # Le nom définitif est calculé à partir de l'empreinte dans _save()
+        return name
+
+    def _dossier_temporaire(self):
+        """Dossier temporaire sur le même disque que les blobs : la finalisation est un simple renommage."""
+        location = getattr(self.interne, 'location', None)
+        if not location:
+            return settings.FILE_UPLOAD_TEMP_DIR
+        dossier = os.path.join(location, PREFIXE_CAS, 'tmp')
+        os.makedirs(dossier, exist_ok=True)
+        return dossier
+
+    def _nom_cas(self, empreinte, name):
+        racine, extension = os.path.splitext(os.path.basename(name))
+        return f"{PREFIXE_CAS}{empreinte[:2]}/{empreinte}/{racine[:100]}{extension[:20]}"
+
+    def _save(self, name, content):
+        sha = hashlib.sha256()
+        taille = 0
+        chemin_temporaire = None
+
+        if hasattr(content, 'temporary_file_path'):
+            # Fichier déjà sur disque : on le hache puis on le déplace tel quel
+            for bloc in content.chunks():
+                sha.update(bloc)
+                taille += len(bloc)
+            source = content
+        else:
+            descripteur, chemin_temporaire = tempfile.mkstemp(suffix='.upload', dir=self._dossier_temporaire())
+            with os.fdopen(descripteur, 'wb') as destination:
+                for bloc in content.chunks():
+                    sha.update(bloc)
+                    taille += len(bloc)
+                    destination.write(bloc)
+            source = None
+
+        empreinte = sha.hexdigest()
+        try:
+            existant = ContenuFichier.objects.filter(empreinte=empreinte).first()
+            if existant and self.interne.exists(existant.nom):
+                return existant.nom
+
+            nom = self._nom_cas(empreinte, name)
+            if not self.interne.exists(nom):
+                if source is None:
+                    with open(chemin_temporaire, 'rb') as f:
+                        nom_stocke = self.interne.save(nom, FichierPartiel(f, name=nom))
+                else:
+                    nom_stocke = self.interne.save(nom, source)
+                if nom_stocke != nom:
+                    # Écriture concurrente du même blob : on garde le premier
+                    self.interne.delete(nom_stocke)
+
+            ContenuFichier.objects.update_or_create(
+                empreinte=empreinte, defaults={'nom': nom, 'taille': taille}
+            )
+            return nom
+        finally:
+            if chemin_temporaire and os.path.exists(chemin_temporaire):
+                os.remove(chemin_temporaire)
+
+    def delete(self, name):
+        """Ne supprime un blob que s'il n'est plus référencé par aucun champ."""
+        if est_nom_cas(name):
+            if ContenuFichier.objects.filter(nom=name, nb_references__gt=0).exists():
+                return
+            ContenuFichier.objects.filter(nom=name).delete()
+        self.interne.delete(name)
+
+    # -- Lecture (délégation) ------------------------------------------
+
+    def _open(self, name, mode='rb'):
+        return self.interne.open(name, mode)
+
+    def exists(self, name):
+        return self.interne.exists(name)
+
+    def size(self, name):
+        return self.interne.size(name)
+
+    def url(self, name):
+        return self.interne.url(name)
+
+    def path(self, name):
+        return self.interne.path(name)
+
+    def listdir(self, path):
+        return self.interne.listdir(path)
+
+    def get_accessed_time(self, name):
+        return self.interne.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self.interne.get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self.interne.get_modified_time(name)
+
+
+# ----------------------------------------------------------------------
+# COMPTAGE DES RÉFÉRENCES
+# ----------------------------------------------------------------------
+
+def acquerir_reference(nom):
+    if est_nom_cas(nom):
+        ContenuFichier.objects.filter(nom=nom).update(nb_references=F('nb_references') + 1)
+
+
+def liberer_reference(nom):
+    if not est_nom_cas(nom):
+        return
+    ContenuFichier.objects.filter(nom=nom).update(nb_references=F('nb_references') - 1)
+    # Suppression physique seulement une fois la transaction validée
+    transaction.on_commit(lambda: purger_blob(nom))
+
+
+def purger_blob(nom):
+    """Supprime le blob et sa ligne s'il n'est plus référencé."""
+    from django.core.files.storage import default_storage
+
+    if ContenuFichier.objects.filter(nom=nom, nb_references__gt=0).exists():
+        return
+    ContenuFichier.objects.filter(nom=nom).delete()
+    stockage = getattr(default_storage, 'interne', default_storage)
+    stockage.delete(nom)
+
+
+def recompter_references():
+    """Recalcule nb_references depuis les tables et retourne les blobs devenus orphelins."""
+    compteurs = Counter()
+    for modele, champ in CHAMPS_FICHIERS:
+        lignes = (
+            modele.objects.filter(**{f'{champ}__startswith': PREFIXE_CAS})
+            .values(champ).annotate(n=Count('pk'))
+        )
+        for ligne in lignes:
+            compteurs[ligne[champ]] += ligne['n']
+
+    contenus = list(ContenuFichier.objects.all())
+    for contenu in contenus:
+        contenu.nb_references = compteurs.get(contenu.nom, 0)
+    ContenuFichier.objects.bulk_update(contenus, ['nb_references'], batch_size=1000)
+    return [contenu.nom for contenu in contenus if contenu.nb_references == 0]
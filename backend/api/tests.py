@@ -1,3 +1,1435 @@
-from django.test import TestCase
+import os
+import re
+import runpy
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.models import Max
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from pypdf import PdfReader, PdfWriter
+from rest_framework.test import APIRequestFactory
+from django.urls import reverse
+
+from .admission import place_export, prendre_place, rendre_place
+from .ais import AssembleurNMEA, IngesteurAIS, decoder_position, mmsi_message, type_message
+from .archives import archiver_documents
+from .cache import calculer_une_fois, cle_cache, invalider_cache
+from .conformite import DELAI_BIENTOT, recalculer_conformite
+from .doublons import fusionner_navires, fusionner_proprietaires
+from .exports import TABLES_EXPORT
+from .fichiers import servir_media
+from .models import (
+    Activite, ArchiveAssurance, ArchiveDossier, ArchiveVisite, Assurance, Assureur, DernierePosition, Dossier,
+    MetaDonne, Moteur, Navire, Organisation, PositionAIS, Proprietaire, TacheExport, Televersement, Visite,
+)
+from .organisations import organisation_active
+from .positions import MAX_CELLULES, UNITES_PAR_DEGRE, cellule_grille, filtrer_emprise, lire_emprise
+from .routage_db import RoutageLectureMiddleware
+from .views import ExportPDFCombine, TeleversementViewSet
+
+
+# ----------------------------------------------------------------------
+# ROUTAGE DES LECTURES VERS LES RÉPLICAS (api/routage_db.py)
+# ----------------------------------------------------------------------
+
+REPLICA = 'replica_1'
+
+# Réplica de la base de test, déclaré avant la création des bases de test : connexion
+# distincte sur la même base (TEST MIRROR), comme un réplica sans retard de réplication
+if REPLICA not in connections:
+    connections.settings[REPLICA] = {
+        **connections.settings[DEFAULT_DB_ALIAS],
+        'TEST': {**connections.settings[DEFAULT_DB_ALIAS]['TEST'], 'MIRROR': DEFAULT_DB_ALIAS},
+    }
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class RoutageReplicasTests(TransactionTestCase):
+    # TransactionTestCase : la base principale n'est pas dans un bloc atomic permanent
+    databases = {DEFAULT_DB_ALIAS, REPLICA}
+
+    def executer(self, methode, vue):
+        """Exécute `vue()` dans le contexte de routage d'une requête HTTP `methode`."""
+        requete = getattr(RequestFactory(), methode)('/api/navires/')
+        return RoutageLectureMiddleware(lambda request: vue())(requete)
+
+    def test_lecture_get_sur_replica(self):
+        def vue():
+            with CaptureQueriesContext(connections[REPLICA]) as requetes:
+                list(Navire.objects.all())
+            return Navire.objects.all().db, len(requetes)
+
+        base, nombre_requetes = self.executer('get', vue)
+        self.assertEqual(base, REPLICA)
+        self.assertEqual(nombre_requetes, 1)
+
+    def test_ecriture_epingle_la_requete_sur_la_principale(self):
+        def vue():
+            avant = Navire.objects.all().db
+            Proprietaire.objects.create(nom_proprietaire="Armement du Port")
+            return avant, Navire.objects.all().db
+
+        self.assertEqual(self.executer('get', vue), (REPLICA, DEFAULT_DB_ALIAS))
+        # La requête suivante lit de nouveau sur le réplica
+        self.assertEqual(self.executer('get', lambda: Navire.objects.all().db), REPLICA)
+
+    def test_lecture_dans_atomic_sur_la_principale(self):
+        def vue():
+            with transaction.atomic():
+                return Navire.objects.all().db
+
+        self.assertEqual(self.executer('get', vue), DEFAULT_DB_ALIAS)
+
+    def test_post_et_hors_requete_sur_la_principale(self):
+        self.assertEqual(self.executer('post', lambda: Navire.objects.all().db), DEFAULT_DB_ALIAS)
+        self.assertEqual(Navire.objects.all().db, DEFAULT_DB_ALIAS)
+
+    def test_pas_de_migration_sur_replica(self):
+        self.assertFalse(router.allow_migrate(REPLICA, 'api', model_name='navire'))
+        self.assertTrue(router.allow_migrate(DEFAULT_DB_ALIAS, 'api', model_name='navire'))
+        with CaptureQueriesContext(connections[REPLICA]) as requetes:
+            call_command('migrate', 'api', database=REPLICA, verbosity=0)
+        self.assertFalse([q for q in requetes if q['sql'].lstrip().upper().startswith(('CREATE', 'ALTER', 'INSERT'))])
+
+
+
+class ConfigurationReplicasTests(SimpleTestCase):
+
+    @mock.patch.dict(os.environ, {'DB_REPLICA_HOSTS': 'lecture-1,lecture-2'})
+    def test_profil_dev_propage_le_mot_de_passe_aux_replicas(self):
+        # Restauré avec le reste de l'environnement à la fin du test
+        os.environ.pop('DB_PASSWORD', None)
+        profil = runpy.run_module('backend.settings.dev')
+        self.assertEqual(profil['DATABASE_REPLICAS'], ['replica_1', 'replica_2'])
+        for alias in ('default', 'replica_1', 'replica_2'):
+            self.assertEqual(profil['DATABASES'][alias]['PASSWORD'], 'StageL2')
+        self.assertEqual(profil['DATABASES']['replica_2']['HOST'], 'lecture-2')
+        self.assertEqual(profil['DATABASES']['replica_2']['TEST'], {'MIRROR': 'default'})
+
+# ----------------------------------------------------------------------
+# INGESTION AIS (api/ais.py, commande ingerer_ais)
+# ----------------------------------------------------------------------
+
+ECHANTILLON_AIS = Path(__file__).resolve().parent / 'donnees' / 'ais_exemple.nmea'
+
+
+def lignes_echantillon():
+    return ECHANTILLON_AIS.read_text(encoding='ascii').splitlines()
+
+
+def charge_utile(champs, longueur=168):
+    """
+    Encode une charge utile AIS 6 bits à partir de {(bit de début, longueur): valeur},
+    positions de la norme ITU-R M.1371. Encodeur indépendant du décodeur testé.
+    """
+    valeur = 0
+    for (debut, taille), champ in champs.items():
+        valeur |= (champ & ((1 << taille) - 1)) << (longueur - debut - taille)
+    caracteres = []
+    for decalage in range(longueur - 6, -1, -6):
+        six_bits = (valeur >> decalage) & 0x3F
+        caracteres.append(chr(six_bits + 48 if six_bits < 40 else six_bits + 56))
+    return ''.join(caracteres)
+
+
+def phrase_nmea(charge, horodatage=None):
+    """Phrase !AIVDM à un fragment, avec bloc de balises c: si `horodatage` est fourni."""
+    corps = f"AIVDM,1,1,,A,{charge},0"
+    somme = 0
+    for caractere in corps:
+        somme ^= ord(caractere)
+    ligne = f"!{corps}*{somme:02X}"
+    if horodatage is not None:
+        ligne = f"\\c:{int(horodatage.timestamp())}*00\\{ligne}"
+    return ligne
+
+
+class AssembleurNMEATests(SimpleTestCase):
+
+    def test_reassemblage_multi_fragments(self):
+        lignes = lignes_echantillon()
+        assembleur = AssembleurNMEA()
+        self.assertIsNone(assembleur.ajouter(lignes[16]))
+        charge, horodatage = assembleur.ajouter(lignes[17])
+
+        self.assertEqual(len(charge), 60 + 11)
+        self.assertEqual(type_message(charge), 5)
+        self.assertEqual(mmsi_message(charge), 227000000)
+        # Horodatage porté par le bloc de balises du premier fragment
+        self.assertEqual(horodatage, datetime.fromtimestamp(1760000000, tz=dt_timezone.utc))
+        self.assertEqual(assembleur.fragments, {})
+
+    def test_fragment_orphelin_ignore(self):
+        assembleur = AssembleurNMEA()
+        self.assertIsNone(assembleur.ajouter(lignes_echantillon()[17]))
+        self.assertEqual(assembleur.fragments, {})
+        self.assertEqual(assembleur.erreurs, 0)
+
+    def test_somme_de_controle_invalide(self):
+        assembleur = AssembleurNMEA()
+        self.assertIsNone(assembleur.ajouter(lignes_echantillon()[200]))
+        self.assertEqual(assembleur.erreurs, 1)
+
+    def test_echantillon_complet(self):
+        assembleur = AssembleurNMEA()
+        types = Counter()
+        for ligne in lignes_echantillon():
+            message = assembleur.ajouter(ligne)
+            if message is not None:
+                types[type_message(message[0])] += 1
+
+        self.assertEqual(types, {1: 96, 3: 50, 18: 48, 5: 3})
+        # Seule la phrase à la somme de contrôle fausse est une erreur ; $GPGGA est ignorée
+        self.assertEqual(assembleur.erreurs, 1)
+
+
+class DecoderPositionTests(SimpleTestCase):
+
+    def test_vecteur_de_reference_classe_a(self):
+        charge, _ = AssembleurNMEA().ajouter(lignes_echantillon()[198])
+        self.assertEqual(decoder_position(charge), {
+            'mmsi': 367380120,
+            'latitude_ais': 22684169,
+            'longitude_ais': -73442600,
+            'vitesse': 1,
+            'route': 2452,
+            'cap': None,
+            'statut_navigation': 0,
+        })
+
+    def test_positions_classe_a(self):
+        champs = {
+            (0, 6): 1, (8, 30): 227000137, (38, 4): 5, (50, 10): 123, (61, 28): -2976863,
+            (89, 27): 26028612, (116, 12): 3599, (128, 9): 359,
+        }
+        self.assertEqual(decoder_position(charge_utile(champs)), {
+            'mmsi': 227000137,
+            'latitude_ais': 26028612,
+            'longitude_ais': -2976863,
+            'vitesse': 123,
+            'route': 3599,
+            'cap': 3590,
+            'statut_navigation': 5,
+        })
+
+    def test_decalages_classe_b(self):
+        # Message 18 : vitesse 46-55, longitude 57-84, latitude 85-111, route 112-123, cap 124-132
+        champs = {
+            (0, 6): 18, (8, 30): 227500071, (46, 10): 35, (57, 28): -754154,
+            (85, 27): 27677764, (112, 12): 728, (124, 9): 90,
+        }
+        self.assertEqual(decoder_position(charge_utile(champs)), {
+            'mmsi': 227500071,
+            'latitude_ais': 27677764,
+            'longitude_ais': -754154,
+            'vitesse': 35,
+            'route': 728,
+            'cap': 900,
+            'statut_navigation': None,
+        })
+
+    def test_valeurs_non_disponibles(self):
+        champs = {
+            (0, 6): 18, (8, 30): 227500000, (46, 10): 1023, (57, 28): 1000,
+            (85, 27): 2000, (112, 12): 3600, (124, 9): 511,
+        }
+        position = decoder_position(charge_utile(champs))
+        self.assertEqual((position['vitesse'], position['route'], position['cap']), (None, None, None))
+
+        champs[(57, 28)] = 181 * 600000
+        self.assertIsNone(decoder_position(charge_utile(champs)))
+
+    def test_message_tronque_ou_non_gere(self):
+        charge = charge_utile({(0, 6): 1, (8, 30): 227000000, (61, 28): 1000, (89, 27): 2000})
+        self.assertIsNone(decoder_position(charge[:20]))
+        self.assertIsNone(decoder_position(charge_utile({(0, 6): 5, (8, 30): 227000000})))
+
+
+class IngestionAISTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.navires = {
+            mmsi: Navire.objects.create(
+                nom_navire=f"Navire {mmsi}", num_immatricule=f"IMM-{mmsi}", type_navire="Cargo", mmsi=str(mmsi)
+            )
+            for mmsi in (227000000, 227000137, 227500000, 367380120)
+        }
+
+    def test_commande_sur_echantillon(self):
+        sortie = StringIO()
+        call_command('ingerer_ais', str(ECHANTILLON_AIS), '--taille-lot', '10', stdout=sortie)
+
+        positions = Counter(PositionAIS.objects.values_list('navire__mmsi', flat=True))
+        self.assertEqual(positions, {'227000000': 12, '227000137': 12, '227500000': 12, '367380120': 1})
+        self.assertIn("1 erreur(s) NMEA", sortie.getvalue())
+
+        self.assertEqual(DernierePosition.objects.count(), 4)
+        for navire in self.navires.values():
+            plus_recente = PositionAIS.objects.filter(navire=navire).aggregate(Max('horodatage'))['horodatage__max']
+            self.assertEqual(navire.derniere_position.horodatage, plus_recente)
+
+    def test_dry_run_n_ecrit_rien(self):
+        call_command('ingerer_ais', str(ECHANTILLON_AIS), '--dry-run', stdout=StringIO())
+        self.assertFalse(PositionAIS.objects.exists())
+        self.assertFalse(DernierePosition.objects.exists())
+
+    def test_message_en_retard_ne_remplace_pas_la_derniere_position(self):
+        navire = self.navires[227500000]
+        maintenant = datetime(2025, 10, 9, 12, 0, tzinfo=dt_timezone.utc)
+
+        def message(latitude, horodatage):
+            charge = charge_utile({
+                (0, 6): 18, (8, 30): 227500000, (46, 10): 35, (57, 28): -754154,
+                (85, 27): latitude, (112, 12): 728, (124, 9): 90,
+            })
+            return phrase_nmea(charge, horodatage)
+
+        # Un lot par message : chaque upsert passe par la clause ON CONFLICT ... WHERE
+        ingesteur = IngesteurAIS(taille_lot=1)
+        ingesteur.traiter_ligne(message(27600000, maintenant))
+        ingesteur.traiter_ligne(message(27500000, maintenant - timedelta(minutes=5)))
+
+        derniere = DernierePosition.objects.get(navire=navire)
+        self.assertEqual((derniere.horodatage, derniere.latitude_ais), (maintenant, 27600000))
+        self.assertEqual(PositionAIS.objects.filter(navire=navire).count(), 2)
+
+        ingesteur.traiter_ligne(message(27700000, maintenant + timedelta(minutes=5)))
+        derniere.refresh_from_db()
+        self.assertEqual(
+            (derniere.horodatage, derniere.latitude_ais), (maintenant + timedelta(minutes=5), 27700000)
+        )
+
+
+# ----------------------------------------------------------------------
+# RECHERCHE PAR EMPRISE (api/positions.py, /api/navires/positions/)
+# ----------------------------------------------------------------------
+
+class LireEmpriseTests(SimpleTestCase):
+
+    def test_unites_ais(self):
+        self.assertEqual(
+            lire_emprise('-5.5,43,10,51.25'),
+            (-5.5 * UNITES_PAR_DEGRE, 43 * UNITES_PAR_DEGRE, 10 * UNITES_PAR_DEGRE, 51.25 * UNITES_PAR_DEGRE),
+        )
+
+    def test_antimeridien_accepte(self):
+        lon_min, _, lon_max, _ = lire_emprise('170,-20,-170,-10')
+        self.assertGreater(lon_min, lon_max)
+
+    def test_emprises_invalides(self):
+        # Valeurs manquantes ou en trop, non numériques, hors limites, lat_min > lat_max
+        for texte in ['', '1,2,3', '1,2,3,4,5', 'a,b,c,d', '-181,0,10,10', '0,-91,10,10', '0,30,10,20']:
+            with self.subTest(texte=texte), self.assertRaises(ValueError):
+                lire_emprise(texte)
+
+    def test_cellules_aux_limites(self):
+        self.assertEqual(cellule_grille(-90 * UNITES_PAR_DEGRE, -180 * UNITES_PAR_DEGRE), 0)
+        self.assertEqual(cellule_grille(90 * UNITES_PAR_DEGRE, 180 * UNITES_PAR_DEGRE), 180 * 360 - 1)
+        self.assertEqual(cellule_grille(0, 0), 90 * 360 + 180)
+
+
+class FiltrerEmpriseTests(TestCase):
+    # nom : (latitude, longitude) en degrés
+    POINTS = {
+        'Marseille': (43.3, 5.37),
+        'Limite de case': (44.0, 6.0),
+        'Fidji est': (-17.0, 179.5),
+        'Fidji ouest': (-17.0, -179.5),
+        'Tahiti': (-17.5, -149.5),
+        'Reykjavik': (64.15, -21.95),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        horodatage = datetime(2025, 10, 9, 12, 0, tzinfo=dt_timezone.utc)
+        for numero, (nom, (latitude, longitude)) in enumerate(cls.POINTS.items()):
+            navire = Navire.objects.create(
+                nom_navire=nom, num_immatricule=f"EMP-{numero}", type_navire="Cargo", mmsi=str(227100000 + numero)
+            )
+            latitude_ais, longitude_ais = round(latitude * UNITES_PAR_DEGRE), round(longitude * UNITES_PAR_DEGRE)
+            DernierePosition.objects.create(
+                navire=navire, horodatage=horodatage - timedelta(hours=numero), latitude_ais=latitude_ais,
+                longitude_ais=longitude_ais, cellule=cellule_grille(latitude_ais, longitude_ais),
+            )
+
+    def noms(self, bbox):
+        queryset = filtrer_emprise(DernierePosition.objects.all(), lire_emprise(bbox))
+        return set(queryset.values_list('navire__nom_navire', flat=True))
+
+    def attendus(self, bbox):
+        lon_min, lat_min, lon_max, lat_max = (float(valeur) for valeur in bbox.split(','))
+        return {
+            nom for nom, (latitude, longitude) in self.POINTS.items()
+            if lat_min <= latitude <= lat_max and (
+                lon_min <= longitude <= lon_max if lon_min <= lon_max
+                else longitude >= lon_min or longitude <= lon_max
+            )
+        }
+
+    def test_petite_emprise_par_la_grille(self):
+        self.assertEqual(self.noms('5,43,6,44'), {'Marseille', 'Limite de case'})
+        self.assertEqual(self.noms('5,43,5.9,44'), {'Marseille'})
+
+    def test_antimeridien(self):
+        self.assertEqual(self.noms('179,-18,-179,-16'), {'Fidji est', 'Fidji ouest'})
+        self.assertEqual(self.noms('170,-20,-150,-10'), {'Fidji est', 'Fidji ouest'})
+        self.assertEqual(self.noms('170,-20,-140,-10'), {'Fidji est', 'Fidji ouest', 'Tahiti'})
+
+    def test_grande_emprise_sans_grille_identique(self):
+        emprises = [
+            '-180,-90,180,90', '-30,0,30,70', '0,-20,-100,70', '100,-60,-20,70', '-25,60,-20,65', '179.5,-17,-179.5,-17',
+        ]
+        for bbox in emprises:
+            with self.subTest(bbox=bbox):
+                self.assertEqual(self.noms(bbox), self.attendus(bbox))
+        # Les premières emprises dépassent MAX_CELLULES et passent par le seul filtre par intervalle
+        lon_min, lat_min, lon_max, lat_max = (float(valeur) for valeur in emprises[1].split(','))
+        self.assertGreater((lon_max - lon_min + 1) * (lat_max - lat_min + 1), MAX_CELLULES)
+
+    def test_vue_positions(self):
+        reponse = self.client.get('/api/navires/positions/', {'bbox': '179,-18,-179,-16'})
+        self.assertEqual(reponse.status_code, 200)
+        donnees = reponse.json()
+        colonnes = donnees['colonnes']
+        positions = {ligne[colonnes.index('nom_navire')]: ligne for ligne in donnees['positions']}
+        self.assertEqual(set(positions), {'Fidji est', 'Fidji ouest'})
+        fidji = positions['Fidji ouest']
+        self.assertEqual((fidji[colonnes.index('latitude')], fidji[colonnes.index('longitude')]), (-17.0, -179.5))
+
+    def test_vue_positions_age_max(self):
+        DernierePosition.objects.filter(navire__nom_navire='Marseille').update(horodatage=datetime.now(dt_timezone.utc))
+        reponse = self.client.get('/api/navires/positions/', {'bbox': '-180,-90,180,90', 'age_max': '60'})
+        self.assertEqual([ligne[1] for ligne in reponse.json()['positions']], ['Marseille'])
+
+    def test_vue_positions_emprise_invalide(self):
+        for parametres in [{}, {'bbox': '0,0,10'}, {'bbox': '0,10,10,0'}, {'bbox': '0,0,10,10', 'age_max': 'x'}]:
+            with self.subTest(parametres=parametres):
+                self.assertEqual(self.client.get('/api/navires/positions/', parametres).status_code, 400)
+
+
+# ----------------------------------------------------------------------
+# ORGANISATIONS (api/organisations.py)
+# ----------------------------------------------------------------------
+
+@override_settings(ALLOWED_HOSTS=['.example', 'testserver'])
+class OrganisationsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.port_a = Organisation.objects.create(nom="Port A", slug='port-a', domaine='port-a.example')
+        cls.port_b = Organisation.objects.create(nom="Port B", slug='port-b', domaine='port-b.example')
+        cls.navires = {}
+        for organisation in (cls.port_a, cls.port_b):
+            proprietaire = Proprietaire.objects.create(
+                nom_proprietaire=f"Armement {organisation.nom}", organisation=organisation
+            )
+            cls.navires[organisation.slug] = Navire.objects.create(
+                nom_navire=f"Navire {organisation.nom}", num_immatricule=f"IMM-{organisation.slug}",
+                type_navire="Cargo", proprietaire=proprietaire, organisation=organisation,
+            )
+
+    def setUp(self):
+        # Table des organisations et réponses de liste en cache d'un test à l'autre
+        cache.clear()
+
+    def noms(self, chemin='/api/navires/', **entetes):
+        reponse = self.client.get(chemin, **entetes)
+        self.assertEqual(reponse.status_code, 200)
+        return {element['nom_navire'] for element in reponse.json()}
+
+    def test_isolation_par_domaine(self):
+        self.assertEqual(self.noms(HTTP_HOST='port-a.example'), {"Navire Port A"})
+        self.assertEqual(self.noms(HTTP_HOST='port-b.example'), {"Navire Port B"})
+        self.assertEqual(self.noms(HTTP_HOST='port-a.example'), {"Navire Port A"})
+
+        navire_b = self.navires['port-b']
+        self.assertEqual(
+            self.client.get(f'/api/navires/{navire_b.pk}/', HTTP_HOST='port-a.example').status_code, 404
+        )
+        self.assertEqual(
+            self.client.get(f'/api/navires/{navire_b.pk}/', HTTP_HOST='port-b.example').status_code, 200
+        )
+        proprietaires = self.client.get('/api/proprietaires/', HTTP_HOST='port-b.example').json()
+        self.assertEqual([element['nom_proprietaire'] for element in proprietaires], ["Armement Port B"])
+
+    def test_queryset_construit_une_fois(self):
+        # Comme l'attribut `queryset` d'un viewset, construit à l'import
+        queryset = Navire.objects.order_by('id')
+        with organisation_active(self.port_a.pk):
+            self.assertEqual(list(queryset.all()), [self.navires['port-a']])
+        with organisation_active(self.port_b.pk):
+            self.assertEqual(list(queryset.all()), [self.navires['port-b']])
+        self.assertEqual(len(queryset.all()), 2)
+        self.assertEqual(Navire.objects.toutes_organisations().count(), 2)
+
+    def test_entete_ignoree_par_defaut(self):
+        # Hôte inconnu, en-tête libre : organisation par défaut, qui n'a aucun navire
+        self.assertEqual(self.noms(HTTP_X_ORGANISATION='port-b'), set())
+        self.assertEqual(self.noms(HTTP_X_ORGANISATION='inconnue'), set())
+        # Le domaine prime sur l'en-tête
+        self.assertEqual(self.noms(HTTP_HOST='port-a.example', HTTP_X_ORGANISATION='port-b'), {"Navire Port A"})
+
+    @override_settings(ORGANISATION_ENTETE_DE_CONFIANCE=True)
+    def test_entete_derriere_un_proxy_de_confiance(self):
+        self.assertEqual(self.noms(HTTP_X_ORGANISATION='port-b'), {"Navire Port B"})
+        self.assertEqual(self.noms(HTTP_HOST='port-a.example', HTTP_X_ORGANISATION='port-b'), {"Navire Port A"})
+        self.assertEqual(self.client.get('/api/navires/', HTTP_X_ORGANISATION='inconnue').status_code, 404)
+
+    def test_organisation_non_exposee_ni_modifiable(self):
+        navire = self.client.get(f"/api/navires/{self.navires['port-a'].pk}/", HTTP_HOST='port-a.example').json()
+        self.assertNotIn('organisation', navire)
+        proprietaires = self.client.get('/api/proprietaires/', HTTP_HOST='port-a.example').json()
+        self.assertNotIn('organisation', proprietaires[0])
+
+        reponse = self.client.post(
+            '/api/proprietaires/', {'nom_proprietaire': "Armement créé", 'organisation': self.port_b.pk},
+            content_type='application/json', HTTP_HOST='port-a.example',
+        )
+        self.assertEqual(reponse.status_code, 201, reponse.content)
+        cree = Proprietaire.objects.toutes_organisations().get(pk=reponse.json()['id'])
+        self.assertEqual(cree.organisation_id, self.port_a.pk)
+
+    def test_media_restreint_a_l_organisation(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier, ignore_errors=True)
+        reglage = self.settings(MEDIA_ROOT=dossier, MEDIA_SENDFILE_BACKEND=None)
+        reglage.enable()
+        self.addCleanup(reglage.disable)
+
+        photo_a = default_storage.save('photos_navires/a.jpg', ContentFile(b"photo A"))
+        document_b = default_storage.save('meta_donnees/fichiers/b.pdf', ContentFile(b"document B"))
+        orphelin = default_storage.save('photos_navires/orphelin.jpg', ContentFile(b"orphelin"))
+        Navire.objects.filter(pk=self.navires['port-a'].pk).update(photo_navire=photo_a)
+        MetaDonne.objects.bulk_create([MetaDonne(
+            navire=self.navires['port-b'], nom_meta_donne="Rapport", type_meta_donne='FICHIER',
+            fichier_meta_donne=document_b,
+        )])
+
+        def statut(organisation, nom):
+            with organisation_active(organisation and organisation.pk):
+                try:
+                    reponse = servir_media(RequestFactory().get(f'/media/{nom}'), nom)
+                except Http404:
+                    return 404
+                reponse.close()
+                return reponse.status_code
+
+        self.assertEqual(statut(self.port_a, photo_a), 200)
+        self.assertEqual(statut(self.port_b, photo_a), 404)
+        self.assertEqual(statut(self.port_b, document_b), 200)
+        self.assertEqual(statut(self.port_a, document_b), 404)
+        self.assertEqual(statut(self.port_a, orphelin), 404)
+        # Hors requête (commandes, tâches) : pas de restriction
+        self.assertEqual(statut(None, document_b), 200)
+
+
+# ----------------------------------------------------------------------
+# MÉTA-DONNÉES (MetaDonne.save, colonnes typées)
+# ----------------------------------------------------------------------
+
+class MetaDonneSaveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.navire = Navire.objects.create(nom_navire="Navire Méta", num_immatricule="IMM-META", type_navire="Cargo")
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier, ignore_errors=True)
+        reglage = self.settings(MEDIA_ROOT=dossier)
+        reglage.enable()
+        self.addCleanup(reglage.disable)
+
+    def creer(self, type_meta_donne, **champs):
+        return MetaDonne.objects.create(
+            navire=self.navire, nom_meta_donne=type_meta_donne.lower(), type_meta_donne=type_meta_donne, **champs
+        )
+
+    def test_fichier_et_image_conserves(self):
+        for type_meta_donne, nom in [('FICHIER', 'rapport.pdf'), ('IMAGE', 'photo.png')]:
+            with self.subTest(type_meta_donne=type_meta_donne):
+                meta = self.creer(
+                    type_meta_donne, valeur_texte="ignorée",
+                    fichier_meta_donne=SimpleUploadedFile(nom, f"contenu {type_meta_donne}".encode()),
+                )
+                nom_stocke = meta.fichier_meta_donne.name
+
+                # Ré-enregistrements sans changement de fichier
+                meta.nom_meta_donne = f"{type_meta_donne.lower()} renommé"
+                meta.save()
+                MetaDonne.objects.get(pk=meta.pk).save()
+
+                meta.refresh_from_db()
+                self.assertEqual(meta.fichier_meta_donne.name, nom_stocke)
+                self.assertTrue(default_storage.exists(nom_stocke))
+                self.assertIsNone(meta.valeur_texte)
+                self.assertIsNone(meta.valeur_nombre)
+
+    def test_remplacement_sans_effacer_un_fichier_partage(self):
+        # Fichier antérieur au stockage dédupliqué (hors cas/, sans compteur de références)
+        ancien = default_storage.interne.save('meta_donnees/fichiers/certificat.pdf', ContentFile(b"certificat"))
+        meta = self.creer('FICHIER', fichier_meta_donne=ancien)
+        copie = MetaDonne.objects.create(
+            navire=self.navire, nom_meta_donne="copie", type_meta_donne='IMAGE', fichier_meta_donne=ancien
+        )
+
+        meta.fichier_meta_donne = SimpleUploadedFile('certificat-2025.pdf', b"certificat 2025")
+        meta.save()
+
+        self.assertTrue(default_storage.exists(copie.fichier_meta_donne.name))
+        self.assertTrue(default_storage.exists(MetaDonne.objects.get(pk=meta.pk).fichier_meta_donne.name))
+
+    def test_texte_et_colonnes_typees(self):
+        texte = self.creer('TEXTE', valeur_texte="Quai 4")
+        nombre = self.creer('NOMBRE', valeur_texte="12,5")
+        date = self.creer('DATE', valeur_texte="2025-10-09")
+        booleen = self.creer('BOOLEEN', valeur_texte="oui")
+
+        texte.refresh_from_db()
+        self.assertEqual(texte.valeur_texte, "Quai 4")
+        self.assertFalse(texte.fichier_meta_donne)
+        self.assertEqual(MetaDonne.objects.get(pk=nombre.pk).valeur_nombre, Decimal('12.5'))
+        self.assertEqual(str(MetaDonne.objects.get(pk=date.pk).valeur_date), '2025-10-09')
+        self.assertIs(MetaDonne.objects.get(pk=booleen.pk).valeur_bool, True)
+
+        nombre.valeur_texte = "pas un nombre"
+        nombre.save()
+        self.assertIsNone(MetaDonne.objects.get(pk=nombre.pk).valeur_nombre)
+
+
+# ----------------------------------------------------------------------
+# ADMINISTRATION (api/admin.py)
+# ----------------------------------------------------------------------
+
+class AdministrationNavireTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.utilisateur = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'motdepasse')
+        assureur = Assureur.objects.create(nom_assureur="Mutuelle Maritime")
+        cls.navires = {}
+        for nombre in (3, 30):
+            navire = Navire.objects.create(
+                nom_navire=f"Navire {nombre}", num_immatricule=f"ADM-{nombre}", type_navire="Cargo"
+            )
+            debut = datetime(2020, 1, 1).date()
+            Visite.objects.bulk_create(
+                Visite(navire=navire, date_visite=debut + timedelta(days=jour), expiration_permis=debut,
+                       lieu_visite="Quai") for jour in range(nombre)
+            )
+            Dossier.objects.bulk_create(
+                Dossier(navire=navire, type_dossier="Permis", date_emission=debut + timedelta(days=jour))
+                for jour in range(nombre)
+            )
+            Assurance.objects.bulk_create(
+                Assurance(navire=navire, assureur=assureur, date_debut=debut + timedelta(days=jour), date_fin=debut)
+                for jour in range(nombre)
+            )
+            cls.navires[nombre] = navire
+
+    def setUp(self):
+        self.client.force_login(self.utilisateur)
+
+    def fiche(self, navire):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as requetes:
+            reponse = self.client.get(reverse('admin:api_navire_change', args=[navire.pk]))
+        self.assertEqual(reponse.status_code, 200)
+        return reponse, len(requetes)
+
+    def test_fiche_navire_bornee(self):
+        self.fiche(self.navires[3])  # caches de la première requête (organisations, types de contenu)
+        _, requetes_petit = self.fiche(self.navires[3])
+        reponse, requetes_grand = self.fiche(self.navires[30])
+
+        # Pas de requête par ligne (__str__ des documents) : même nombre de requêtes
+        self.assertEqual(requetes_grand, requetes_petit)
+        formsets = {formset.formset.prefix: formset.formset for formset in reponse.context['inline_admin_formsets']}
+        for prefixe in ('visites', 'dossiers', 'assurances'):
+            self.assertEqual(len(formsets[prefixe].forms), 20)
+        # Les plus récentes d'abord
+        dates = [form.instance.date_visite for form in formsets['visites'].forms]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+        self.assertEqual(dates[0], datetime(2020, 1, 30).date())
+
+        self.assertContains(reponse, f"?navire__id__exact={self.navires[30].pk}")
+        liste = self.client.get(reverse('admin:api_visite_changelist'), {'navire__id__exact': self.navires[30].pk})
+        self.assertEqual(liste.status_code, 200)
+        self.assertEqual(liste.context['cl'].result_count, 30)
+
+
+# ----------------------------------------------------------------------
+# PDF COMBINÉ EN ARRIÈRE-PLAN (ExportPDFCombine, commande executer_exports)
+# ----------------------------------------------------------------------
+
+def pdf_factice(pages_html, sortie, **kwargs):
+    """Remplace pdfkit.from_file (wkhtmltopdf absent des tests) : une page blanche par fiche."""
+    writer = PdfWriter()
+    for _ in pages_html:
+        writer.add_blank_page(595, 842)
+    with open(sortie, 'wb') as f:
+        writer.write(f)
+
+
+@override_settings(EXPORTS_DANS_LE_PROCESSUS=False, QPDF_PATH='')
+class ExportPDFCombineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.navire_ids = [
+            Navire.objects.create(nom_navire=f"Navire {numero:02d}", num_immatricule=f"PDF-{numero}",
+                                  type_navire="Cargo").pk
+            for numero in range(45)
+        ]
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier, ignore_errors=True)
+        reglage = self.settings(MEDIA_ROOT=dossier)
+        reglage.enable()
+        self.addCleanup(reglage.disable)
+        cache.clear()
+        correctif = mock.patch('api.views.pdfkit')
+        self.pdfkit = correctif.start()
+        self.pdfkit.from_file.side_effect = pdf_factice
+        self.addCleanup(correctif.stop)
+
+    def tache(self, **champs):
+        return TacheExport.objects.create(
+            type_export='PDF_FILTRE', total=len(self.navire_ids),
+            parametres={'navire_ids': self.navire_ids, 'url_base': 'http://testserver/'}, **champs
+        )
+
+    def test_commande_execute_et_reunit_les_lots(self):
+        tache = self.tache()
+        call_command('executer_exports', '--une-fois', stdout=StringIO())
+
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.traites, tache.tentatives), ('TERMINE', 45, 1))
+        self.assertEqual(self.pdfkit.from_file.call_count, 3)
+        with default_storage.open(tache.fichier) as fichier:
+            self.assertEqual(len(PdfReader(fichier).pages), 45)
+        self.assertFalse(default_storage.exists(f"exports/{tache.pk}"))
+
+    def test_reprise_a_partir_des_lots_sur_disque(self):
+        tache = self.tache()
+        # Premier lot produit avant l'arrêt de l'exécutant précédent
+        chemin_lot = default_storage.path(f"exports/{tache.pk}/lot_00000.pdf")
+        os.makedirs(os.path.dirname(chemin_lot))
+        pdf_factice(range(ExportPDFCombine.TAILLE_LOT), chemin_lot)
+
+        call_command('executer_exports', '--une-fois', stdout=StringIO())
+
+        tache.refresh_from_db()
+        self.assertEqual(tache.statut, 'TERMINE')
+        self.assertEqual([len(appel.args[0]) for appel in self.pdfkit.from_file.call_args_list], [20, 5])
+        with default_storage.open(tache.fichier) as fichier:
+            self.assertEqual(len(PdfReader(fichier).pages), 45)
+
+    def test_taches_abandonnees(self):
+        ancienne = timezone.now() - ExportPDFCombine.DELAI_ABANDON - timedelta(minutes=1)
+        reprise = self.tache(statut='EN_COURS', date_activite=ancienne, tentatives=1)
+        epuisee = self.tache(statut='EN_COURS', date_activite=ancienne, tentatives=ExportPDFCombine.TENTATIVES_MAX)
+        active = self.tache(statut='EN_COURS', date_activite=timezone.now(), tentatives=1)
+
+        self.assertEqual(ExportPDFCombine.reprendre_taches_abandonnees(), (1, 1))
+        statuts = dict(TacheExport.objects.values_list('pk', 'statut'))
+        self.assertEqual(
+            [statuts[reprise.pk], statuts[epuisee.pk], statuts[active.pk]], ['EN_ATTENTE', 'ERREUR', 'EN_COURS']
+        )
+
+    def test_suivi_des_taches_en_lecture_seule(self):
+        ancienne = timezone.now() - ExportPDFCombine.DELAI_ABANDON - timedelta(minutes=1)
+        tache = self.tache(statut='EN_COURS', date_activite=ancienne, tentatives=1)
+
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as requetes:
+            self.assertEqual(self.client.get('/api/taches_export/').status_code, 200)
+            self.assertEqual(self.client.get(f'/api/taches_export/{tache.pk}/').status_code, 200)
+        self.assertFalse([q for q in requetes if not q['sql'].lstrip().upper().startswith('SELECT')])
+        tache.refresh_from_db()
+        self.assertEqual(tache.statut, 'EN_COURS')
+
+    def test_reunion_pypdf_et_limite_sans_qpdf(self):
+        dossier = default_storage.path('lots')
+        os.makedirs(dossier)
+        lots = []
+        for numero in range(3):
+            lots.append(os.path.join(dossier, f"lot_{numero}.pdf"))
+            pdf_factice(range(numero + 1), lots[-1])
+        tache = self.tache()
+        ExportPDFCombine(tache)._reunir(lots, os.path.join(dossier, 'final.pdf'))
+        self.assertEqual(len(PdfReader(os.path.join(dossier, 'final.pdf')).pages), 6)
+        self.assertEqual(sorted(os.listdir(dossier)), ['final.pdf', 'lot_0.pdf', 'lot_1.pdf', 'lot_2.pdf'])
+
+        with self.settings(EXPORTS_PDF_MAX_NAVIRES_SANS_QPDF=10):
+            reponse = self.client.post('/api/navires/export_filtered_pdf/')
+        self.assertEqual(reponse.status_code, 400)
+        self.assertIn("limité à 10 fiches", reponse.json()['error'])
+        self.assertEqual(list(TacheExport.objects.values_list('pk', flat=True)), [tache.pk])
+
+
+
+
+# ----------------------------------------------------------------------
+# CONFORMITÉ PRÉCALCULÉE (api/conformite.py)
+# ----------------------------------------------------------------------
+
+class ConformiteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.assureur = Assureur.objects.create(nom_assureur="Mutuelle Maritime")
+
+    def setUp(self):
+        self.navire = Navire.objects.create(nom_navire="Conforme", num_immatricule="CNF-1", type_navire="Cargo")
+
+    def conformite(self):
+        self.navire.refresh_from_db()
+        return (
+            self.navire.statut_global, self.navire.nb_expires, self.navire.nb_bientot, self.navire.prochaine_echeance,
+        )
+
+    def test_transitions_avec_la_date_du_jour(self):
+        echeance = date.today() + timedelta(days=100)
+        self.assertEqual(self.conformite(), ('inconnu', 0, 0, None))
+        # Tenu à jour par les signaux à l'enregistrement d'un document
+        Visite.objects.create(
+            navire=self.navire, date_visite=echeance - timedelta(days=365), expiration_permis=echeance,
+            lieu_visite="Brest",
+        )
+        self.assertEqual(self.conformite(), ('valide', 0, 0, echeance))
+
+        # Bornes de « bientôt » : de l'échéance moins DELAI_BIENTOT jours à l'échéance incluse
+        self.assertEqual(recalculer_conformite(today=echeance - timedelta(days=DELAI_BIENTOT + 1)), 0)
+        self.assertEqual(self.conformite(), ('valide', 0, 0, echeance))
+        self.assertEqual(recalculer_conformite(today=echeance - timedelta(days=DELAI_BIENTOT)), 1)
+        self.assertEqual(self.conformite(), ('bientot', 0, 1, echeance))
+        recalculer_conformite(today=echeance)
+        self.assertEqual(self.conformite(), ('bientot', 0, 1, echeance))
+        recalculer_conformite(today=echeance + timedelta(days=1))
+        self.assertEqual(self.conformite(), ('expire', 1, 0, echeance))
+
+    def test_agregation_des_trois_documents(self):
+        aujourd_hui = date(2025, 6, 1)
+        Assurance.objects.create(
+            navire=self.navire, assureur=self.assureur, date_debut=date(2024, 5, 1), date_fin=date(2025, 5, 1),
+        )
+        Dossier.objects.create(
+            navire=self.navire, type_dossier="Licence", date_emission=date(2024, 1, 1), date_expiration=date(2025, 6, 20),
+        )
+        # Dossier sans échéance : ignoré
+        Dossier.objects.create(navire=self.navire, type_dossier="Acte", date_emission=date(2020, 1, 1))
+        Visite.objects.create(
+            navire=self.navire, date_visite=date(2025, 1, 1), expiration_permis=date(2026, 1, 1), lieu_visite="Sète",
+        )
+        autre = Navire.objects.create(nom_navire="Sans document", num_immatricule="CNF-2", type_navire="Cargo")
+
+        # Lots d'un navire : chaque lot agrège ses propres documents
+        recalculer_conformite(today=aujourd_hui, taille_lot=1)
+        self.assertEqual(self.conformite(), ('expire', 1, 1, date(2025, 5, 1)))
+        autre.refresh_from_db()
+        self.assertEqual(autre.statut_global, 'inconnu')
+        # Seules les lignes modifiées sont réécrites
+        self.assertEqual(recalculer_conformite(today=aujourd_hui), 0)
+
+        Assurance.objects.filter(navire=self.navire).delete()
+        recalculer_conformite([self.navire.pk], today=aujourd_hui)
+        self.assertEqual(self.conformite(), ('bientot', 0, 1, date(2025, 6, 20)))
+
+
+
+# ----------------------------------------------------------------------
+# CONTRÔLE D'ADMISSION DES EXPORTS (api/admission.py)
+# ----------------------------------------------------------------------
+
+@override_settings(EXPORTS_SIMULTANES=2, EXPORTS_ATTENTE_MAX=0, EXPORTS_RETRY_AFTER=45)
+class AdmissionExportsTests(TestCase):
+
+    def setUp(self):
+        # Places du sémaphore et compteurs de ScopedRateThrottle
+        cache.clear()
+
+    def test_places_limitees_et_rendues(self):
+        premiere, seconde = prendre_place(), prendre_place()
+        self.assertIsNotNone(premiere)
+        self.assertIsNotNone(seconde)
+        self.assertIsNone(prendre_place(attente_max=0))
+
+        rendre_place(premiere)
+        troisieme = prendre_place()
+        self.assertEqual(troisieme[0], premiere[0])
+        # Bail expiré puis place reprise : l'ancien détenteur ne libère pas la place d'un autre
+        rendre_place(premiere)
+        self.assertEqual(cache.get(troisieme[0]), troisieme[1])
+
+    def test_export_refuse_sans_place(self):
+        places = [prendre_place(), prendre_place()]
+        reponse = self.client.get('/api/navires/export_xlsx/')
+        self.assertEqual(reponse.status_code, 429)
+        self.assertEqual(reponse['Retry-After'], '45')
+
+        rendre_place(places.pop())
+        reponse = self.client.get('/api/navires/export_xlsx/')
+        self.assertEqual(reponse.status_code, 200)
+        reponse.close()
+        # La place prise par l'export est rendue à la fin de la requête
+        self.assertIsNotNone(prendre_place())
+
+    def test_place_rendue_apres_une_erreur(self):
+        with self.assertRaises(RuntimeError):
+            with place_export():
+                raise RuntimeError("export interrompu")
+        self.assertIsNotNone(prendre_place())
+        self.assertIsNotNone(prendre_place())
+
+    def test_limitation_de_debit_par_client(self):
+        # Portée 'exports' : 10 requêtes par minute (REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'])
+        for _ in range(10):
+            self.client.get('/api/navires/export_xlsx/').close()
+        reponse = self.client.get('/api/navires/export_xlsx/')
+        self.assertEqual(reponse.status_code, 429)
+        self.assertIn('Retry-After', reponse)
+        # Les lectures interactives ne sont pas concernées
+        self.assertEqual(self.client.get('/api/navires/').status_code, 200)
+
+
+
+# ----------------------------------------------------------------------
+# CACHE VERSIONNÉ ET COALESCENCE (api/cache.py)
+# ----------------------------------------------------------------------
+
+class CoalescenceTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.appels = []
+
+    def calcul(self, valeur, demarre=None, liberation=None):
+        def calculer():
+            self.appels.append(valeur)
+            if demarre is not None:
+                demarre.set()
+                liberation.wait(5)
+            if isinstance(valeur, Exception):
+                raise valeur
+            return valeur
+        return calculer
+
+    def en_parallele(self, premier, second, **options):
+        """Lance `premier` dans un thread, puis `second` pendant son calcul ; retourne les deux résultats."""
+        demarre, liberation = threading.Event(), threading.Event()
+        resultats = {}
+
+        def executer_premier():
+            try:
+                resultats['premier'] = calculer_une_fois('cle', self.calcul(premier, demarre, liberation))
+            except Exception as exc:
+                resultats['premier'] = exc
+
+        fil = threading.Thread(target=executer_premier)
+        fil.start()
+        self.assertTrue(demarre.wait(5))
+        threading.Timer(0.2, liberation.set).start()
+        resultats['second'] = calculer_une_fois('cle', self.calcul(second), **options)
+        fil.join(5)
+        return resultats['premier'], resultats['second']
+
+    def test_appels_simultanes_coalesces(self):
+        self.assertEqual(self.en_parallele('A', 'B'), ('A', 'A'))
+        self.assertEqual(self.appels, ['A'])
+        # Résultat en cache : plus aucun calcul
+        self.assertEqual(calculer_une_fois('cle', self.calcul('C')), 'A')
+        self.assertEqual(self.appels, ['A'])
+
+    def test_echec_du_premier_calcul(self):
+        erreur = RuntimeError("base indisponible")
+        premier, second = self.en_parallele(erreur, 'B')
+        self.assertIs(premier, erreur)
+        self.assertEqual(second, 'B')
+        self.assertEqual(self.appels, [erreur, 'B'])
+
+    def test_attente_bornee(self):
+        premier, second = self.en_parallele('A', 'B', attente_max=0.05)
+        self.assertEqual((premier, second), ('A', 'B'))
+        self.assertEqual(self.appels, ['A', 'B'])
+
+    def test_versions_par_organisation(self):
+        with organisation_active(1):
+            cle_1 = cle_cache('flotte', 'stats')
+        with organisation_active(2):
+            cle_2 = cle_cache('flotte', 'stats')
+        invalider_cache('flotte', 1)
+        with organisation_active(1):
+            self.assertNotEqual(cle_cache('flotte', 'stats'), cle_1)
+        with organisation_active(2):
+            self.assertEqual(cle_cache('flotte', 'stats'), cle_2)
+        # Sans organisation : invalide toutes les organisations
+        invalider_cache('flotte')
+        with organisation_active(2):
+            self.assertNotEqual(cle_cache('flotte', 'stats'), cle_2)
+
+
+
+# ----------------------------------------------------------------------
+# ARCHIVAGE DES DOCUMENTS ÉCHUS (api/archives.py, commande archiver_documents)
+# ----------------------------------------------------------------------
+
+class ArchivesTests(TestCase):
+    AUJOURD_HUI = date(2025, 6, 1)  # rétention de deux ans : échéances avant le 2 juin 2023
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.navire = Navire.objects.create(nom_navire="Vieux Gréement", num_immatricule="ARC-1", type_navire="Voilier")
+        cls.visites = [
+            Visite.objects.create(
+                navire=cls.navire, date_visite=date(annee - 1, 1, 1), expiration_permis=date(annee, 1, 1),
+                lieu_visite=f"Visite {annee}",
+            )
+            for annee in (2020, 2022, 2023)
+        ]
+        cls.licences = [
+            Dossier.objects.create(
+                navire=cls.navire, type_dossier="Licence", date_emission=date(annee - 2, 1, 1),
+                date_expiration=date(annee, 1, 1),
+            )
+            for annee in (2021, 2026)
+        ]
+        # Seul dossier de sa sorte : jamais archivé, même échu
+        cls.permis = Dossier.objects.create(
+            navire=cls.navire, type_dossier="Permis", date_emission=date(2015, 1, 1), date_expiration=date(2018, 1, 1),
+        )
+        assureur = Assureur.objects.create(nom_assureur="Mutuelle du Large")
+        cls.assurances = [
+            Assurance.objects.create(
+                navire=cls.navire, assureur=assureur, date_debut=date(annee - 1, 1, 1), date_fin=date(annee, 1, 1),
+            )
+            for annee in (2019, 2026)
+        ]
+
+    def setUp(self):
+        # Réponses de liste coalescées (groupe 'lectures')
+        cache.clear()
+
+    def archiver(self, **options):
+        return archiver_documents(today=self.AUJOURD_HUI, **options)
+
+    def test_simulation_sans_deplacement(self):
+        self.assertEqual(self.archiver(ecrire=False), {'Visite': 2, 'Dossier': 1, 'Assurance': 1})
+        self.assertEqual(Visite.objects.count(), 3)
+        self.assertFalse(ArchiveVisite.objects.exists())
+
+    def test_deplacement_avec_le_meme_identifiant(self):
+        ancienne = self.visites[0]
+        self.assertEqual(self.archiver(taille_lot=1), {'Visite': 2, 'Dossier': 1, 'Assurance': 1})
+
+        # Le document le plus récent de chaque sorte reste dans la table courante, même échu
+        self.assertEqual(list(Visite.objects.values_list('pk', flat=True)), [self.visites[2].pk])
+        self.assertEqual(
+            set(Dossier.objects.values_list('pk', flat=True)), {self.licences[1].pk, self.permis.pk}
+        )
+        self.assertEqual(list(Assurance.objects.values_list('pk', flat=True)), [self.assurances[1].pk])
+
+        archivee = ArchiveVisite.objects.get(pk=ancienne.pk)
+        self.assertEqual(
+            (archivee.navire_id, archivee.date_visite, archivee.expiration_permis, archivee.lieu_visite),
+            (self.navire.pk, ancienne.date_visite, ancienne.expiration_permis, ancienne.lieu_visite),
+        )
+        self.assertIsNotNone(archivee.date_archivage)
+        self.assertEqual(ArchiveDossier.objects.get().pk, self.licences[0].pk)
+        self.assertEqual(ArchiveAssurance.objects.get().pk, self.assurances[0].pk)
+
+        # Rien de plus à archiver ; la conformité reste calculée sur les documents courants
+        self.assertEqual(self.archiver(), {'Visite': 0, 'Dossier': 0, 'Assurance': 0})
+        self.navire.refresh_from_db()
+        self.assertEqual((self.navire.statut_global, self.navire.prochaine_echeance), ('expire', date(2018, 1, 1)))
+
+    def test_liste_des_archives(self):
+        self.archiver()
+        courantes = self.client.get('/api/visites/', {'navire': self.navire.pk}).json()
+        archivees = self.client.get('/api/visites/', {'navire': self.navire.pk, 'archives': 1}).json()
+        self.assertEqual([visite['id'] for visite in courantes], [self.visites[2].pk])
+        self.assertEqual([visite['id'] for visite in archivees], [self.visites[1].pk, self.visites[0].pk])
+        self.assertEqual(archivees[0]['lieu_visite'], "Visite 2022")
+
+
+# ----------------------------------------------------------------------
+# EXPORT XLSX (api/exports.py, /api/navires/export_xlsx/)
+# ----------------------------------------------------------------------
+
+ESPACE_XLSX = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+
+def lire_xlsx(contenu):
+    """
+    {feuille: [[valeur ou None, ...], ...]} d'un classeur XlsxWriter en mode constant_memory
+    (chaînes en ligne) : ('texte', '...') pour une chaîne, ('nombre', '...') sinon.
+    """
+    with zipfile.ZipFile(BytesIO(contenu)) as archive:
+        noms = [f.get('name') for f in ElementTree.fromstring(archive.read('xl/workbook.xml')).iter(f'{ESPACE_XLSX}sheet')]
+        feuilles = {}
+        for numero, nom in enumerate(noms, start=1):
+            racine = ElementTree.fromstring(archive.read(f'xl/worksheets/sheet{numero}.xml'))
+            lignes = []
+            for ligne in racine.iter(f'{ESPACE_XLSX}row'):
+                cellules = {}
+                for cellule in ligne:
+                    colonne = ord(re.match(r'[A-Z]', cellule.get('r')).group()) - ord('A')
+                    if cellule.get('t') == 'inlineStr':
+                        cellules[colonne] = ('texte', cellule.find(f'{ESPACE_XLSX}is/{ESPACE_XLSX}t').text)
+                    else:
+                        cellules[colonne] = ('nombre', cellule.find(f'{ESPACE_XLSX}v').text)
+                lignes.append([cellules.get(i) for i in range(max(cellules) + 1)] if cellules else [])
+            feuilles[nom] = lignes
+    return feuilles
+
+
+class ExportXLSXTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        armement = Proprietaire.objects.create(nom_proprietaire="Armement Breton", contact="+33 6 12 34 56 78")
+        cls.chalutier = Navire.objects.create(
+            nom_navire="Korrigan", num_immatricule="0012", type_navire="Chalutier",
+            annee_de_construction=1998, proprietaire=armement,
+        )
+        cls.cargo = Navire.objects.create(nom_navire="Cargo Sud", num_immatricule="CS-1", type_navire="Cargo")
+        Visite.objects.create(
+            navire=cls.chalutier, date_visite=datetime(2024, 3, 1).date(),
+            expiration_permis=datetime(2025, 3, 1).date(), lieu_visite="Lorient",
+        )
+        Moteur.objects.create(navire=cls.cargo, nom_moteur="Principal", puissance="900 CV")
+        MetaDonne.objects.create(
+            navire=cls.chalutier, nom_meta_donne="Départ", type_meta_donne='HEURE', valeur_texte="06:30",
+        )
+
+    def setUp(self):
+        # Compteurs de ScopedRateThrottle ('exports')
+        cache.clear()
+
+    def exporter(self, **filtres):
+        reponse = self.client.get('/api/navires/export_xlsx/', filtres)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(
+            reponse['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+        return lire_xlsx(b''.join(reponse.streaming_content))
+
+    def test_une_feuille_par_entite_filtree(self):
+        feuilles = self.exporter(types_navire='Chalutier')
+        self.assertEqual(list(feuilles), [table['feuille'] for table in TABLES_EXPORT])
+        for table in TABLES_EXPORT:
+            entete = [valeur for _, valeur in feuilles[table['feuille']][0]]
+            self.assertEqual(entete, [libelle for _, libelle in table['colonnes']])
+
+        navires = feuilles['Navires']
+        self.assertEqual(len(navires), 2)
+        self.assertEqual(navires[1][0], ('nombre', str(self.chalutier.pk)))
+        # Textes conservés tels quels, sans apostrophe : zéros en tête, « + » du contact
+        self.assertEqual(navires[1][2], ('texte', "0012"))
+        self.assertEqual(navires[1][14], ('texte', "+33 6 12 34 56 78"))
+        # Le moteur du cargo, non retenu par le filtre, n'est pas exporté
+        self.assertEqual(len(feuilles['Moteurs']), 1)
+
+    def test_cellules_typees(self):
+        feuilles = self.exporter()
+        visite = feuilles['Visites'][1]
+        # Dates en numéros de série Excel (1er mars 2024 = 45352)
+        self.assertEqual(visite[4], ('nombre', '45352'))
+        meta = feuilles['Méta-données'][1]
+        self.assertEqual(meta[5], ('texte', "06:30"))
+        self.assertAlmostEqual(float(meta[9][1]), 6.5 / 24)
+        self.assertEqual(len(feuilles['Moteurs']), 2)
+
+
+# ----------------------------------------------------------------------
+# RENDU JSON (api/rendus_json.py, commande mesurer_rendu_json)
+# ----------------------------------------------------------------------
+
+class MesureRenduJSONTests(TestCase):
+
+    def test_liste_synthetique_a_la_forme_de_l_api(self):
+        from .management.commands.mesurer_rendu_json import navire_synthetique
+
+        debut = datetime(2024, 1, 1).date()
+        navire = Navire.objects.create(
+            nom_navire="Navire JSON", num_immatricule="JSON-1", type_navire="Cargo",
+            proprietaire=Proprietaire.objects.create(nom_proprietaire="Armement JSON"),
+        )
+        Visite.objects.create(navire=navire, date_visite=debut, expiration_permis=debut, lieu_visite="Quai")
+        Dossier.objects.create(navire=navire, type_dossier="Permis", date_emission=debut)
+        Assurance.objects.create(
+            navire=navire, assureur=Assureur.objects.create(nom_assureur="Mutuelle"), date_debut=debut, date_fin=debut
+        )
+        Moteur.objects.create(navire=navire, nom_moteur="Moteur 1", puissance="350 CV")
+        MetaDonne.objects.create(navire=navire, nom_meta_donne="Observations", valeur_texte="RAS")
+        navire.activites.add(Activite.objects.create(nom_activite="Pêche côtière"))
+        reel = self.client.get('/api/navires/').json()[0]
+        synthetique = navire_synthetique(1)
+
+        self.assertEqual(set(synthetique), set(reel))
+        for relation in ('visites', 'dossiers', 'assurances', 'moteurs', 'meta_donnees', 'activites'):
+            self.assertEqual(set(synthetique[relation][0]), set(reel[relation][0]), relation)
+        self.assertEqual(set(synthetique['proprietaire']), set(reel['proprietaire']))
+        self.assertEqual(navire_synthetique(7), navire_synthetique(7))
+
+    def test_commande(self):
+        sortie = StringIO()
+        call_command('mesurer_rendu_json', '--nombre', '50', '--repetitions', '1', stdout=sortie)
+        self.assertIn("Liste synthétique de 50 navires.", sortie.getvalue())
+        self.assertIn("Accélération du rendu", sortie.getvalue())
+
+
+# ----------------------------------------------------------------------
+# TÉLÉVERSEMENTS REPRENABLES (TeleversementViewSet, commande purger_televersements)
+# ----------------------------------------------------------------------
+
+class FluxIntercale:
+    """Corps de requête qui exécute `intercalaire()` avant de livrer ses premiers octets."""
+
+    def __init__(self, contenu, intercalaire):
+        self.contenu = BytesIO(contenu)
+        self.intercalaire = intercalaire
+
+    def read(self, taille=-1):
+        if self.intercalaire is not None:
+            intercalaire, self.intercalaire = self.intercalaire, None
+            intercalaire()
+        return self.contenu.read(taille)
+
+
+class TeleversementTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.navire = Navire.objects.create(nom_navire="Navire Photo", num_immatricule="TLV-1", type_navire="Cargo")
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier, ignore_errors=True)
+        reglage = self.settings(MEDIA_ROOT=dossier)
+        reglage.enable()
+        self.addCleanup(reglage.disable)
+
+    def session(self, taille_totale=8):
+        reponse = self.client.post('/api/televersements/', {
+            'cible': 'META_DONNE', 'navire': self.navire.pk, 'nom_fichier': 'rapport.pdf',
+            'taille_totale': taille_totale, 'type_meta_donne': 'FICHIER', 'nom_meta_donne': 'Rapport',
+        }, content_type='application/json')
+        self.assertEqual(reponse.status_code, 201, reponse.content)
+        return Televersement.objects.get(pk=reponse.json()['id'])
+
+    def envoyer(self, televersement, offset, contenu):
+        return self.client.put(
+            f'/api/televersements/{televersement.pk}/chunk/?offset={offset}', contenu,
+            content_type='application/octet-stream',
+        )
+
+    def contenu_partiel(self, televersement):
+        with default_storage.open(televersement.chemin_partiel) as fichier:
+            return fichier.read()
+
+    def test_fragments_puis_finalisation(self):
+        televersement = self.session()
+        expiration_initiale = televersement.date_expiration
+        self.assertEqual(self.envoyer(televersement, 0, b"ABCD").status_code, 200)
+        self.assertEqual(self.envoyer(televersement, 0, b"ABCD").status_code, 409)
+        reponse = self.envoyer(televersement, 4, b"EFGH")
+        self.assertEqual(reponse['Upload-Offset'], '8')
+
+        televersement.refresh_from_db()
+        self.assertGreaterEqual(televersement.date_expiration, expiration_initiale)
+        self.assertEqual(self.client.post(f'/api/televersements/{televersement.pk}/finalize/').status_code, 200)
+        meta = MetaDonne.objects.get(navire=self.navire, nom_meta_donne='Rapport')
+        with meta.fichier_meta_donne.open() as fichier:
+            self.assertEqual(fichier.read(), b"ABCDEFGH")
+        self.assertEqual(os.listdir(default_storage.path('televersements')), [])
+
+    def test_fragments_concurrents_au_meme_offset(self):
+        televersement = self.session()
+
+        # Le fragment B arrive et est ajouté pendant la réception du fragment A
+        def fragment_concurrent():
+            self.assertEqual(self.envoyer(televersement, 0, b"BBBB").status_code, 200)
+
+        requete = APIRequestFactory().put(
+            f'/api/televersements/{televersement.pk}/chunk/?offset=0', b"AAAA",
+            content_type='application/octet-stream',
+        )
+        requete._stream = FluxIntercale(b"AAAA", fragment_concurrent)
+        reponse = TeleversementViewSet.as_view({'put': 'chunk'})(requete, pk=str(televersement.pk))
+
+        self.assertEqual(reponse.status_code, 409)
+        televersement.refresh_from_db()
+        self.assertEqual(televersement.taille_recue, 4)
+        self.assertEqual(self.contenu_partiel(televersement), b"BBBB")
+        self.assertEqual(os.listdir(default_storage.path('televersements')), [f"{televersement.pk}.part"])
+
+    def test_session_expiree_puis_purgee(self):
+        expiree = self.session()
+        active = self.session()
+        self.envoyer(expiree, 0, b"ABCD")
+        Televersement.objects.filter(pk=expiree.pk).update(date_expiration=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(self.envoyer(expiree, 4, b"EFGH").status_code, 410)
+        self.assertEqual(self.client.post(f'/api/televersements/{expiree.pk}/finalize/').status_code, 410)
+
+        # Fichiers anciens sans session : navire supprimé, fragment d'un processus arrêté
+        dossier = default_storage.path('televersements')
+        for nom in ('0b1d5c9e-0000-4000-8000-000000000000.part', f"{active.pk}.abc123.tmp"):
+            with open(os.path.join(dossier, nom), 'wb') as fichier:
+                fichier.write(b"x")
+            ancien = time.time() - 2 * settings.TELEVERSEMENTS_DUREE
+            os.utime(os.path.join(dossier, nom), (ancien, ancien))
+
+        sortie = StringIO()
+        call_command('purger_televersements', '--dry-run', stdout=sortie)
+        self.assertIn("1 session(s) expirée(s) et 2 fichier(s) orphelin(s) à supprimer", sortie.getvalue())
+        self.assertEqual(len(os.listdir(dossier)), 4)
+
+        call_command('purger_televersements', stdout=StringIO())
+        self.assertEqual(list(Televersement.objects.values_list('pk', flat=True)), [active.pk])
+        self.assertEqual(os.listdir(dossier), [f"{active.pk}.part"])
+
+
+# ----------------------------------------------------------------------
+# DOUBLONS (api/doublons.py, commande detecter_doublons)
+# ----------------------------------------------------------------------
+
+@override_settings(ALLOWED_HOSTS=['.example', 'testserver'])
+class DoublonsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.port_a = Organisation.objects.create(nom="Port A", slug='port-a', domaine='port-a.example')
+        cls.port_b = Organisation.objects.create(nom="Port B", slug='port-b', domaine='port-b.example')
+        cls.etoile = Navire.objects.create(
+            nom_navire="Étoile de la Mer", num_immatricule="DBL-1", type_navire="Chalutier",
+            imo="9074729", organisation=cls.port_a,
+        )
+        cls.etoile_bis = Navire.objects.create(
+            nom_navire="ETOILE DE MER", num_immatricule="DBL-2", type_navire="Chalutier",
+            imo="9074729", organisation=cls.port_a,
+        )
+        # Même nom dans une autre organisation : jamais proposé comme doublon
+        Navire.objects.create(
+            nom_navire="Étoile de la Mer", num_immatricule="DBL-3", type_navire="Chalutier",
+            imo="9074729", organisation=cls.port_b,
+        )
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier, ignore_errors=True)
+        reglage = self.settings(MEDIA_ROOT=dossier)
+        reglage.enable()
+        self.addCleanup(reglage.disable)
+        cache.clear()
+
+    def doublons(self, hote='port-a.example', **parametres):
+        return self.client.get('/api/navires/doublons/', parametres, HTTP_HOST=hote)
+
+    def test_resultat_precalcule_par_organisation(self):
+        self.assertEqual(self.doublons().status_code, 404)
+
+        call_command('detecter_doublons', 'navires', stdout=StringIO())
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as requetes:
+            reponse = self.doublons()
+        self.assertEqual(reponse.status_code, 200)
+        # Lecture du résultat enregistré : aucune requête sur les navires
+        self.assertFalse([q for q in requetes if 'api_navire' in q['sql']])
+        candidats = reponse.json()['candidats']
+        self.assertEqual([(c['id_a'], c['id_b']) for c in candidats], [(self.etoile.pk, self.etoile_bis.pk)])
+        self.assertEqual(self.doublons(hote='port-b.example').json()['candidats'], [])
+
+        self.assertEqual(self.doublons(seuil='0.5').status_code, 400)
+        self.assertEqual(self.doublons(seuil='1').json()['candidats'], [])
+
+    def test_fusion_retire_la_paire(self):
+        call_command('detecter_doublons', 'navires', stdout=StringIO())
+        reponse = self.client.post(
+            f'/api/navires/{self.etoile.pk}/fusionner/', {'doublon': self.etoile_bis.pk},
+            content_type='application/json', HTTP_HOST='port-a.example',
+        )
+        self.assertEqual(reponse.status_code, 200, reponse.content)
+        self.assertEqual(self.doublons().json()['candidats'], [])
+
+    def test_fusion_navires_rattache_les_enfants(self):
+        armement = Proprietaire.objects.create(nom_proprietaire="Armement Étoile", organisation=self.port_a)
+        peche = Activite.objects.create(nom_activite="Pêche")
+        Navire.objects.filter(pk=self.etoile_bis.pk).update(mmsi="227300001", proprietaire=armement)
+        self.etoile_bis.refresh_from_db()
+        self.etoile_bis.activites.add(peche)
+        moteur = Moteur.objects.create(navire=self.etoile_bis, nom_moteur="Principal", puissance="400 CV")
+        visite = Visite.objects.create(
+            navire=self.etoile_bis, date_visite=date.today(), expiration_permis=date.today() + timedelta(days=10),
+            lieu_visite="Concarneau",
+        )
+        MetaDonne.objects.create(navire=self.etoile, nom_meta_donne="Couleur", valeur_texte="Bleu")
+        MetaDonne.objects.create(navire=self.etoile_bis, nom_meta_donne="Couleur", valeur_texte="Rouge")
+        jauge = MetaDonne.objects.create(navire=self.etoile_bis, nom_meta_donne="Jauge", valeur_texte="12")
+        midi = datetime(2025, 10, 9, 12, 0, tzinfo=dt_timezone.utc)
+        for navire, horodatage in ((self.etoile, midi), (self.etoile_bis, midi + timedelta(hours=1))):
+            DernierePosition.objects.create(
+                navire=navire, horodatage=horodatage, latitude_ais=0, longitude_ais=0, cellule=cellule_grille(0, 0),
+            )
+
+        fusionner_navires(self.etoile, self.etoile_bis)
+
+        self.assertFalse(Navire.objects.filter(pk=self.etoile_bis.pk).exists())
+        # Mêmes lignes, rattachées à la fiche conservée
+        self.assertEqual(Moteur.objects.get(pk=moteur.pk).navire_id, self.etoile.pk)
+        self.assertEqual(Visite.objects.get(pk=visite.pk).navire_id, self.etoile.pk)
+        self.assertEqual(MetaDonne.objects.get(pk=jauge.pk).navire_id, self.etoile.pk)
+        # unique_together (navire, nom_meta_donne) : la valeur de la fiche conservée l'emporte
+        self.assertEqual(
+            dict(MetaDonne.objects.filter(navire=self.etoile).values_list('nom_meta_donne', 'valeur_texte')),
+            {"Couleur": "Bleu", "Jauge": "12"},
+        )
+        self.assertEqual(list(self.etoile.activites.all()), [peche])
+        self.etoile.refresh_from_db()
+        self.assertEqual((self.etoile.mmsi, self.etoile.proprietaire_id), ("227300001", armement.pk))
+        self.assertEqual(self.etoile.derniere_position.horodatage, midi + timedelta(hours=1))
+        self.assertEqual(self.etoile.statut_global, 'bientot')
+
+    def test_fusion_refusee_avec_soi_meme(self):
+        with self.assertRaises(ValueError):
+            fusionner_navires(self.etoile, self.etoile)
+        reponse = self.client.post(
+            f'/api/navires/{self.etoile.pk}/fusionner/', {'doublon': self.etoile.pk},
+            content_type='application/json', HTTP_HOST='port-a.example',
+        )
+        self.assertEqual(reponse.status_code, 400)
+
+    def test_fusion_proprietaires(self):
+        conserve = Proprietaire.objects.create(nom_proprietaire="Armement Le Goff", organisation=self.port_a)
+        doublon = Proprietaire.objects.create(
+            nom_proprietaire="Armement LE GOFF", contact="02 98 00 00 00", organisation=self.port_a,
+        )
+        Navire.objects.filter(pk__in=[self.etoile.pk, self.etoile_bis.pk]).update(proprietaire=doublon)
+
+        fusionner_proprietaires(conserve, doublon)
+
+        self.assertFalse(Proprietaire.objects.filter(pk=doublon.pk).exists())
+        self.assertEqual(Navire.objects.filter(proprietaire=conserve).count(), 2)
+        conserve.refresh_from_db()
+        self.assertEqual(conserve.contact, "02 98 00 00 00")
@@ -12,8 +12,14 @@ router.register(r'moteurs', MoteurViewSet)
 router.register(r'visites', VisiteViewSet)
 router.register(r'dossiers', DossierViewSet)
 router.register(r'meta_donnees', MetaDonneViewSet)
+router.register(r'televersements', TeleversementViewSet)
+router.register(r'taches_export', TacheExportViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
     path('alertes/summary/', AlertesSummaryView.as_view(), name='alertes-summary'),
+    path('stats/', StatistiquesFlotteView.as_view(), name='stats-flotte'),
+    path('bootstrap/', BootstrapView.as_view(), name='bootstrap'),
+    path('bootstrap/<str:version>/', BootstrapView.as_view(), name='bootstrap-version'),
+    path('evenements/', FluxEvenementsView.as_view(), name='evenements'),
 ]
\ No newline at end of file
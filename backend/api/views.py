@@ -1,26 +1,55 @@
 import base64
 import csv
+import hashlib
+import json
 import logging
 import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import zipfile
 from datetime import date, timedelta
-from io import BytesIO
+from functools import lru_cache
+from urllib.parse import urljoin
 from rest_framework import viewsets, status
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
 import pdfkit
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.files.storage import default_storage
-from django.db import models
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections, models, transaction
+from django.db.models import Window
+from django.db.models.functions import Coalesce, RowNumber
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.template.loader import render_to_string
+from django.urls import reverse
 from django.utils import timezone
-from rest_framework import status, viewsets
+from django.views import View
+from pypdf import PdfWriter
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import Throttled, ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from .admission import export_lourd, place_export, prendre_place, prolonger_place, rendre_place
+from .cache import calculer_une_fois, cle_cache
+from .doublons import (
+    SEUIL_DOUBLON, fusionner_navires, fusionner_proprietaires, lire_resultat, retirer_des_resultats,
+)
+from .evenements import flux_evenements, publier
+from .exports import ecrire_parquet, ecrire_xlsx
+from .fichiers import FichierPartiel, servir_fichier
 from .models import *
+from .organisations import organisation_courante
+from .pagination import PaginationCurseur
+from .positions import UNITES_PAR_DEGRE, filtrer_emprise, lire_emprise
+from .rendus_json import AnalyseurJSON
 from .serializers import *
 
 logger = logging.getLogger(__name__)
@@ -50,8 +79,17 @@ def basename(value):
 # ----------------------------------------------------------------------
 
 class AlertesSummaryView(APIView):
+    """
+    Synthèse des alertes du tableau de bord. Les requêtes identiques simultanées (ouverture
+    du tableau de bord par toute une équipe) sont coalescées : un seul calcul, dont le
+    résultat est gardé quelques secondes (voir calculer_une_fois).
+    """
     def get(self, request):
         today = date.today()
+        cle = cle_cache('flotte', 'alertes', today.isoformat())
+        return Response(calculer_une_fois(cle, lambda: self._calculer(today)))
+
+    def _calculer(self, today):
         soon = today + timedelta(days=30)
         
         # Documents expirés
@@ -90,7 +128,7 @@ class AlertesSummaryView(APIView):
         navires_recents = list(Navire.objects.order_by("-id")[:5].values("id", "nom_navire", "num_immatricule"))
         navires_recents = [{"id": n["id"], "nom": n["nom_navire"], "immatriculation": n["num_immatricule"]} for n in navires_recents]
 
-        return Response({
+        return {
             "documentsExpires": len(details_expires),
             "documentsBientotExpires": total_soon,
             "total_alertes": len(details_expires) + total_soon,
@@ -98,7 +136,7 @@ class AlertesSummaryView(APIView):
             "liste_expires": details_expires,
             "naviresRecents": navires_recents,
             "documentsPresqueExpires": docs_presque_expires
-        })
+        }
 
     def _doc_dict(self, navire, doc_type, date_exp, alert_type):
         """Helper pour formater les données d'alerte."""
@@ -119,6 +157,178 @@ class AlertesSummaryView(APIView):
             }
 
 
+class StatistiquesFlotteView(APIView):
+    """
+    Statistiques de la flotte calculées par agrégats SQL (GROUP BY / COUNT / SUM),
+    sans parcourir les navires en Python. Le résultat est mis en cache et invalidé
+    par les signaux dès qu'un navire, propriétaire ou document change.
+    """
+    DUREE_CACHE = 10 * 60
+
+    def get(self, request):
+        today = date.today()
+        cle = cle_cache('flotte', 'stats', today.isoformat())
+        data = cache.get(cle)
+        if data is None:
+            data = self._calculer(today)
+            cache.set(cle, data, self.DUREE_CACHE)
+        return Response(data)
+
+    def _distribution(self, queryset, champ):
+        return [
+            {"valeur": ligne[champ], "nombre": ligne['nombre']}
+            for ligne in queryset.values(champ).annotate(nombre=models.Count('id')).order_by('-nombre', champ)
+        ]
+
+    def _calculer(self, today):
+        navires = Navire.objects.all()
+
+        capacite = navires.aggregate(
+            total=models.Count('id'),
+            passagers_total=models.Sum('nbr_passager'),
+            equipage_total=models.Sum('nbr_equipage'),
+            passagers_moyenne=models.Avg('nbr_passager'),
+            equipage_moyenne=models.Avg('nbr_equipage'),
+        )
+
+        decennies = (
+            navires.filter(annee_de_construction__isnull=False)
+            .annotate(decennie=models.ExpressionWrapper(
+                models.F('annee_de_construction') / 10 * 10, output_field=models.IntegerField()
+            ))
+            .values('decennie').annotate(nombre=models.Count('id')).order_by('decennie')
+        )
+
+        # Un navire est conforme s'il n'a aucun document expiré
+        a_document_expire = models.ExpressionWrapper(
+            models.Exists(Assurance.objects.filter(navire=models.OuterRef('pk'), date_fin__lt=today)) |
+            models.Exists(Visite.objects.filter(navire=models.OuterRef('pk'), expiration_permis__lt=today)) |
+            models.Exists(Dossier.objects.filter(navire=models.OuterRef('pk'), date_expiration__lt=today)),
+            output_field=models.BooleanField()
+        )
+        conformite = (
+            navires.annotate(a_document_expire=a_document_expire)
+            .values('proprietaire_id', 'proprietaire__nom_proprietaire')
+            .annotate(
+                navires=models.Count('id'),
+                conformes=models.Count('id', filter=models.Q(a_document_expire=False)),
+            )
+            .order_by('proprietaire__nom_proprietaire')
+        )
+        conformite_par_proprietaire = [
+            {
+                "proprietaire_id": ligne['proprietaire_id'],
+                "nom": ligne['proprietaire__nom_proprietaire'],
+                "navires": ligne['navires'],
+                "conformes": ligne['conformes'],
+                "taux": round(ligne['conformes'] / ligne['navires'], 4) if ligne['navires'] else None,
+            }
+            for ligne in conformite
+        ]
+        total_conformes = sum(ligne['conformes'] for ligne in conformite_par_proprietaire)
+
+        return {
+            "total_navires": capacite['total'],
+            "par_type_navire": self._distribution(navires, 'type_navire'),
+            "par_nature_coque": self._distribution(navires, 'nature_coque'),
+            "par_decennie_construction": [
+                {"decennie": ligne['decennie'], "nombre": ligne['nombre']} for ligne in decennies
+            ],
+            "par_type_proprietaire": self._distribution(navires, 'proprietaire__type_proprietaire'),
+            "capacite": {
+                "passagers_total": capacite['passagers_total'] or 0,
+                "equipage_total": capacite['equipage_total'] or 0,
+                "passagers_moyenne": round(capacite['passagers_moyenne'] or 0, 2),
+                "equipage_moyenne": round(capacite['equipage_moyenne'] or 0, 2),
+            },
+            "taux_conformite_global": (
+                round(total_conformes / capacite['total'], 4) if capacite['total'] else None
+            ),
+            "conformite_par_proprietaire": conformite_par_proprietaire,
+            "genere_le": timezone.now().isoformat(),
+        }
+
+
+class BootstrapView(APIView):
+    """
+    Choix et référentiels des formulaires en une seule réponse, versionnée par empreinte.
+    - /bootstrap/ : {"version": ..., "url": ...}, revalidé à chaque visite mais servi depuis
+      le cache applicatif (aucune requête SQL tant que les référentiels ne changent pas) ;
+    - /bootstrap/<version>/ : contenu complet, Cache-Control immutable : le navigateur ne le
+      redemande plus tant que la version ne change pas. Une version périmée redirige vers
+      la version courante.
+    Le contenu est invalidé par les signaux (groupe 'referentiels') ; l'empreinte inclut
+    l'organisation et les choix définis dans le code.
+    """
+    DUREE_CACHE = 24 * 60 * 60
+    DUREE_NAVIGATEUR = 365 * 24 * 60 * 60
+
+    def get(self, request, version=None):
+        choix = {
+            'nature_coque': [code for code, _ in Navire.NATURE_COQUE_CHOICES],
+            'statut_global': [code for code, _ in Navire.STATUT_GLOBAL_CHOICES],
+            'type_proprietaire': [code for code, _ in Proprietaire.TYPE_PROPRIETAIRE_CHOICES],
+            'type_meta_donne': [code for code, _ in MetaDonne.TYPE_CHOICES],
+        }
+        # Un déploiement qui modifie les choix ne réutilise pas le contenu déjà en cache
+        empreinte_choix = hashlib.sha256(json.dumps(choix, sort_keys=True).encode()).hexdigest()[:12]
+        contenu = calculer_une_fois(
+            cle_cache('referentiels', 'bootstrap', empreinte_choix),
+            lambda: self._calculer(choix),
+            duree=self.DUREE_CACHE,
+        )
+
+        url = request.build_absolute_uri(reverse('bootstrap-version', args=[contenu['version']]))
+        if version is None:
+            response = Response({'version': contenu['version'], 'url': url})
+            response['Cache-Control'] = 'no-cache'
+        elif version != contenu['version']:
+            response = HttpResponseRedirect(url)
+            response['Cache-Control'] = 'no-cache'
+        else:
+            response = Response(contenu)
+            response['Cache-Control'] = f'private, max-age={self.DUREE_NAVIGATEUR}, immutable'
+        return response
+
+    def _calculer(self, choix):
+        donnees = {
+            'choix': choix,
+            'proprietaires': ProprietaireSerializer(
+                Proprietaire.objects.order_by('nom_proprietaire', 'id'), many=True
+            ).data,
+            'activites': ActiviteSerializer(Activite.objects.order_by('id'), many=True).data,
+            'assureurs': AssureurSerializer(Assureur.objects.order_by('id'), many=True).data,
+        }
+        # JSON canonique : même contenu, même empreinte, quel que soit le processus
+        canonique = json.dumps(donnees, sort_keys=True, default=str, ensure_ascii=False)
+        empreinte = hashlib.sha256(f"{organisation_courante()}:{canonique}".encode()).hexdigest()[:16]
+        return {'version': empreinte, **json.loads(canonique)}
+
+
+class FluxEvenementsView(View):
+    """
+    Flux Server-Sent Events des changements de l'organisation (api/evenements.py) : le
+    tableau de bord recharge ses données à réception au lieu d'interroger l'API à
+    intervalles réguliers. Servi uniquement en ASGI (une connexion ouverte par client).
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {'detail': "Flux d'événements disponible uniquement en ASGI (uvicorn backend.asgi:application)."},
+                status=501,
+            )
+        dernier_id = request.headers.get('Last-Event-ID', '')
+        response = StreamingHttpResponse(
+            flux_evenements(request.organisation_id, int(dernier_id) if dernier_id.isdigit() else None),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Pas de mise en tampon par nginx
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
 class ExportNaviresFiltresView(APIView):
     """
     Vue de support pour appliquer le filtrage et générer une réponse CSV.
@@ -280,38 +490,22 @@ class ExportNaviresFiltresView(APIView):
                     return f"Fichier: {file_name}"
             
             elif meta.type_meta_donne == 'BOOLEEN':
-                # Pour les booléens, on formate de manière lisible
-                valeur = meta.valeur_texte or ""
-                if valeur.lower() in ['true', '1', 'yes', 'oui', 'vrai']:
-                    return "Oui"
-                elif valeur.lower() in ['false', '0', 'no', 'non', 'faux']:
-                    return "Non"
-                else:
-                    return valeur
+                # Pour les booléens, on formate de manière lisible (colonne typée)
+                if meta.valeur_bool is None:
+                    return meta.valeur_texte or ""
+                return "Oui" if meta.valeur_bool else "Non"
             
             elif meta.type_meta_donne == 'DATE' and meta.valeur_texte:
-                # Pour les dates, on essaie de formater
-                try:
-                    from django.utils.dateparse import parse_date
-                    date_obj = parse_date(meta.valeur_texte)
-                    if date_obj:
-                        return date_obj.strftime('%d/%m/%Y')
-                    else:
-                        return meta.valeur_texte
-                except:
-                    return meta.valeur_texte
+                # Pour les dates, colonne typée déjà parsée à l'enregistrement
+                if meta.valeur_date:
+                    return meta.valeur_date.strftime('%d/%m/%Y')
+                return meta.valeur_texte
             
             elif meta.type_meta_donne == 'HEURE' and meta.valeur_texte:
-                # Pour les heures, on essaie de formater
-                try:
-                    from django.utils.dateparse import parse_time
-                    time_obj = parse_time(meta.valeur_texte)
-                    if time_obj:
-                        return time_obj.strftime('%H:%M')
-                    else:
-                        return meta.valeur_texte
-                except:
-                    return meta.valeur_texte
+                # Pour les heures, colonne typée déjà parsée à l'enregistrement
+                if meta.valeur_heure:
+                    return meta.valeur_heure.strftime('%H:%M')
+                return meta.valeur_texte
             
             else:
                 # Pour les autres types, on affiche la valeur texte
@@ -336,11 +530,46 @@ class ExportNaviresFiltresView(APIView):
         return type_mapping.get(proprietaire.type_proprietaire, proprietaire.type_proprietaire or "Non spécifié")
 
 
+@lru_cache(maxsize=8)
+def _lire_base64(chemin, mtime):
+    """Lecture mise en cache (clé : chemin + date de modification) d'un fichier en base64."""
+    with open(chemin, "rb") as f:
+        return base64.b64encode(f.read()).decode()
+
+
 class BasePDFView:
     """Classe de base pour la gestion des PDF avec logo (Utilise pdfkit/wkhtmltopdf)"""
+
+    # Graphe chargé en une fois pour construire le contexte d'une fiche
+    PREFETCH_FICHE = ('activites', 'assurances__assureur', 'moteurs', 'visites', 'dossiers', 'meta_donnees')
+
+    OPTIONS_PDF = {
+        'encoding': 'UTF-8',
+        # Active l'accès aux fichiers locaux (nécessaire pour les images non Base64/URLs)
+        'enable-local-file-access': True, 
+        'quiet': '', 
+        'no-stop-slow-scripts': '', 
+        'page-size': 'A4',
+        'margin-top': '1in',
+        'margin-right': '0.75in',
+        'margin-bottom': '1in',
+        'margin-left': '0.75in',
+    }
+
+    # Ordre de tri personnalisé pour les types de métadonnées
+    ORDRE_TYPES_META = {
+        'TEXTE': 1,
+        'NOMBRE': 2,
+        'DATE': 3,
+        'HEURE': 4,
+        'BOOLEEN': 5,
+        'URL': 6,
+        'FICHIER': 7,
+        'IMAGE': 8,
+    }
     
     def _get_logo_base64(self):
-        """Cherche et convertit le logo en base64"""
+        """Cherche et convertit le logo en base64 (mis en cache tant que le fichier ne change pas)"""
         logo_paths = [
             os.path.join(settings.MEDIA_ROOT, 'logo', 'cfimlogo.png'),
             os.path.join(settings.MEDIA_ROOT, 'cfimlogo.png'),
@@ -351,76 +580,27 @@ class BasePDFView:
         for logo_path in logo_paths:
             if os.path.exists(logo_path):
                 try:
-                    with open(logo_path, "rb") as img_file:
-                        return base64.b64encode(img_file.read()).decode()
+                    return _lire_base64(logo_path, os.path.getmtime(logo_path))
                 except Exception as e:
                     logger.warning(f"Erreur lecture logo {logo_path}: {e}")
                     continue
             
         logger.warning("Logo cfimlogo.png non trouvé dans les chemins standard.")
         return None
-    
-    def _generate_pdf_response(self, html_content, filename):
-        """Génère une réponse PDF à partir de HTML en utilisant pdfkit"""
-        try:
-            # Chargement de la configuration depuis settings.py
-            path_wkhtmltopdf = settings.PDFKIT_CONFIG.get('wkhtmltopdf')
-            
-            if not path_wkhtmltopdf:
-                logger.error("Chemin wkhtmltopdf manquant dans settings.PDFKIT_CONFIG")
-                return None
-
-            config = pdfkit.configuration(wkhtmltopdf=path_wkhtmltopdf)
-            
-            options={
-                'encoding': 'UTF-8',
-                # Active l'accès aux fichiers locaux (nécessaire pour les images non Base64/URLs)
-                'enable-local-file-access': True, 
-                'quiet': '', 
-                'no-stop-slow-scripts': '', 
-                'page-size': 'A4',
-                'margin-top': '1in',
-                'margin-right': '0.75in',
-                'margin-bottom': '1in',
-                'margin-left': '0.75in',
-            }
-
-            # Génération du PDF avec la configuration
-            try:
-                pdf_data = pdfkit.from_string(
-                    html_content, 
-                    False, 
-                    configuration=config,
-                    options=options
-                )
-            except IOError as e:
-                logger.error(f"IOError lors de la conversion PDF (wkhtmltopdf a planté ou n'est pas trouvé/accessible): {e}")
-                logger.error(f"Configuration wkhtmltopdf utilisée: {path_wkhtmltopdf}")
-                return None
-            
-            response = HttpResponse(pdf_data, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            return response
-            
-        except Exception as e:
-            logger.error(f"Erreur générale dans _generate_pdf_response: {e}")
-            return None
 
-# ----------------------------------------------------------------------
-# VIEWSETS DRF
-# ----------------------------------------------------------------------
-
-class NavireViewSet(viewsets.ModelViewSet, BasePDFView):
-    """ViewSet pour la gestion et l'exportation des Navires."""
-    queryset = Navire.objects.all()
-    serializer_class = NavireSerializer
-    
-    def _get_navire_image_base64(self, navire):
+    def _get_navire_image_base64(self, navire, cache_images=None):
+        """
+        Retourne la photo du navire en Data URI.
+        cache_images (dict nom -> Data URI) évite de relire une même image partagée
+        par plusieurs navires lors d'un export groupé.
+        """
         if not hasattr(navire, 'photo_navire') or not navire.photo_navire or not navire.photo_navire.name:
             logger.info(f"Navire ID {navire.id} : Le champ photo_navire est vide ou non défini.")
             return None
         
         file_name = navire.photo_navire.name
+        if cache_images is not None and file_name in cache_images:
+            return cache_images[file_name]
         
         try:
             logger.info(f"Navire ID {navire.id} : Tentative d'ouverture du fichier : {file_name}")
@@ -441,7 +621,10 @@ class NavireViewSet(viewsets.ModelViewSet, BasePDFView):
                 logger.info(f"Navire ID {navire.id} : Image encodée en Base64. Taille de la chaîne : {len(base64_encoded) / 1024:.2f} KB")
                 
                 # Retourne la Data URI complète
-                return f"data:{mime_type};base64,{base64_encoded}"
+                data_uri = f"data:{mime_type};base64,{base64_encoded}"
+                if cache_images is not None:
+                    cache_images[file_name] = data_uri
+                return data_uri
         
         except FileNotFoundError:
             logger.error(f"Navire ID {navire.id} : FileNotFoundError. Fichier non trouvé sur le disque : {file_name}")
@@ -450,18 +633,581 @@ class NavireViewSet(viewsets.ModelViewSet, BasePDFView):
             logger.error(f"Navire ID {navire.id} : Erreur lors de la conversion de l'image en Base64: {e}")
             return None
 
+    @staticmethod
+    def _statut_echeance(date_limite, today, in_30_days):
+        """Même classement que les champs `statut` des serializers (code CSS, libellé)."""
+        if not date_limite:
+            return 'inconnu', "Date inconnue"
+        if date_limite < today:
+            return 'expire', "Expiré"
+        if date_limite <= in_30_days:
+            return 'bientot', "Expire Bientôt (30j)"
+        return 'valide', "Valide"
+
+    def _contexte_pdf(self, navire, build_absolute_uri, logo_base64, cache_images=None):
+        """
+        Prépare le contexte du template pdf/fiche_navire.html pour un navire.
+        Le navire doit être chargé avec select_related('proprietaire') et le
+        prefetch des relations (voir PREFETCH_FICHE) : le contexte ne contient
+        que des dictionnaires et des listes, le rendu ne fait donc aucune requête.
+        """
+        navire_image_base64 = self._get_navire_image_base64(navire, cache_images)
+
+        # Récupérer le nom du fichier image du navire
+        navire_image_name = None
+        if navire.photo_navire and navire.photo_navire.name:
+            navire_image_name = os.path.basename(navire.photo_navire.name)
+
+        now = timezone.now()
+        today = now.date()
+        in_30_days = today + timedelta(days=30)
+
+        proprietaire = None
+        if navire.proprietaire:
+            proprietaire = {
+                'nom_proprietaire': navire.proprietaire.nom_proprietaire,
+                'contact': navire.proprietaire.contact,
+                'adresse': navire.proprietaire.adresse,
+            }
+
+        assurances = []
+        for assurance in navire.assurances.all():
+            statut_code, statut = self._statut_echeance(assurance.date_fin, today, in_30_days)
+            assurances.append({
+                'nom_assureur': assurance.assureur.nom_assureur if assurance.assureur else None,
+                'date_debut': assurance.date_debut,
+                'date_fin': assurance.date_fin,
+                'statut_code': statut_code,
+                'statut': statut,
+            })
+
+        visites = []
+        for visite in navire.visites.all():
+            statut_code, statut = self._statut_echeance(visite.expiration_permis, today, in_30_days)
+            visites.append({
+                'lieu_visite': visite.lieu_visite,
+                'date_visite': visite.date_visite,
+                'expiration_permis': visite.expiration_permis,
+                'statut_code': statut_code,
+                'statut': statut,
+            })
+
+        dossiers = []
+        for dossier in navire.dossiers.all():
+            statut_code, statut = self._statut_echeance(dossier.date_expiration, today, in_30_days)
+            dossiers.append({
+                'type_dossier': dossier.type_dossier,
+                'date_emission': dossier.date_emission,
+                'date_expiration': dossier.date_expiration,
+                'statut_code': statut_code,
+                'statut': statut,
+            })
+
+        # --- Préparer les métadonnées avec tri par type ---
+        meta_list = []
+        for meta in navire.meta_donnees.all():
+            valeur_pour_template = meta.valeur_texte
+
+            # Si c'est un fichier ou une image, nous extrayons l'URL absolue
+            if meta.type_meta_donne in ['FICHIER', 'IMAGE']:
+                valeur_pour_template = None
+                if meta.fichier_meta_donne:
+                    try:
+                        valeur_pour_template = build_absolute_uri(meta.fichier_meta_donne.url)
+                    except ValueError:
+                        pass
+            elif meta.type_meta_donne == 'DATE' and meta.valeur_date:
+                valeur_pour_template = meta.valeur_date.strftime('%d/%m/%Y')
+
+            meta_list.append({
+                'type_meta_donne': meta.type_meta_donne,
+                'nom_meta_donne': meta.nom_meta_donne,
+                'valeur_meta_donne': valeur_pour_template,
+                'est_vrai': meta.valeur_bool is True,
+                'order': self.ORDRE_TYPES_META.get(meta.type_meta_donne, 99),
+                'valeur_texte': meta.valeur_texte,
+            })
+        
+        # Trier par ordre personnalisé, puis par nom
+        meta_list.sort(key=lambda x: (x['order'], x['nom_meta_donne']))
+        
+        # Grouper par type pour le template
+        meta_grouped = {
+            'textes': [m for m in meta_list if m['type_meta_donne'] in ['TEXTE', 'NOMBRE', 'DATE', 'HEURE', 'BOOLEEN', 'URL']],
+            'fichiers': [m for m in meta_list if m['type_meta_donne'] == 'FICHIER'],
+            'images': [m for m in meta_list if m['type_meta_donne'] == 'IMAGE'],
+        }
+        
+        return {
+            'navire': {
+                'id': navire.id,
+                'nom_navire': navire.nom_navire,
+                'num_immatricule': navire.num_immatricule,
+                'type_navire': navire.type_navire,
+                'annee_de_construction': navire.annee_de_construction,
+                'lieu_de_construction': navire.lieu_de_construction,
+                'nature_coque': navire.nature_coque,
+                'nbr_passager': navire.nbr_passager,
+                'nbr_equipage': navire.nbr_equipage,
+                'proprietaire': proprietaire,
+            },
+            'activites': [activite.nom_activite for activite in navire.activites.all()],
+            'assurances': assurances,
+            'moteurs': [
+                {'nom_moteur': moteur.nom_moteur, 'puissance': moteur.puissance}
+                for moteur in navire.moteurs.all()
+            ],
+            'visites': visites,
+            'dossiers': dossiers,
+            'date_generation': now.strftime('%d/%m/%Y à %H:%M'),
+            'proprietaire_type_label': ExportNaviresFiltresView()._get_proprietaire_type_label(navire.proprietaire),
+            'has_logo': logo_base64 is not None,
+            'logo_base64': logo_base64,
+            'has_navire_image': navire_image_base64 is not None,
+            'navire_image_base64': navire_image_base64,
+            'navire_image_name': navire_image_name,
+            'now': today,
+            'in_30_days': in_30_days,
+            'meta_donnees': meta_list,  # Toutes les métadonnées triées
+            'meta_grouped': meta_grouped,  # Métadonnées groupées par type
+        }
+
+    def _configuration_pdf(self):
+        """Configuration pdfkit depuis settings.PDFKIT_CONFIG (None si absente)."""
+        path_wkhtmltopdf = settings.PDFKIT_CONFIG.get('wkhtmltopdf')
+        if not path_wkhtmltopdf:
+            logger.error("Chemin wkhtmltopdf manquant dans settings.PDFKIT_CONFIG")
+            return None
+        return pdfkit.configuration(wkhtmltopdf=path_wkhtmltopdf)
+    
+    def _generer_pdf(self, html_content):
+        """Convertit le HTML en PDF avec pdfkit (octets du document, None en cas d'échec)."""
+        try:
+            config = self._configuration_pdf()
+            if config is None:
+                return None
+
+            # Génération du PDF avec la configuration
+            try:
+                return pdfkit.from_string(
+                    html_content, 
+                    False, 
+                    configuration=config,
+                    options=self.OPTIONS_PDF
+                )
+            except IOError as e:
+                logger.error(f"IOError lors de la conversion PDF (wkhtmltopdf a planté ou n'est pas trouvé/accessible): {e}")
+                logger.error(f"Configuration wkhtmltopdf utilisée: {settings.PDFKIT_CONFIG.get('wkhtmltopdf')}")
+                return None
+            
+        except Exception as e:
+            logger.error(f"Erreur générale dans _generer_pdf: {e}")
+            return None
+
+
+class ExportPDFCombine(BasePDFView):
+    """
+    Génère un PDF unique pour une sélection de navires, en arrière-plan.
+    - La tâche (TacheExport) porte ses paramètres. Elle est exécutée par la commande
+      executer_exports (production), indépendante des workers web, ou par un thread du
+      processus web si settings.EXPORTS_DANS_LE_PROCESSUS (développement) ;
+    - les navires sont chargés par lots avec un seul plan select/prefetch par lot ;
+    - le logo et les photos partagées ne sont lus et encodés qu'une fois ;
+    - chaque lot est converti par un seul appel wkhtmltopdf (une page HTML par fiche),
+      écrit directement sur disque (exports/<id>/lot_NNNNN.pdf) : seul le lot en cours est
+      en mémoire. Les lots sont réunis à la fin par qpdf, qui copie les pages fichier par
+      fichier (repli pypdf en mémoire, d'où limite_navires()) ; une tâche reprise après un
+      arrêt repart du premier lot manquant ;
+    - la progression est enregistrée dans TacheExport (traites / total, débit en fiches/s)
+      et publiée sur le flux d'événements (api/evenements.py). date_activite sert de
+      battement de cœur : voir reprendre_taches_abandonnees().
+    """
+    TAILLE_LOT = 20
+    DELAI_ABANDON = timedelta(minutes=10)
+    TENTATIVES_MAX = 3
+
+    def __init__(self, tache):
+        self.tache = tache
+        self.navire_ids = tache.parametres.get('navire_ids', [])
+        url_base = tache.parametres.get('url_base', '/')
+        self.build_absolute_uri = lambda chemin='': urljoin(url_base, chemin)
+
+    @staticmethod
+    def qpdf():
+        """Chemin de l'exécutable qpdf (settings.QPDF_PATH), None s'il est absent."""
+        return shutil.which(settings.QPDF_PATH) if settings.QPDF_PATH else None
+
+    @classmethod
+    def limite_navires(cls):
+        """Nombre maximal de fiches d'un PDF combiné, None sans limite (qpdf disponible)."""
+        return None if cls.qpdf() else settings.EXPORTS_PDF_MAX_NAVIRES_SANS_QPDF
+
+    @classmethod
+    def creer(cls, request, navire_ids):
+        """Enregistre la tâche ; démarrée après la validation de la transaction."""
+        if settings.EXPORTS_DANS_LE_PROCESSUS:
+            # Sans service executer_exports, le ménage des tâches abandonnées se fait ici
+            cls.reprendre_taches_abandonnees()
+        tache = TacheExport.objects.create(
+            type_export='PDF_FILTRE',
+            total=len(navire_ids),
+            parametres={'navire_ids': navire_ids, 'url_base': request.build_absolute_uri('/')},
+        )
+        if settings.EXPORTS_DANS_LE_PROCESSUS:
+            transaction.on_commit(cls(tache).demarrer)
+        return tache
+
+    def demarrer(self):
+        threading.Thread(target=self.executer, daemon=True).start()
+
+    def executer(self, place=None):
+        """
+        Exécute la tâche si elle est encore EN_ATTENTE. Sans `place` (api/admission.py),
+        attend une place au plus settings.EXPORTS_ATTENTE_TACHE secondes, puis échoue.
+        """
+        taches = TacheExport.objects.toutes_organisations().filter(pk=self.tache.pk)
+        try:
+            if place is None:
+                place = prendre_place(attente_max=settings.EXPORTS_ATTENTE_TACHE)
+                if place is None:
+                    raise RuntimeError("Aucune place d'export libérée à temps, relancez l'export.")
+            maintenant = timezone.now()
+            reservee = taches.filter(statut='EN_ATTENTE').update(
+                statut='EN_COURS',
+                date_debut=Coalesce('date_debut', models.Value(maintenant)),
+                date_activite=maintenant,
+                tentatives=models.F('tentatives') + 1,
+            )
+            if not reservee:
+                # Prise par un autre exécutant, ou déjà terminée
+                return
+            self._publier('EN_COURS', 0)
+            config = self._configuration_pdf()
+            if config is None:
+                raise RuntimeError("Chemin wkhtmltopdf manquant dans settings.PDFKIT_CONFIG")
+
+            logo_base64 = self._get_logo_base64()
+            cache_images = {}
+            dossier_lots = self._dossier_lots()
+            os.makedirs(dossier_lots, exist_ok=True)
+            chemins_lots = []
+            traites = 0
+
+            for index, debut in enumerate(range(0, len(self.navire_ids), self.TAILLE_LOT)):
+                lot = self.navire_ids[debut:debut + self.TAILLE_LOT]
+                chemin_lot = os.path.join(dossier_lots, f"lot_{index:05d}.pdf")
+                # Lot déjà produit avant une interruption : conservé tel quel
+                if os.path.exists(chemin_lot) or self._generer_lot(lot, chemin_lot, config, logo_base64, cache_images):
+                    chemins_lots.append(chemin_lot)
+
+                traites += len(lot)
+                taches.update(traites=traites, date_activite=timezone.now())
+                self._publier('EN_COURS', traites)
+                prolonger_place(place)
+
+            nom_fichier = f"exports/{self.tache.pk}.pdf"
+            self._reunir(chemins_lots, default_storage.path(nom_fichier))
+            shutil.rmtree(dossier_lots, ignore_errors=True)
+
+            taches.update(statut='TERMINE', fichier=nom_fichier, date_fin=timezone.now())
+            self._publier('TERMINE', traites)
+        except Exception as e:
+            logger.error(f"Erreur export PDF combiné {self.tache.pk}: {e}")
+            taches.update(statut='ERREUR', erreur=str(e), date_fin=timezone.now())
+            shutil.rmtree(self._dossier_lots(), ignore_errors=True)
+            self._publier('ERREUR', None)
+        finally:
+            if place is not None:
+                rendre_place(place)
+            close_old_connections()
+
+    def _dossier_lots(self):
+        return default_storage.path(f"exports/{self.tache.pk}")
+
+    def _generer_lot(self, lot, chemin_lot, config, logo_base64, cache_images):
+        """Écrit le PDF du lot sur disque ; False si aucun de ses navires n'existe plus."""
+        navires = Navire.objects.filter(id__in=lot).select_related('proprietaire').prefetch_related(
+            *self.PREFETCH_FICHE
+        ).order_by('nom_navire', 'id')
+
+        with tempfile.TemporaryDirectory() as dossier:
+            pages_html = []
+            for navire in navires:
+                contexte = self._contexte_pdf(navire, self.build_absolute_uri, logo_base64, cache_images)
+                chemin = os.path.join(dossier, f"{navire.id}.html")
+                with open(chemin, 'w', encoding='utf-8') as f:
+                    f.write(render_to_string('pdf/fiche_navire.html', contexte))
+                pages_html.append(chemin)
+
+            if not pages_html:
+                return False
+            # Fichier temporaire renommé : un lot présent sur disque est toujours complet
+            pdfkit.from_file(pages_html, f"{chemin_lot}.tmp", configuration=config, options=self.OPTIONS_PDF)
+        os.replace(f"{chemin_lot}.tmp", chemin_lot)
+        return True
+
+    def _reunir(self, chemins_lots, chemin_final):
+        """
+        Réunit les lots dans `chemin_final`. qpdf lit les lots un à un en écrivant le
+        résultat : la mémoire ne dépend pas du nombre de fiches. pypdf (repli) garde toutes
+        les pages jusqu'à l'écriture, d'où limite_navires().
+        """
+        temporaire = f"{chemin_final}.tmp"
+        qpdf = self.qpdf()
+        if qpdf and chemins_lots:
+            # Liste des lots dans un fichier d'arguments : pas de limite de longueur de ligne de commande
+            arguments = f"{temporaire}.args"
+            with open(arguments, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(['--empty', '--pages', *chemins_lots, '--', temporaire]))
+            try:
+                resultat = subprocess.run([qpdf, f"@{arguments}"], capture_output=True, text=True)
+            finally:
+                os.remove(arguments)
+            # Code 3 : document produit, avec avertissements
+            if resultat.returncode not in (0, 3):
+                raise RuntimeError(f"Réunion des lots par qpdf impossible : {resultat.stderr.strip()}")
+        else:
+            writer = PdfWriter()
+            for chemin in chemins_lots:
+                writer.append(chemin)
+            with open(temporaire, 'wb') as f:
+                writer.write(f)
+        os.replace(temporaire, chemin_final)
+
+    def _publier(self, statut, traites):
+        """Progression de la tâche sur le flux d'événements (remplace l'interrogation de /taches_export/)."""
+        try:
+            publier('export', self.tache.organisation_id, id=str(self.tache.pk), statut=statut, traites=traites,
+                    total=len(self.navire_ids))
+        except Exception as e:
+            logger.warning(f"Publication de la progression de l'export {self.tache.pk} impossible: {e}")
+
+    @classmethod
+    def reprendre_taches_abandonnees(cls):
+        """
+        Tâches dont l'exécutant s'est arrêté (redémarrage, arrêt brutal) :
+        - EN_COURS sans activité depuis DELAI_ABANDON : remises EN_ATTENTE pour être reprises
+          par executer_exports, tant que TENTATIVES_MAX n'est pas atteint ;
+        - avec EXPORTS_DANS_LE_PROCESSUS, aucun exécutant ne les reprendrait : elles passent
+          en ERREUR, comme les tâches restées EN_ATTENTE au-delà de l'attente d'une place.
+        Appelée par la boucle d'executer_exports (ou `executer_exports --une-fois` planifié)
+        et, avec EXPORTS_DANS_LE_PROCESSUS, à la création d'une tâche ; jamais par les
+        lectures de /taches_export/, servies par les réplicas.
+        Retourne le nombre de tâches remises en attente et passées en erreur.
+        """
+        maintenant = timezone.now()
+        taches = TacheExport.objects.toutes_organisations()
+        abandonnees = models.Q(statut='EN_COURS', date_activite__lt=maintenant - cls.DELAI_ABANDON)
+        reprises = 0
+        if settings.EXPORTS_DANS_LE_PROCESSUS:
+            delai_attente = timedelta(seconds=settings.EXPORTS_ATTENTE_TACHE) + cls.DELAI_ABANDON
+            abandonnees |= models.Q(statut='EN_ATTENTE', date_creation__lt=maintenant - delai_attente)
+        else:
+            reprises = taches.filter(abandonnees, tentatives__lt=cls.TENTATIVES_MAX).update(statut='EN_ATTENTE')
+
+        echouees = list(taches.filter(abandonnees).values_list('pk', flat=True))
+        if echouees:
+            taches.filter(pk__in=echouees).filter(abandonnees).update(
+                statut='ERREUR', erreur="Export interrompu par l'arrêt de son exécutant.", date_fin=maintenant
+            )
+            for pk in echouees:
+                shutil.rmtree(default_storage.path(f"exports/{pk}"), ignore_errors=True)
+        return reprises, len(echouees)
+
+
+class TacheExportViewSet(mixins.RetrieveModelMixin,
+                         mixins.ListModelMixin,
+                         viewsets.GenericViewSet):
+    """Suivi des exports longs (progression, débit) et téléchargement du résultat."""
+    queryset = TacheExport.objects.all().order_by('-date_creation')
+    serializer_class = TacheExportSerializer
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        tache = self.get_object()
+        if tache.statut != 'TERMINE' or not tache.fichier:
+            return Response(
+                {"error": "Export non terminé.", "statut": tache.statut},
+                status=status.HTTP_409_CONFLICT
+            )
+        nom = f"fiches_navires_{tache.date_creation.strftime('%Y-%m-%d_%H-%M')}.pdf"
+        return servir_fichier(request, tache.fichier, nom_telechargement=nom)
+
+
+# ----------------------------------------------------------------------
+# VIEWSETS DRF
+# ----------------------------------------------------------------------
+
+def _prefetch_historique(relation, queryset):
+    """Prefetch limité aux LIMITE_HISTORIQUE_INLINE + 1 éléments les plus récents de chaque navire."""
+    ordre = HISTORIQUE_NAVIRE[relation][2]
+    queryset = queryset.annotate(
+        rang=Window(RowNumber(), partition_by=models.F('navire_id'), order_by=list(ordre))
+    ).filter(rang__lte=LIMITE_HISTORIQUE_INLINE + 1).order_by(*ordre)
+    return models.Prefetch(relation, queryset=queryset)
+
+
+class ListeCoalesceeMixin:
+    """
+    Réponses de `list` coalescées par URL complète (filtres, tri et page compris) : les
+    requêtes identiques simultanées attendent le calcul en cours (voir calculer_une_fois).
+    Groupe de cache 'lectures', invalidé par les signaux à chaque modification.
+    """
+
+    def list(self, request, *args, **kwargs):
+        lister = super().list
+        cle = cle_cache('lectures', 'liste', self.basename, request.build_absolute_uri())
+        return Response(calculer_une_fois(cle, lambda: lister(request, *args, **kwargs).data))
+
+
+class DoublonsMixin:
+    """
+    /doublons/?seuil= : paires candidates notées (voir api/doublons.py), telles que
+    calculées par la dernière exécution de la commande detecter_doublons ; paginées avec
+    ?page= / ?page_size=. La requête ne fait que lire ce résultat : 404 s'il n'existe pas.
+    /{id}/fusionner/ (POST {"doublon": id}) : fusionne le doublon dans cette fiche.
+    """
+    modele_doublons = None
+    fusion_doublons = None
+
+    @action(detail=False, methods=['get'])
+    def doublons(self, request):
+        try:
+            seuil = float(request.query_params.get('seuil', SEUIL_DOUBLON))
+        except ValueError:
+            seuil = None
+        if seuil is None or not 0 < seuil <= 1:
+            raise ValidationError({'seuil': "Nombre attendu entre 0 et 1."})
+
+        resultat = lire_resultat(self.modele_doublons)
+        if resultat is None:
+            return Response(
+                {"error": "Aucune détection enregistrée : lancez la commande detecter_doublons."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if seuil < resultat['seuil']:
+            raise ValidationError({'seuil': f"La dernière détection a été calculée au seuil {resultat['seuil']}."})
+        resultat['candidats'] = [c for c in resultat['candidats'] if c['score'] >= seuil]
+
+        page = self.paginate_queryset(resultat['candidats'])
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(resultat)
+
+    @action(detail=True, methods=['post'])
+    def fusionner(self, request, pk=None):
+        conserve = self.get_object()
+        doublon_id = str(request.data.get('doublon', ''))
+        if not doublon_id.isdigit():
+            raise ValidationError({'doublon': "Identifiant de la fiche à fusionner attendu."})
+        doublon = get_object_or_404(self.get_queryset().model, pk=doublon_id)
+        try:
+            self.fusion_doublons(conserve, doublon)
+        except ValueError as exc:
+            raise ValidationError({'doublon': str(exc)})
+        retirer_des_resultats(self.modele_doublons, int(doublon_id))
+        return Response(self.get_serializer(self.get_object()).data)
+
+
+class NavireViewSet(ListeCoalesceeMixin, DoublonsMixin, viewsets.ModelViewSet, BasePDFView):
+    """ViewSet pour la gestion et l'exportation des Navires."""
+    queryset = Navire.objects.select_related('proprietaire').prefetch_related(
+        'activites', 'assurances__assureur', 'moteurs', 'visites', 'dossiers', 'meta_donnees'
+    )
+    serializer_class = NavireSerializer
+    modele_doublons = 'navires'
+    fusion_doublons = staticmethod(fusionner_navires)
+    # Portée de ScopedRateThrottle, définie par les actions d'export (voir api/admission.py)
+    throttle_scope = None
+
+    # Tris autorisés via ?ordering= (préfixe '-' pour l'ordre décroissant)
+    CHAMPS_TRI = ['id', 'nom_navire', 'prochaine_echeance', 'nb_expires', 'nb_bientot']
+
+    def get_queryset(self):
+        """
+        Filtre ?statut= (expire, bientot, valide, inconnu) et tri ?ordering=, tous deux
+        servis par l'index (statut_global, prochaine_echeance).
+        """
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            # Historique limité par navire (fenêtre ROW_NUMBER), voir NavireSerializer
+            queryset = queryset.prefetch_related(None).prefetch_related(
+                'activites', 'assureurs', 'moteurs', 'meta_donnees',
+                _prefetch_historique('visites', Visite.objects.all()),
+                _prefetch_historique('dossiers', Dossier.objects.all()),
+                _prefetch_historique('assurances', Assurance.objects.select_related('assureur')),
+            )
+        if self.action != 'list':
+            return queryset
+
+        statut = self.request.query_params.get('statut')
+        if statut:
+            statuts_valides = [code for code, _ in Navire.STATUT_GLOBAL_CHOICES]
+            if statut not in statuts_valides:
+                raise ValidationError({'statut': f"Valeurs possibles : {', '.join(statuts_valides)}."})
+            queryset = queryset.filter(statut_global=statut)
+
+        ordering = self.request.query_params.get('ordering')
+        if ordering:
+            if ordering.lstrip('-') not in self.CHAMPS_TRI:
+                raise ValidationError({'ordering': f"Valeurs possibles : {', '.join(self.CHAMPS_TRI)}."})
+            queryset = queryset.order_by(ordering, 'id')
+        return queryset
+    
     @action(detail=False, methods=['get'])
     def nature_coque_choices(self, request):
         return Response([choice[0] for choice in Navire.NATURE_COQUE_CHOICES])
 
+    # Colonnes de la réponse compacte de `positions`
+    COLONNES_POSITIONS = ['id', 'nom_navire', 'latitude', 'longitude', 'vitesse', 'route', 'cap', 'horodatage']
+
     @action(detail=False, methods=['get'])
+    def positions(self, request):
+        """
+        Dernières positions AIS des navires situés dans une emprise, pour la carte :
+        ?bbox=lon_min,lat_min,lon_max,lat_max (degrés décimaux, lon_min > lon_max pour
+        traverser l'antiméridien) et ?age_max=<minutes> pour écarter les positions anciennes.
+        Réponse compacte : {"colonnes": [...], "positions": [[...], ...]}, vitesse en nœuds,
+        route et cap en degrés.
+        """
+        try:
+            emprise = lire_emprise(request.query_params.get('bbox', ''))
+        except ValueError as exc:
+            raise ValidationError({'bbox': f"Emprise invalide ({exc})"})
+
+        queryset = filtrer_emprise(DernierePosition.objects.all(), emprise)
+        age_max = request.query_params.get('age_max')
+        if age_max:
+            try:
+                queryset = queryset.filter(horodatage__gte=timezone.now() - timedelta(minutes=float(age_max)))
+            except ValueError:
+                raise ValidationError({'age_max': "Nombre de minutes attendu."})
+
+        lignes = queryset.values_list(
+            'navire_id', 'navire__nom_navire', 'latitude_ais', 'longitude_ais', 'vitesse', 'route', 'cap',
+            'horodatage',
+        )
+        positions = [
+            [
+                navire_id, nom, round(latitude / UNITES_PAR_DEGRE, 6), round(longitude / UNITES_PAR_DEGRE, 6),
+                None if vitesse is None else vitesse / 10,
+                None if route is None else route / 10,
+                None if cap is None else cap / 10,
+                horodatage,
+            ]
+            for navire_id, nom, latitude, longitude, vitesse, route, cap, horodatage in lignes
+        ]
+        return Response({'colonnes': self.COLONNES_POSITIONS, 'positions': positions})
+
+    @action(detail=False, methods=['get'], throttle_scope='exports')
+    @export_lourd
     def export_csv(self, request):
         """Exportation CSV de tous les navires."""
         try:
             # Créer une instance de ExportNaviresFiltresView
             export_view = ExportNaviresFiltresView()
             # Appeler la méthode avec le request
-            return export_view._generate_csv_response(self.queryset, "navires_complets", request)
+            return export_view._generate_csv_response(self.get_queryset(), "navires_complets", request)
         except Exception as e:
             logger.error(f"Erreur export_csv: {str(e)}")
             return Response(
@@ -469,7 +1215,8 @@ class NavireViewSet(viewsets.ModelViewSet, BasePDFView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], throttle_scope='exports')
+    @export_lourd
     def export_csv_filtered(self, request):
         """Exportation CSV des navires filtrés via les paramètres GET."""
         try:
@@ -488,100 +1235,112 @@ class NavireViewSet(viewsets.ModelViewSet, BasePDFView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'], throttle_scope='exports')
+    @export_lourd
+    def export_xlsx(self, request):
+        """
+        Exportation XLSX (une feuille par entité) des navires, filtrés via les mêmes
+        paramètres GET que export_csv_filtered. Le classeur est écrit en mode
+        mémoire constante dans un fichier temporaire, puis envoyé en streaming.
+        """
+        try:
+            navires = ExportNaviresFiltresView()._apply_filters(request)
+            fichier = tempfile.NamedTemporaryFile(suffix='.xlsx')
+            ecrire_xlsx(fichier.name, navires)
+            fichier.seek(0)
+            filename = f"navires_{timezone.now().strftime('%Y-%m-%d_%H-%M')}.xlsx"
+            return FileResponse(
+                fichier,
+                as_attachment=True,
+                filename=filename,
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+        except Exception as e:
+            logger.error(f"Erreur export_xlsx: {str(e)}")
+            return Response(
+                {"error": f"Erreur lors de l'export XLSX: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['get', 'post'], throttle_scope='exports_pdf')
+    def export_filtered_pdf(self, request):
+        """
+        Fiches PDF des navires filtrés (mêmes paramètres GET que export_csv_filtered),
+        réunies dans un seul document. La génération tourne en arrière-plan :
+        la réponse 202 contient la tâche, à suivre via /taches_export/{id}/
+        puis à récupérer via /taches_export/{id}/download/.
+        """
+        navire_ids = list(ExportNaviresFiltresView()._apply_filters(request).order_by('nom_navire', 'id').values_list('id', flat=True))
+        if not navire_ids:
+            return Response({"error": "Aucun navire ne correspond aux filtres."}, status=status.HTTP_400_BAD_REQUEST)
+        limite = ExportPDFCombine.limite_navires()
+        if limite is not None and len(navire_ids) > limite:
+            return Response(
+                {"error": f"{len(navire_ids)} navires sélectionnés : un PDF combiné est limité à {limite} fiches, "
+                          f"affinez les filtres."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        tache = ExportPDFCombine.creer(request, navire_ids)
+        return Response(TacheExportSerializer(tache).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], throttle_scope='exports')
+    @export_lourd
+    def export_parquet(self, request):
+        """
+        Exportation analytique : archive ZIP contenant un fichier Parquet typé par table,
+        pour les navires filtrés via les mêmes paramètres GET que export_csv_filtered.
+        """
+        try:
+            navires = ExportNaviresFiltresView()._apply_filters(request)
+            archive = tempfile.NamedTemporaryFile(suffix='.zip')
+            with tempfile.TemporaryDirectory() as dossier:
+                # Parquet est déjà compressé : l'archive est simplement stockée
+                with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_STORED) as zf:
+                    for chemin in ecrire_parquet(dossier, navires):
+                        zf.write(chemin, os.path.basename(chemin))
+            archive.seek(0)
+            filename = f"navires_parquet_{timezone.now().strftime('%Y-%m-%d_%H-%M')}.zip"
+            return FileResponse(archive, as_attachment=True, filename=filename, content_type='application/zip')
+        except Exception as e:
+            logger.error(f"Erreur export_parquet: {str(e)}")
+            return Response(
+                {"error": f"Erreur lors de l'export Parquet: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
     # SUPPRIMÉ: L'export CSV d'un seul navire (export_one_csv)
     # @action(detail=True, methods=['get'])
     # def export_one_csv(self, request, pk=None):
     #     """Exportation CSV d'un navire spécifique."""
     #     ...
 
-    @action(detail=True, methods=['get'])
+    @action(detail=True, methods=['get'], throttle_scope='exports_pdf')
     def export_one_pdf(self, request, pk=None):
-        """Génère et retourne la fiche d'un navire en PDF."""
+        """
+        Génère et retourne la fiche d'un navire en PDF. Les demandes simultanées pour un même
+        navire sont coalescées : une seule conversion wkhtmltopdf, dans une place d'export.
+        """
         try:
             navire = self.get_object()
             
-            logo_base64 = self._get_logo_base64()
-            navire_image_base64 = self._get_navire_image_base64(navire)
-
-            # Récupérer le nom du fichier image du navire
-            navire_image_name = None
-            if navire.photo_navire and navire.photo_navire.name:
-                navire_image_name = os.path.basename(navire.photo_navire.name)
-
-            # --- Préparer les métadonnées avec tri par type ---
-            meta_donnees_preparees = []
             now = timezone.now()
-            in_30_days = now + timedelta(days=30)
-            
-            # Ordre de tri personnalisé pour les types de métadonnées
-            type_order = {
-                'TEXTE': 1,
-                'NOMBRE': 2,
-                'DATE': 3,
-                'HEURE': 4,
-                'BOOLEEN': 5,
-                'URL': 6,
-                'FICHIER': 7,
-                'IMAGE': 8,
-            }
-            
-            # Préparer et trier les métadonnées
-            meta_list = []
-            for meta in navire.meta_donnees.all():
-                valeur_meta_donne = meta.valeur_meta_donne
-                valeur_pour_template = valeur_meta_donne
 
-                # Si c'est un fichier ou une image, nous extrayons l'URL absolue
-                if meta.type_meta_donne in ['FICHIER', 'IMAGE'] and valeur_meta_donne:
-                    try:
-                        relative_url = valeur_meta_donne.url
-                        valeur_pour_template = request.build_absolute_uri(relative_url)
-                    except ValueError:
-                        valeur_pour_template = None
-                
-                meta_data = {
-                    'type_meta_donne': meta.type_meta_donne,
-                    'nom_meta_donne': meta.nom_meta_donne,
-                    'valeur_meta_donne': valeur_pour_template,
-                    'order': type_order.get(meta.type_meta_donne, 99),
-                    'valeur_texte': meta.valeur_texte,
-                }
-                meta_list.append(meta_data)
-            
-            # Trier par ordre personnalisé, puis par nom
-            meta_list.sort(key=lambda x: (x['order'], x['nom_meta_donne']))
-            
-            # Grouper par type pour le template
-            meta_grouped = {
-                'textes': [m for m in meta_list if m['type_meta_donne'] in ['TEXTE', 'NOMBRE', 'DATE', 'HEURE', 'BOOLEEN', 'URL']],
-                'fichiers': [m for m in meta_list if m['type_meta_donne'] == 'FICHIER'],
-                'images': [m for m in meta_list if m['type_meta_donne'] == 'IMAGE'],
-            }
-            
-            context = {
-                'navire': navire,
-                'date_generation': now.strftime('%d/%m/%Y à %H:%M'),
-                'proprietaire_type_label': ExportNaviresFiltresView()._get_proprietaire_type_label(navire.proprietaire),
-                'has_logo': logo_base64 is not None,
-                'logo_base64': logo_base64,
-                'has_navire_image': navire_image_base64 is not None,
-                'navire_image_base64': navire_image_base64,
-                'navire_image_name': navire_image_name,
-                'now': now.date(),
-                'in_30_days': in_30_days.date(),
-                'meta_donnees': meta_list,  # Toutes les métadonnées triées
-                'meta_grouped': meta_grouped,  # Métadonnées groupées par type
-            }
+            def generer():
+                with place_export():
+                    context = self._contexte_pdf(navire, request.build_absolute_uri, self._get_logo_base64())
+                    # Générer le HTML avec le template
+                    html_string = render_to_string('pdf/fiche_navire.html', context)
+                    return self._generer_pdf(html_string)
 
-            # Générer le HTML avec le template
-            html_string = render_to_string('pdf/fiche_navire.html', context)
+            cle = cle_cache('lectures', 'fiche_pdf', navire.pk, request.get_host(), now.date().isoformat())
+            pdf_data = calculer_une_fois(cle, generer)
             
-            # Générer le PDF
-            filename = f"fiche_navire_{navire.nom_navire or 'sans_nom'}_{now.strftime('%Y-%m-%d')}.pdf"
-            pdf_response = self._generate_pdf_response(html_string, filename)
-            
-            if pdf_response:
-                return pdf_response
+            if pdf_data:
+                filename = f"fiche_navire_{navire.nom_navire or 'sans_nom'}_{now.strftime('%Y-%m-%d')}.pdf"
+                response = HttpResponse(pdf_data, content_type='application/pdf')
+                response['Content-Disposition'] = f'attachment; filename="{filename}"'
+                return response
             else:
                 return Response({
                     "error": "Erreur lors de la génération du PDF. Vérifiez les logs (IOError ou configuration wkhtmltopdf)."
@@ -589,6 +1348,8 @@ class NavireViewSet(viewsets.ModelViewSet, BasePDFView):
 
         except Navire.DoesNotExist:
             return Response({"error": "Navire introuvable."}, status=status.HTTP_404_NOT_FOUND)
+        except Throttled:
+            raise
         except Exception as e:
             logger.error(f"Erreur export PDF non gérée: {str(e)}")
             import traceback
@@ -615,25 +1376,118 @@ class NavireViewSet(viewsets.ModelViewSet, BasePDFView):
 
 # Viewsets pour les modèles secondaires
 
-class ProprietaireViewSet(viewsets.ModelViewSet):
-    queryset = Proprietaire.objects.all()
+def _agregat_navires(expression):
+    """Sous-requête corrélée : agrégat sur les navires du propriétaire courant (0 si aucun)."""
+    return Coalesce(
+        models.Subquery(
+            Navire.objects.filter(proprietaire=models.OuterRef('pk'))
+            .order_by().values('proprietaire')
+            .annotate(valeur=expression).values('valeur')[:1]
+        ),
+        0
+    )
+
+
+class ProprietaireViewSet(ListeCoalesceeMixin, DoublonsMixin, viewsets.ModelViewSet):
+    """
+    Propriétaires. Avec ?flotte=1, la liste est annotée des agrégats de flotte
+    (nombre de navires, capacités, documents expirés / bientôt expirés) ;
+    ?search= filtre sur le nom et le contact. /proprietaires/{id}/portfolio/
+    retourne le propriétaire annoté et le résumé de chacun de ses navires.
+    """
+    queryset = Proprietaire.objects.all().order_by('nom_proprietaire', 'id')
     serializer_class = ProprietaireSerializer
+    modele_doublons = 'proprietaires'
+    fusion_doublons = staticmethod(fusionner_proprietaires)
+
+    def _mode_flotte(self):
+        return self.action == 'portfolio' or (
+            self.action == 'list' and self.request.query_params.get('flotte') in ('1', 'true')
+        )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            search_query = self.request.query_params.get('search', '').strip()
+            if search_query:
+                queryset = queryset.filter(
+                    models.Q(nom_proprietaire__icontains=search_query) |
+                    models.Q(contact__icontains=search_query)
+                )
+        if self._mode_flotte():
+            queryset = queryset.annotate(
+                nb_navires=_agregat_navires(models.Count('id')),
+                capacite_passagers=_agregat_navires(models.Sum('nbr_passager')),
+                capacite_equipage=_agregat_navires(models.Sum('nbr_equipage')),
+                nb_navires_expires=_agregat_navires(models.Count('id', filter=models.Q(statut_global='expire'))),
+                nb_documents_expires=_agregat_navires(models.Sum('nb_expires')),
+                nb_documents_bientot=_agregat_navires(models.Sum('nb_bientot')),
+            )
+        return queryset
+
+    def get_serializer_class(self):
+        if self._mode_flotte():
+            return ProprietaireFlotteSerializer
+        return super().get_serializer_class()
+
+    @action(detail=True, methods=['get'])
+    def portfolio(self, request, pk=None):
+        """Propriétaire avec agrégats de flotte et navires résumés, les plus urgents d'abord."""
+        proprietaire = self.get_object()
+        navires = (
+            Navire.objects.filter(proprietaire=proprietaire)
+            .order_by(models.F('prochaine_echeance').asc(nulls_last=True), 'id')
+            .values(
+                'id', 'nom_navire', 'num_immatricule', 'type_navire', 'nbr_passager', 'nbr_equipage',
+                'statut_global', 'prochaine_echeance', 'nb_expires', 'nb_bientot'
+            )
+        )
+        data = self.get_serializer(proprietaire).data
+        data['navires'] = list(navires)
+        return Response(data)
 
     @action(detail=False, methods=['get'])
     def type_proprietaire_choices(self, request):
         return Response([choice[0] for choice in Proprietaire.TYPE_PROPRIETAIRE_CHOICES])
 
-class ActiviteViewSet(viewsets.ModelViewSet):
+class ActiviteViewSet(ListeCoalesceeMixin, viewsets.ModelViewSet):
     queryset = Activite.objects.all()
     serializer_class = ActiviteSerializer
 
-class AssureurViewSet(viewsets.ModelViewSet):
+class AssureurViewSet(ListeCoalesceeMixin, viewsets.ModelViewSet):
     queryset = Assureur.objects.all()
     serializer_class = AssureurSerializer
 
-class AssuranceViewSet(viewsets.ModelViewSet):
-    queryset = Assurance.objects.all()
+class HistoriqueNavireMixin:
+    """
+    Filtre ?navire= et tri du plus récent au plus ancien (ordre_historique).
+    Avec ?cursor= ou ?page_size=, la liste est paginée par curseur (keyset).
+    Avec ?archives=1, la liste porte sur les documents archivés (queryset_archives,
+    voir api/archives.py), de même structure.
+    """
+    pagination_class = PaginationCurseur
+    ordre_historique = None
+    queryset_archives = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+        if self.request.query_params.get('archives') in ('1', 'true'):
+            queryset = self.queryset_archives.all()
+        navire_id = self.request.query_params.get('navire')
+        if navire_id:
+            if not navire_id.isdigit():
+                raise ValidationError({'navire': "Identifiant de navire invalide."})
+            queryset = queryset.filter(navire_id=navire_id)
+        return queryset.order_by(*self.ordre_historique)
+
+
+class AssuranceViewSet(ListeCoalesceeMixin, HistoriqueNavireMixin, viewsets.ModelViewSet):
+    queryset = Assurance.objects.select_related('assureur')
+    queryset_archives = ArchiveAssurance.objects.select_related('assureur')
     serializer_class = AssuranceSerializer
+    ordre_historique = HISTORIQUE_NAVIRE['assurances'][2]
     filterset_fields = ['navire']
 
     @action(detail=False, methods=['get'])
@@ -656,13 +1510,15 @@ class AssuranceViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(assurances_expirant, many=True)
         return Response(serializer.data)
 
-class MoteurViewSet(viewsets.ModelViewSet):
+class MoteurViewSet(ListeCoalesceeMixin, viewsets.ModelViewSet):
     queryset = Moteur.objects.all()
     serializer_class = MoteurSerializer
 
-class VisiteViewSet(viewsets.ModelViewSet):
+class VisiteViewSet(ListeCoalesceeMixin, HistoriqueNavireMixin, viewsets.ModelViewSet):
     queryset = Visite.objects.all()
+    queryset_archives = ArchiveVisite.objects.all()
     serializer_class = VisiteSerializer
+    ordre_historique = HISTORIQUE_NAVIRE['visites'][2]
     filterset_fields = ['navire']
 
     @action(detail=False, methods=['get'])
@@ -685,9 +1541,11 @@ class VisiteViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(visites_expirant, many=True)
         return Response(serializer.data)
 
-class DossierViewSet(viewsets.ModelViewSet):
+class DossierViewSet(ListeCoalesceeMixin, HistoriqueNavireMixin, viewsets.ModelViewSet):
     queryset = Dossier.objects.all()
+    queryset_archives = ArchiveDossier.objects.all()
     serializer_class = DossierSerializer
+    ordre_historique = HISTORIQUE_NAVIRE['dossiers'][2]
     filterset_fields = ['navire']
 
     @action(detail=False, methods=['get'])
@@ -711,10 +1569,15 @@ class DossierViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class MetaDonneViewSet(viewsets.ModelViewSet):
-    queryset = MetaDonne.objects.all()
+class MetaDonneViewSet(ListeCoalesceeMixin, viewsets.ModelViewSet):
+    queryset = MetaDonne.objects.all().order_by('id')
     serializer_class = MetaDonneSerializer
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    parser_classes = [MultiPartParser, FormParser, AnalyseurJSON]
+
+    # Filtres sur les colonnes typées (indexées avec nom_meta_donne),
+    # ex: ?nom=Date certificat&valeur_date__lt=2025-01-01
+    CHAMPS_TYPES = ['valeur_nombre', 'valeur_date', 'valeur_heure', 'valeur_bool']
+    LOOKUPS_TYPES = ['', '__lt', '__lte', '__gt', '__gte']
     
     def get_queryset(self):
         """Filtrer par navire si spécifié"""
@@ -730,6 +1593,31 @@ class MetaDonneViewSet(viewsets.ModelViewSet):
         if type_meta:
             queryset = queryset.filter(type_meta_donne=type_meta)
         
+        # Filtrer par nom (clé) de métadonnée
+        nom = self.request.query_params.get('nom')
+        if nom:
+            queryset = queryset.filter(nom_meta_donne=nom)
+        
+        # Filtrer par valeur typée
+        filtres = {}
+        for champ in self.CHAMPS_TYPES:
+            field = MetaDonne._meta.get_field(champ)
+            for lookup in self.LOOKUPS_TYPES:
+                param = f"{champ}{lookup}"
+                valeur = self.request.query_params.get(param)
+                if valeur is None:
+                    continue
+                if champ == 'valeur_bool':
+                    if lookup:
+                        continue
+                    valeur = valeur.lower() in VALEURS_BOOLEEN_VRAI
+                try:
+                    filtres[param] = field.to_python(valeur)
+                except DjangoValidationError:
+                    raise ValidationError({param: f"Valeur invalide : {valeur}"})
+        if filtres:
+            queryset = queryset.filter(**filtres)
+        
         return queryset
     
     def create(self, request, *args, **kwargs):
@@ -853,9 +1741,13 @@ class MetaDonneViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Rediriger vers l'URL du fichier
-        file_url = meta_donne.fichier_meta_donne.url
-        return Response({"url": request.build_absolute_uri(file_url)})
+        # Streaming du fichier (Range, ETag, délégation X-Accel-Redirect/X-Sendfile)
+        return servir_fichier(
+            request,
+            meta_donne.fichier_meta_donne.name,
+            storage=meta_donne.fichier_meta_donne.storage,
+            as_attachment=request.query_params.get('inline') is None
+        )
     
     def get_serializer_context(self):
         """Ajouter le request au contexte du serializer"""
@@ -870,6 +1762,188 @@ class MetaDonneViewSet(viewsets.ModelViewSet):
         return Response(choices)
 
 
+# ----------------------------------------------------------------------
+# TÉLÉVERSEMENT FRAGMENTÉ (REPRENABLE)
+# ----------------------------------------------------------------------
+
+TAILLE_BLOC_TELEVERSEMENT = 64 * 1024
+
+
+class TeleversementViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Téléversement reprenable en trois étapes :
+    1. POST /televersements/ : initialise la session (cible, navire, nom_fichier, taille_totale)
+    2. PUT /televersements/{id}/chunk/?offset=N : envoie un fragment brut (ou via Content-Range)
+    3. POST /televersements/{id}/finalize/ : rattache le fichier à la méta-donnée ou à la photo
+    Un GET sur la session retourne taille_recue, l'offset à partir duquel reprendre.
+    Chaque fragment repousse date_expiration de TELEVERSEMENTS_DUREE ; au-delà, la session
+    répond 410 et est supprimée par purger_televersements.
+    """
+    queryset = Televersement.objects.all()
+    serializer_class = TeleversementSerializer
+    parser_classes = [AnalyseurJSON, FormParser, MultiPartParser]
+
+    def _chemin_local(self, televersement):
+        return default_storage.path(televersement.chemin_partiel)
+
+    def perform_create(self, serializer):
+        televersement = serializer.save()
+        chemin = self._chemin_local(televersement)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        open(chemin, 'wb').close()
+
+    def perform_destroy(self, instance):
+        chemin = self._chemin_local(instance)
+        if os.path.exists(chemin):
+            os.remove(chemin)
+        instance.delete()
+
+    def _get_offset(self, request):
+        """Lit l'offset du fragment depuis Content-Range (bytes debut-fin/total) ou ?offset=."""
+        content_range = request.headers.get('Content-Range', '')
+        if content_range.startswith('bytes '):
+            try:
+                return int(content_range[6:].split('-', 1)[0])
+            except ValueError:
+                return None
+        offset = request.query_params.get('offset')
+        if offset is None:
+            return None
+        try:
+            return int(offset)
+        except ValueError:
+            return None
+
+    def _etat(self, televersement, http_status=status.HTTP_200_OK, **extra):
+        response = Response({**self.get_serializer(televersement).data, **extra}, status=http_status)
+        response['Upload-Offset'] = str(televersement.taille_recue)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._etat(self.get_object())
+
+    def _refuser(self, televersement):
+        """Réponse d'erreur si la session n'accepte plus de fragment, sinon None."""
+        if televersement.statut != 'EN_COURS':
+            return Response({"error": "Ce téléversement est déjà finalisé."}, status=status.HTTP_409_CONFLICT)
+        if televersement.est_expire:
+            return Response({"error": "Session de téléversement expirée."}, status=status.HTTP_410_GONE)
+        return None
+
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, pk=None):
+        """
+        Reçoit un fragment dans un fichier temporaire propre à la requête, bloc par bloc,
+        puis l'ajoute au fichier partiel sous verrou de la session, une fois l'offset
+        vérifié : deux fragments concurrents au même offset ne s'entremêlent pas.
+        """
+        televersement = self.get_object()
+        refus = self._refuser(televersement)
+        if refus is not None:
+            return refus
+
+        offset = self._get_offset(request)
+        if offset is None:
+            offset = televersement.taille_recue
+        if offset != televersement.taille_recue:
+            return self._etat(
+                televersement, status.HTTP_409_CONFLICT,
+                error="Offset inattendu, reprendre à taille_recue."
+            )
+
+        try:
+            longueur = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            longueur = 0
+        if longueur <= 0:
+            return Response({"error": "Fragment vide."}, status=status.HTTP_400_BAD_REQUEST)
+        if offset + longueur > televersement.taille_totale:
+            return Response(
+                {"error": "Le fragment dépasse la taille totale annoncée."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        chemin = self._chemin_local(televersement)
+        ecrit = 0
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(chemin), prefix=f"{televersement.id}.", suffix='.tmp'
+        ) as fragment:
+            try:
+                while ecrit < longueur:
+                    bloc = request.stream.read(min(TAILLE_BLOC_TELEVERSEMENT, longueur - ecrit))
+                    if not bloc:
+                        break
+                    fragment.write(bloc)
+                    ecrit += len(bloc)
+            except OSError as e:
+                logger.warning(f"Téléversement {televersement.id} interrompu à {offset + ecrit}: {e}")
+            fragment.flush()
+            fragment.seek(0)
+
+            with transaction.atomic():
+                televersement = Televersement.objects.select_for_update().get(pk=televersement.pk)
+                refus = self._refuser(televersement)
+                if refus is not None:
+                    return refus
+                if televersement.taille_recue != offset:
+                    # Un fragment concurrent au même offset a été ajouté entre-temps
+                    return self._etat(televersement, status.HTTP_409_CONFLICT)
+                with open(chemin, 'r+b') as destination:
+                    destination.seek(offset)
+                    shutil.copyfileobj(fragment, destination, TAILLE_BLOC_TELEVERSEMENT)
+                    destination.truncate()
+                Televersement.objects.filter(pk=televersement.pk, taille_recue=offset).update(
+                    taille_recue=offset + ecrit, date_maj=timezone.now(), date_expiration=expiration_televersement()
+                )
+        televersement.refresh_from_db()
+        return self._etat(televersement)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        """Rattache le fichier complet à fichier_meta_donne ou à photo_navire."""
+        televersement = self.get_object()
+
+        refus = self._refuser(televersement)
+        if refus is not None:
+            return refus
+        if not televersement.est_complet:
+            return self._etat(televersement, status.HTTP_409_CONFLICT)
+
+        chemin = self._chemin_local(televersement)
+        navire = televersement.navire
+
+        with transaction.atomic(), open(chemin, 'rb') as f:
+            fichier = FichierPartiel(f, name=televersement.nom_fichier)
+
+            if televersement.cible == 'PHOTO_NAVIRE':
+                ancien_nom = navire.photo_navire.name if navire.photo_navire else None
+                navire.photo_navire.save(televersement.nom_fichier, fichier, save=False)
+                navire.save(update_fields=['photo_navire'])
+                resultat = NavireSerializer(navire, context=self.get_serializer_context()).data
+            else:
+                meta_donne = MetaDonne.objects.filter(
+                    navire=navire, nom_meta_donne=televersement.nom_meta_donne
+                ).first() or MetaDonne(navire=navire, nom_meta_donne=televersement.nom_meta_donne)
+                ancien_nom = meta_donne.fichier_meta_donne.name if meta_donne.fichier_meta_donne else None
+                meta_donne.type_meta_donne = televersement.type_meta_donne
+                meta_donne.fichier_meta_donne.save(televersement.nom_fichier, fichier, save=False)
+                meta_donne.save()
+                resultat = MetaDonneSerializer(meta_donne, context=self.get_serializer_context()).data
+
+            televersement.statut = 'TERMINE'
+            televersement.save(update_fields=['statut', 'date_maj'])
+
+        if ancien_nom:
+            default_storage.delete(ancien_nom)
+        if os.path.exists(chemin):
+            os.remove(chemin)
+
+        return Response(resultat, status=status.HTTP_200_OK)
+
+
 # Vue de test pour les uploads
 class TestUploadView(APIView):
     """Vue pour tester l'upload de fichiers"""
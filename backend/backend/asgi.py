@@ -3,6 +3,11 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The Server-Sent Events stream (/api/evenements/, api/evenements.py) keeps one
+connection open per client and is only served under ASGI, e.g.:
+
+    uvicorn backend.asgi:application --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -0,0 +1,10 @@
+"""
+Profil de réglages choisi par DJANGO_ENV : 'dev' (par défaut) ou 'prod'.
+DJANGO_SETTINGS_MODULE=backend.settings.prod reste possible directement.
+"""
+import os
+
+if os.environ.get('DJANGO_ENV', 'dev') == 'prod':
+    from .prod import *  # noqa: F401,F403
+else:
+    from .dev import *  # noqa: F401,F403
@@ -0,0 +1,325 @@
+"""
+Django settings for backend project.
+
+Generated by 'django-admin startproject' using Django 5.2.7.
+
+Réglages communs, pilotés par variables d'environnement. Les profils dev.py et prod.py
+les complètent ; le profil est choisi par DJANGO_ENV (voir __init__.py).
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/5.2/ref/settings/
+"""
+
+import os
+from pathlib import Path
+
+from corsheaders.defaults import default_headers
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+def env(nom, defaut=None):
+    return os.environ.get(nom, defaut)
+
+
+def env_bool(nom, defaut=False):
+    valeur = os.environ.get(nom)
+    if valeur is None:
+        return defaut
+    return valeur.strip().lower() in ('1', 'true', 'yes', 'oui', 'on')
+
+
+def env_int(nom, defaut):
+    valeur = os.environ.get(nom)
+    return int(valeur) if valeur else defaut
+
+
+def env_liste(nom, defaut=None):
+    valeur = os.environ.get(nom)
+    if valeur is None:
+        return list(defaut or [])
+    return [element.strip() for element in valeur.split(',') if element.strip()]
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = env('DJANGO_SECRET_KEY')
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = env_bool('DJANGO_DEBUG', False)
+
+ALLOWED_HOSTS = env_liste('DJANGO_ALLOWED_HOSTS', ['localhost', '127.0.0.1'])
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'rest_framework',
+    'corsheaders',
+    'api',
+    'django_filters',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'api.routage_db.RoutageLectureMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'api.organisations.OrganisationMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'backend.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [os.path.join(BASE_DIR, 'templates')],
+        'OPTIONS': {
+            # Templates compilés une seule fois par processus (fiches PDF rendues en série)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'backend.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+
+def bases_de_donnees(mot_de_passe_defaut=''):
+    """
+    Retourne (DATABASES, DATABASE_REPLICAS). Les réplicas en lecture (hôtes séparés par
+    des virgules dans DB_REPLICA_HOSTS, voir api/routage_db.py) reprennent la configuration
+    de 'default' : un profil qui modifie celle-ci rappelle la fonction au lieu de
+    modifier DATABASES['default'] après coup.
+    """
+    bases = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env('DB_NAME', 'db_navires'),
+            'USER': env('DB_USER', 'postgres'),
+            'PASSWORD': env('DB_PASSWORD', mot_de_passe_defaut),
+            'HOST': env('DB_HOST', 'localhost'),
+            'PORT': env('DB_PORT', '5432'),
+            # Connexions persistantes, vérifiées avant réutilisation
+            'CONN_MAX_AGE': env_int('DB_CONN_MAX_AGE', 60),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+    replicas = []
+    for index, hote in enumerate(env_liste('DB_REPLICA_HOSTS')):
+        alias = f'replica_{index + 1}'
+        bases[alias] = {
+            **bases['default'],
+            'HOST': hote,
+            'TEST': {'MIRROR': 'default'},
+        }
+        replicas.append(alias)
+    return bases, replicas
+
+
+DATABASES, DATABASE_REPLICAS = bases_de_donnees()
+
+DATABASE_ROUTERS = ['api.routage_db.RouteurReplicas']
+
+# Organisations hébergées (voir api/organisations.py) : organisation des requêtes dont
+# ni l'hôte ni l'en-tête X-Organisation ne désignent une organisation
+ORGANISATION_PAR_DEFAUT = env('ORGANISATION_PAR_DEFAUT', 'defaut')
+# En-tête X-Organisation accepté uniquement s'il est fixé par un proxy frontal de confiance
+ORGANISATION_ENTETE_DE_CONFIANCE = env_bool('ORGANISATION_ENTETE_DE_CONFIANCE', False)
+
+
+# Password validation
+# https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/5.2/topics/i18n/
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/5.2/howto/static-files/
+
+STATIC_URL = 'static/'
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Délégation de l'envoi des fichiers média au serveur web frontal :
+# None (streaming par Django), 'x-accel-redirect' (nginx) ou 'x-sendfile' (Apache/lighttpd).
+# Avec nginx, MEDIA_X_ACCEL_PREFIX doit correspondre à une location "internal" pointant sur MEDIA_ROOT.
+MEDIA_SENDFILE_BACKEND = env('MEDIA_SENDFILE_BACKEND') or None
+MEDIA_X_ACCEL_PREFIX = env('MEDIA_X_ACCEL_PREFIX', '/protected-media/')
+# Durée de vie d'une session de téléversement sans nouveau fragment, en secondes ;
+# les sessions expirées sont supprimées par la commande purger_televersements
+TELEVERSEMENTS_DUREE = env_int('TELEVERSEMENTS_DUREE', 24 * 60 * 60)
+
+# Stockage dédupliqué (SHA-256) des pièces jointes, voir api/stockage.py
+STORAGES = {
+    'default': {
+        'BACKEND': 'api.stockage.StockageDeduplique',
+        'OPTIONS': {
+            'backend': 'django.core.files.storage.FileSystemStorage',
+        },
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+CORS_ALLOWED_ORIGINS = env_liste('CORS_ALLOWED_ORIGINS', [
+    "http://localhost:5173",
+    "http://127.0.0.1:5173",
+])
+
+CORS_ALLOW_ALL_ORIGINS = False
+CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'x-organisation')
+
+
+PDFKIT_CONFIG = {
+    # Sous Windows : C:/Program Files/wkhtmltopdf/bin/wkhtmltopdf.exe
+    'wkhtmltopdf': env('WKHTMLTOPDF_PATH', '/usr/bin/wkhtmltopdf'),
+}
+# qpdf réunit les lots des PDF combinés sans garder toutes les pages en mémoire ;
+# sans qpdf (repli pypdf), un PDF combiné est limité à EXPORTS_PDF_MAX_NAVIRES_SANS_QPDF fiches
+QPDF_PATH = env('QPDF_PATH', '/usr/bin/qpdf')
+EXPORTS_PDF_MAX_NAVIRES_SANS_QPDF = env_int('EXPORTS_PDF_MAX_NAVIRES_SANS_QPDF', 2000)
+
+
+# Django REST framework
+# Pagination opt-in (liste simple sans ?page= / ?page_size=), limitation de débit par client
+# (et par portée pour les exports)
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.PaginationOptionnelle',
+    'PAGE_SIZE': 50,
+    # orjson si installé, sinon module json standard (voir api/rendus_json.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.rendus_json.RenduJSON',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.rendus_json.AnalyseurJSON',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'rest_framework.throttling.AnonRateThrottle',
+        'rest_framework.throttling.UserRateThrottle',
+        'rest_framework.throttling.ScopedRateThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': env('THROTTLE_ANON', '600/min'),
+        'user': env('THROTTLE_USER', '1200/min'),
+        # Actions d'export (throttle_scope), voir api/admission.py
+        'exports': env('THROTTLE_EXPORTS', '10/min'),
+        'exports_pdf': env('THROTTLE_EXPORTS_PDF', '30/min'),
+    },
+}
+
+# Exports lourds simultanés, tous processus confondus (sémaphore dans le cache) ;
+# au-delà, attente de EXPORTS_ATTENTE_MAX secondes puis 429 avec Retry-After
+EXPORTS_SIMULTANES = env_int('EXPORTS_SIMULTANES', 4)
+EXPORTS_ATTENTE_MAX = env_int('EXPORTS_ATTENTE_MAX', 5)
+EXPORTS_RETRY_AFTER = env_int('EXPORTS_RETRY_AFTER', 30)
+# PDF combinés : exécutés par un thread du processus web (développement) ou par la commande
+# executer_exports (production : survit aux redémarrages des workers, reprend les tâches)
+EXPORTS_DANS_LE_PROCESSUS = env_bool('EXPORTS_DANS_LE_PROCESSUS', True)
+# Attente maximale d'une place par une tâche exécutée dans le processus web, en secondes
+EXPORTS_ATTENTE_TACHE = env_int('EXPORTS_ATTENTE_TACHE', 10 * 60)
+
+
+# Cache : Redis si CACHE_URL est défini (partagé entre processus), sinon mémoire locale
+
+CACHE_URL = env('CACHE_URL')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'navbases',
+            'TIMEOUT': 300,
+        }
+    }
+
+
+# Journalisation : console ; django.db.backends reste au niveau WARNING
+# (le journal des requêtes SQL est coûteux en mémoire sous charge)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '{asctime} {levelname} {name} {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'root': {'handlers': ['console'], 'level': env('LOG_LEVEL', 'INFO')},
+    'loggers': {
+        'django': {'handlers': ['console'], 'level': env('DJANGO_LOG_LEVEL', 'INFO'), 'propagate': False},
+        'django.db.backends': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
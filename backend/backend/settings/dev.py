@@ -0,0 +1,35 @@
+"""Profil de développement : DEBUG, API navigable, identifiants locaux par défaut."""
+from .base import *  # noqa: F401,F403
+from .base import REST_FRAMEWORK, bases_de_donnees, env, env_bool, env_liste
+
+SECRET_KEY = env('DJANGO_SECRET_KEY', 'django-insecure-7-!72#yo0ba$fwmakog*#6pd!&*pg*mw6984(&vgepnek6it6v')
+
+DEBUG = env_bool('DJANGO_DEBUG', True)
+
+ALLOWED_HOSTS = env_liste('DJANGO_ALLOWED_HOSTS', [
+    'localhost',
+    '127.0.0.1',
+    '0.0.0.0',
+    '172.10.17.119',
+    '192.168.137.1',
+    '192.168.88.59',
+])
+
+# Mot de passe local par défaut, repris par les réplicas éventuels
+DATABASES, DATABASE_REPLICAS = bases_de_donnees(mot_de_passe_defaut='StageL2')
+
+CORS_ALLOWED_ORIGINS = env_liste('CORS_ALLOWED_ORIGINS', [
+    "http://localhost:5173",
+    "http://127.0.0.1:5173",
+    "http://172.10.17.119:5173",
+    "http://192.168.137.1:5173",
+    "http://192.168.88.59:5173",
+])
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': [
+        *REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'],
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
@@ -0,0 +1,17 @@
+"""Profil de production : tout vient de l'environnement, DEBUG désactivé."""
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import SECRET_KEY, env_bool
+
+DEBUG = False
+
+if not SECRET_KEY:
+    raise ImproperlyConfigured("DJANGO_SECRET_KEY doit être défini en production.")
+
+# Exports PDF combinés exécutés par la commande executer_exports (service dédié)
+EXPORTS_DANS_LE_PROCESSUS = env_bool('EXPORTS_DANS_LE_PROCESSUS', False)
+
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+SESSION_COOKIE_SECURE = env_bool('DJANGO_SECURE_COOKIES', True)
+CSRF_COOKIE_SECURE = env_bool('DJANGO_SECURE_COOKIES', True)
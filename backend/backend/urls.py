@@ -1,8 +1,9 @@
 # projet/urls.py
 from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf.urls.static import static
+from api.fichiers import servir_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -11,3 +12,7 @@ urlpatterns = [
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+else:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), servir_media, name='media'),
+    ]
@@ -34,4 +34,12 @@ export const downloadFileFromAPI = async (url, defaultFileName = 'download.csv')
     console.error("Erreur lors du téléchargement du fichier:", error);
     alert("Impossible de télécharger le fichier.");
   }
-};
\ No newline at end of file
+};
+
+// Choix et référentiels des formulaires : /bootstrap/ donne l'URL versionnée du contenu,
+// servie avec Cache-Control immutable (le navigateur ne la redemande qu'après un changement).
+export const fetchBootstrap = async () => {
+  const { data: version } = await apiClient.get('/bootstrap/');
+  const { data } = await axios.get(version.url);
+  return data;
+};
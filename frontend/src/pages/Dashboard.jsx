@@ -152,6 +152,27 @@ export default function Dashboard() {
     };
 
     loadData();
+
+    // Rechargement sur les changements poussés par le serveur (flux SSE, serveur ASGI) :
+    // les événements rapprochés ne provoquent qu'un seul rechargement
+    let rechargement = null;
+    const planifierRechargement = () => {
+      clearTimeout(rechargement);
+      rechargement = setTimeout(loadData, 1000);
+    };
+    const flux = typeof EventSource !== "undefined"
+      ? new EventSource(`${API_BASE_URL}/evenements/`)
+      : null;
+    if (flux) {
+      ["navire", "document", "conformite", "resynchronisation"].forEach((type) =>
+        flux.addEventListener(type, planifierRechargement)
+      );
+    }
+
+    return () => {
+      clearTimeout(rechargement);
+      if (flux) flux.close();
+    };
   }, []);
 
   /* LOADER */
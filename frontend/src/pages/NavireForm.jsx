@@ -15,6 +15,7 @@ import ActivitesSection from "../components/navire-form/ActivitesSection";
 import OwnerPhotoSection from "../components/navire-form/OwnerPhotoSection";
 import FormActions from "../components/navire-form/FormActions";
 import { API_BASE_URL } from "../config/api";
+import { fetchBootstrap } from "../apiService";
 
 const NavireForm = () => {
   const { id } = useParams();
@@ -112,22 +113,19 @@ const NavireForm = () => {
     return false;
   };
 
-  const fetchProprietaires = () => {
-    return axios.get(`${API_BASE_URL}/proprietaires/`)
-      .then(res => {
-        setProprietaires(res.data);
-        localStorage.setItem('proprietaires', JSON.stringify(res.data));
+  // Propriétaires et activités en une seule requête (contenu versionné, voir fetchBootstrap)
+  const fetchReferentiels = () => {
+    return fetchBootstrap()
+      .then(data => {
+        setProprietaires(data.proprietaires);
+        setActivites(data.activites);
+        localStorage.setItem('proprietaires', JSON.stringify(data.proprietaires));
+        localStorage.setItem('activites', JSON.stringify(data.activites));
       })
-      .catch(() => setProprietaires([]));
-  };
-
-  const fetchActivites = () => {
-    return axios.get(`${API_BASE_URL}/activites/`)
-      .then(res => {
-        setActivites(res.data);
-        localStorage.setItem('activites', JSON.stringify(res.data));
-      })
-      .catch(() => setActivites([]));
+      .catch(() => {
+        setProprietaires([]);
+        setActivites([]);
+      });
   };
   
   useEffect(() => {
@@ -140,9 +138,9 @@ const NavireForm = () => {
       setIsEditing(true);
       setIsLoading(false);
       formInitialized.current = true;
-      Promise.all([fetchProprietaires(), fetchActivites()]);
+      fetchReferentiels();
     } else {
-      Promise.all([fetchProprietaires(), fetchActivites()]).finally(() => {
+      fetchReferentiels().finally(() => {
         if (id) {
           setIsEditing(true);
           axios.get(`${API_BASE_URL}/navires/${id}/`)
@@ -265,7 +263,7 @@ const NavireForm = () => {
   };
 
   const handleProprietaireSuccess = (newOwnerId) => {
-    fetchProprietaires().then(() => {
+    fetchReferentiels().then(() => {
       setNavire(prev => ({ ...prev, proprietaire_id: newOwnerId.toString() }));
       
       const newOwner = proprietaires.find(p => p.id === newOwnerId);
@@ -284,7 +282,7 @@ const NavireForm = () => {
   };
 
   const handleActiviteSuccess = () => {
-    fetchActivites().then(() => {
+    fetchReferentiels().then(() => {
       setIsActiviteModalOpen(false);
       setSuccessMessage("Nouvelle activité ajoutée avec succès");
       setTimeout(() => setSuccessMessage(null), 3000);